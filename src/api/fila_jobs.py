@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+# (fila de jobs de roteirização executados num pool de processos)
+
+class FilaCheiaError(Exception):
+    """A fila atingiu o limite de jobs pendentes; o cliente deve tentar mais tarde."""
+    pass
+
+class FilaDeJobs:
+    """
+    Executa funções pesadas (as resoluções do VRP) num pool limitado de
+    processos, fora do event loop da API. Cada job recebe um id para
+    consulta de status, resultado e cancelamento.
+    """
+    def __init__(self, max_workers: int = None, max_fila: int = None, ttl_segundos: int = None):
+        self.max_workers = max_workers or int(os.environ.get("VRP_MAX_WORKERS", os.cpu_count() or 2))
+        self.max_fila = max_fila or int(os.environ.get("VRP_MAX_FILA", 4 * self.max_workers))
+        self.ttl_segundos = ttl_segundos or int(os.environ.get("VRP_JOB_TTL", 3600))
+        self._executor = None
+        self._jobs = {}
+        self._trava = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _ativos(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job['future'].done())
+
+    def _remover_expirados(self):
+        limite = time.time() - self.ttl_segundos
+        for job_id in [i for i, job in self._jobs.items() if job['future'].done() and job['criado_em'] < limite]:
+            del self._jobs[job_id]
+
+    def submeter(self, funcao, *args) -> str:
+        """Enfileira funcao(*args) e devolve o id do job. Lança FilaCheiaError se não houver vaga."""
+        with self._trava:
+            self._remover_expirados()
+            if self._ativos() >= self.max_fila:
+                raise FilaCheiaError(f"Fila cheia ({self.max_fila} jobs pendentes).")
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {"future": self._pool().submit(funcao, *args), "criado_em": time.time(), "cancelado": False}
+        return job_id
+
+    def registrar_concluido(self, resultado) -> str:
+        """Cria um job já concluído (ex.: solução vinda do cache), sem passar pelo pool."""
+        future = Future()
+        future.set_result(resultado)
+        job_id = uuid.uuid4().hex
+        with self._trava:
+            self._jobs[job_id] = {"future": future, "criado_em": time.time(), "cancelado": False}
+        return job_id
+
+    def _job(self, job_id: str) -> dict:
+        with self._trava:
+            return self._jobs[job_id]
+
+    def future(self, job_id: str):
+        return self._job(job_id)['future']
+
+    def status(self, job_id: str) -> dict:
+        """Lança KeyError para ids desconhecidos ou expirados."""
+        job = self._job(job_id)
+        future = job['future']
+        if job['cancelado']: status = "cancelado"
+        elif not future.done(): status = "executando" if future.running() else "na_fila"
+        elif future.exception() is not None: status = "erro"
+        else: status = "concluido"
+        return {"job_id": job_id, "status": status, "criado_em": job['criado_em']}
+
+    def resultado(self, job_id: str):
+        """Resultado de um job concluído (relança a exceção do processo, se houver)."""
+        return self._job(job_id)['future'].result(timeout=0)
+
+    def erro(self, job_id: str) -> str:
+        excecao = self._job(job_id)['future'].exception()
+        return "".join(traceback.format_exception(type(excecao), excecao, excecao.__traceback__))
+
+    def cancelar(self, job_id: str) -> dict:
+        """
+        Jobs ainda na fila são removidos do pool. Um job que já está
+        executando não pode ser interrompido sem derrubar o processo: ele
+        termina a busca, mas o resultado é descartado.
+        """
+        with self._trava:
+            job = self._jobs[job_id]
+            if job['future'].done() and not job['cancelado']:
+                return {"job_id": job_id, "cancelado": False, "motivo": "Job já concluído."}
+            job['cancelado'] = True
+        interrompido = job['future'].cancel()
+        return {"job_id": job_id, "cancelado": True, "interrompido": interrompido}
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            return {"max_workers": self.max_workers, "max_fila": self.max_fila, "ativos": self._ativos(), "total": len(self._jobs)}
+
+    def encerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
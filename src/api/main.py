@@ -1,10 +1,21 @@
-import httpx
-from fastapi import FastAPI, HTTPException
+import asyncio
+import os
+import threading
+import time
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Tuple, Optional
 import traceback
 
-from src.core.solucionador_vrp import SolucionadorVRP
+from src.core.solucionador_vrp import processos_por_job, resolver_problema, resolver_portfolio, PERFIS_SOLVER, PERFIL_PADRAO, PORTFOLIO_PADRAO, MODOS_MATRIZ
+from src.core.fluxo_maximo import RedeFluxo
+from src.core.cache_solucoes import CacheSolucoes, chave_canonica
+from src.core.cenarios import gerar_cenarios, simular_cenarios
+from src.core.decomposicao import LIMIAR_DECOMPOSICAO, resolver_decomposto, usar_decomposicao
+from src.core.metricas import REGISTRO, HTTP_SAIDA, Cronometro
+from src.core.perfilador import caminho_artefato
+from src.api.fila_jobs import FilaDeJobs, FilaCheiaError
 
 class Rota(BaseModel):
     origem: str
@@ -16,6 +27,18 @@ class RedeDeEntrega(BaseModel):
     sumidouros: List[str]
     rotas: List[Rota]
 
+class AlteracaoFluxo(BaseModel):
+    tipo: str  # "capacidade", "remover_rota" ou "fechar_no"
+    origem: Optional[str] = None
+    destino: Optional[str] = None
+    no: Optional[str] = None
+    delta: Optional[int] = None
+    fator: Optional[float] = Field(default=None, ge=0)
+
+class ConsultaFluxo(BaseModel):
+    alteracoes: List[AlteracaoFluxo] = Field(min_length=1)
+    persistir: bool = False
+
 class ProblemaVRP(BaseModel):
     coordenadas: Dict[str, Tuple[float, float]]
     demandas: Dict[str, int]
@@ -28,6 +51,29 @@ class ProblemaVRP(BaseModel):
     custo_hora: Optional[float] = 0.0
     prioridades: Optional[Dict[str, int]] = None
     balancear_carga_por: Optional[str] = None
+    plano_anterior: Optional[List[Dict[str, Any]]] = None
+    perfil_solver: Optional[str] = PERFIL_PADRAO
+    tempo_limite_s: Optional[float] = Field(default=None, gt=0)
+    janela_plato_s: Optional[float] = Field(default=None, gt=0)
+    portfolio: Optional[int] = Field(default=None, ge=1, le=len(PORTFOLIO_PADRAO))
+    decomposicao: Optional[bool] = None  # None: automático para problemas grandes
+    max_paradas_cluster: Optional[int] = Field(default=None, ge=10, le=1000)
+    vizinhos_k: Optional[int] = Field(default=None, ge=2, le=200)  # matriz esparsa: só os k vizinhos vão ao roteador
+    modo_matriz: Optional[str] = None  # exato | fallback | estimado (padrão: MATRIZ_MODO)
+    profile: Optional[bool] = None  # cProfile + log_search + callbacks contados; artefatos em /perfis/{id}
+
+class GradeCenarios(BaseModel):
+    num_veiculos: Optional[List[int]] = None
+    capacidade_veiculo: Optional[List[int]] = None
+    multiplicador_demanda: Optional[List[float]] = None
+    custo_km: Optional[List[float]] = None
+    custo_hora: Optional[List[float]] = None
+    tempo_servico: Optional[List[int]] = None
+
+class EstudoCenarios(BaseModel):
+    problema: ProblemaVRP
+    grade: GradeCenarios
+    incluir_solucoes: bool = False
 
 app = FastAPI(
     title="Delivery Routing Optimizer API",
@@ -35,48 +81,279 @@ app = FastAPI(
     version="2.3.0"
 )
 
-DEV2_FLUXO_API_URL = "https://fluxo-maximo-api.onrender.com/fluxo-maximo"
-db: Dict[str, Any] = {"rede_formatada_usuario": None, "resultado_fluxo": None}
+db: Dict[str, Any] = {"rede_formatada_usuario": None, "resultado_fluxo": None, "rede_fluxo": None}
+# A RedeFluxo resolvida (com o grafo residual) é compartilhada entre as requisições
+trava_fluxo = threading.Lock()
+
+fila_jobs = FilaDeJobs()
+cache_solucoes = CacheSolucoes(
+    max_itens=int(os.environ.get("CACHE_SOLUCOES_MAX", 256)),
+    ttl_segundos=float(os.environ.get("CACHE_SOLUCOES_TTL", 3600)),
+    diretorio=os.environ.get("CACHE_SOLUCOES_DIR") or None,
+)
+jobs_em_andamento: Dict[str, str] = {}
+
+# Métricas do processo da API (GET /metrics). Os jobs rodam em outros
+# processos: o que acontece lá chega pelo bloco `timings` e pelas `metricas` da solução
+LATENCIA_API = REGISTRO.histograma("api_requisicao_segundos", "Latência das requisições HTTP da API.", ("rota", "metodo", "status"))
+FASES_VRP = REGISTRO.histograma("vrp_fase_segundos", "Duração de cada fase da roteirização (matrizes, modelo, busca, formatacao, total...).", ("fase",))
+JOBS_VRP = REGISTRO.contador("vrp_jobs_total", "Jobs de roteirização por resultado (ok, sem_solucao, erro, cancelado, cache).", ("resultado",))
+STATUS_SOLVER = REGISTRO.contador("vrp_status_solver_total", "Status de busca devolvidos pelo OR-Tools.", ("status",))
+PARES_CACHE = REGISTRO.contador("vrp_cache_pares_total", "Pares origem-destino da matriz por resultado no cache (acerto, falta).", ("resultado",))
+PARADAS_NAO_ATENDIDAS = REGISTRO.contador("vrp_paradas_nao_atendidas_total", "Paradas deixadas fora das rotas.")
+OBJETIVO_VRP = REGISTRO.medidor("vrp_objetivo_ultimo", "Valor do objetivo da última solução encontrada.")
+FLUXO_OPERACOES = REGISTRO.histograma("fluxo_operacao_segundos", "Duração das operações de fluxo máximo.", ("operacao",))
+JOBS_ATIVOS = REGISTRO.medidor("vrp_jobs_ativos", "Jobs na fila ou em execução.")
+
+@app.on_event("shutdown")
+def encerrar_fila_jobs():
+    fila_jobs.encerrar()
+
+def _validar_problema(problema: ProblemaVRP):
+    if problema.perfil_solver and problema.perfil_solver not in PERFIS_SOLVER:
+        raise HTTPException(status_code=400, detail=f"Perfil de solver desconhecido: '{problema.perfil_solver}'. Opções: {', '.join(PERFIS_SOLVER)}.")
+    if problema.modo_matriz and problema.modo_matriz not in MODOS_MATRIZ:
+        raise HTTPException(status_code=400, detail=f"Modo de matriz desconhecido: '{problema.modo_matriz}'. Opções: {', '.join(MODOS_MATRIZ)}.")
+    for local, demanda in problema.demandas.items():
+        if demanda > problema.capacidade_veiculo:
+            raise HTTPException(status_code=400, detail=f"A demanda para '{local}' ({demanda}) excede a capacidade do veículo ({problema.capacidade_veiculo}).")
+
+def _registrar_solucao(solucao: dict):
+    for fase, duracao in solucao.get('timings', {}).items():
+        if fase.endswith('_s') and isinstance(duracao, (int, float)): FASES_VRP.observar(duracao, fase=fase[:-2])
+    timings = solucao.get('timings', {})
+    for duracao in timings.get('http_s', []):
+        HTTP_SAIDA.observar(duracao, servico=timings.get('provedor_matriz', "desconhecido"))
+    metricas = solucao.get('metricas', {})
+    if metricas.get('status_solver'): STATUS_SOLVER.incrementar(status=metricas['status_solver'])
+    if metricas.get('pares_total'):
+        PARES_CACHE.incrementar(metricas['pares_cache'], resultado="acerto")
+        PARES_CACHE.incrementar(metricas['pares_total'] - metricas['pares_cache'], resultado="falta")
+    PARADAS_NAO_ATENDIDAS.incrementar(metricas.get('paradas_nao_atendidas', 0))
+    if metricas.get('objetivo') is not None: OBJETIVO_VRP.definir(metricas['objetivo'])
+
+def _registrar_metricas(future):
+    if future.cancelled(): JOBS_VRP.incrementar(resultado="cancelado")
+    elif future.exception() is not None: JOBS_VRP.incrementar(resultado="erro")
+    elif not future.result(): JOBS_VRP.incrementar(resultado="sem_solucao")
+    else:
+        JOBS_VRP.incrementar(resultado="ok")
+        _registrar_solucao(future.result())
+
+@app.middleware("http")
+async def medir_requisicoes(request: Request, call_next):
+    inicio = time.perf_counter()
+    resposta = await call_next(request)
+    rota = request.scope.get("route")
+    LATENCIA_API.observar(time.perf_counter() - inicio, rota=getattr(rota, "path", "desconhecida"), metodo=request.method, status=resposta.status_code)
+    return resposta
+
+def _job_cancelado(job_id: str) -> bool:
+    """Cancelado pela API: um job que já executava não tem o future cancelado, só a marca na fila."""
+    try:
+        return fila_jobs.status(job_id)['status'] == "cancelado"
+    except KeyError:
+        return False
+
+def _guardar_no_cache(chave: str, job_id: str):
+    def _callback(future):
+        jobs_em_andamento.pop(chave, None)
+        if not future.cancelled() and future.exception() is None and future.result() and not _job_cancelado(job_id):
+            cache_solucoes.guardar(chave, future.result())
+    return _callback
+
+def _submeter_job(problema: ProblemaVRP) -> str:
+    _validar_problema(problema)
+    dados = problema.model_dump()
+    if problema.portfolio and usar_decomposicao(dados):
+        raise HTTPException(status_code=400, detail="O portfólio não se aplica ao modo de decomposição (ligado por `decomposicao` ou automático acima de "
+                                                    f"{LIMIAR_DECOMPOSICAO} paradas); envie `decomposicao: false` para usar o portfólio.")
+    # Com profile a busca precisa rodar de fato: sem cache de soluções e sem reaproveitar job em andamento
+    perfilar = bool(problema.profile)
+    chave = chave_canonica(dados)
+    cronometro = Cronometro()
+    solucao = None if perfilar else cache_solucoes.obter(chave)
+    if solucao is not None:
+        # Os timings guardados são da execução original: a resposta leva os da consulta ao cache
+        cronometro.marcar("cache")
+        JOBS_VRP.incrementar(resultado="cache")
+        return fila_jobs.registrar_concluido({**solucao, 'metricas': {**solucao.get('metricas', {}), 'cache_solucao': True}, 'timings': cronometro.timings()})
+    # Um problema idêntico já em resolução (ex.: retentativa após timeout) reaproveita o mesmo job
+    job_id = None if perfilar else jobs_em_andamento.get(chave)
+    if job_id is not None:
+        try:
+            if fila_jobs.status(job_id)['status'] in ("na_fila", "executando"): return job_id
+        except KeyError:
+            pass
+    try:
+        if usar_decomposicao(dados):
+            job_id = fila_jobs.submeter(resolver_decomposto, dados)
+        elif problema.portfolio:
+            job_id = fila_jobs.submeter(resolver_portfolio, dados, problema.portfolio)
+        else:
+            job_id = fila_jobs.submeter(resolver_problema, dados)
+    except FilaCheiaError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    if not perfilar:
+        jobs_em_andamento[chave] = job_id
+        fila_jobs.future(job_id).add_done_callback(_guardar_no_cache(chave, job_id))
+    fila_jobs.future(job_id).add_done_callback(_registrar_metricas)
+    return job_id
+
+def _status_ou_404(job_id: str) -> dict:
+    try:
+        return fila_jobs.status(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' não encontrado.")
 
 @app.post("/roteirizar", summary="Calcula as rotas otimizadas para uma frota de veículos")
 async def roteirizar_entregas(problema: ProblemaVRP):
+    job_id = _submeter_job(problema)
     try:
-        for local, demanda in problema.demandas.items():
-            if demanda > problema.capacidade_veiculo:
-                raise HTTPException(status_code=400, detail=f"A demanda para '{local}' ({demanda}) excede a capacidade do veículo ({problema.capacidade_veiculo}).")
-        solver = SolucionadorVRP(problema.dict())
-        solucao = solver.resolver()
-        if solucao: return solucao
-        else: raise HTTPException(status_code=400, detail="Não foi possível encontrar uma solução com os parâmetros fornecidos.")
-    except Exception as e:
+        solucao = await asyncio.wrap_future(fila_jobs.future(job_id))
+    except asyncio.CancelledError:
+        # Se o job não foi cancelado (DELETE /jobs/{id}), quem foi cancelada é a própria requisição
+        if not fila_jobs.future(job_id).cancelled(): raise
+        raise HTTPException(status_code=409, detail="O job foi cancelado.")
+    except Exception:
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail={"message": "Ocorreu um erro crítico no servidor.", "traceback": traceback.format_exc()})
+    if _job_cancelado(job_id):
+        raise HTTPException(status_code=409, detail="O job foi cancelado.")
+    if solucao: return solucao
+    raise HTTPException(status_code=400, detail="Não foi possível encontrar uma solução com os parâmetros fornecidos.")
+
+@app.post("/jobs/roteirizar", status_code=202, summary="Enfileira uma roteirização e devolve o id do job")
+def submeter_roteirizacao(problema: ProblemaVRP):
+    return _status_ou_404(_submeter_job(problema))
+
+@app.get("/jobs/{job_id}", summary="Consulta o status de um job de roteirização")
+def status_job(job_id: str):
+    return _status_ou_404(job_id)
+
+@app.get("/jobs/{job_id}/resultado", summary="Obtém o resultado de um job concluído")
+def resultado_job(job_id: str):
+    status = _status_ou_404(job_id)
+    if status['status'] in ("na_fila", "executando"):
+        return JSONResponse(status_code=202, content=status)
+    if status['status'] == "cancelado":
+        raise HTTPException(status_code=410, detail="O job foi cancelado.")
+    if status['status'] == "erro":
+        raise HTTPException(status_code=500, detail={"message": "Ocorreu um erro crítico no servidor.", "traceback": fila_jobs.erro(job_id)})
+    solucao = fila_jobs.resultado(job_id)
+    if not solucao: raise HTTPException(status_code=400, detail="Não foi possível encontrar uma solução com os parâmetros fornecidos.")
+    return solucao
+
+@app.delete("/jobs/{job_id}", summary="Cancela um job de roteirização")
+def cancelar_job(job_id: str):
+    _status_ou_404(job_id)
+    return fila_jobs.cancelar(job_id)
+
+@app.post("/jobs/cenarios", status_code=202, summary="Enfileira uma varredura de cenários sobre um problema base")
+def submeter_cenarios(estudo: EstudoCenarios):
+    _validar_problema(estudo.problema)
+    grade = estudo.grade.dict(exclude_none=True)
+    try:
+        cenarios = gerar_cenarios(grade)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        job_id = fila_jobs.submeter(simular_cenarios, estudo.problema.model_dump(), None, cenarios, processos_por_job("VRP_CENARIOS_WORKERS"), estudo.incluir_solucoes)
+    except FilaCheiaError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return {**_status_ou_404(job_id), "num_cenarios": len(cenarios)}
+
+@app.get("/metrics", response_class=PlainTextResponse, summary="Métricas no formato de texto do Prometheus")
+def exportar_metricas():
+    JOBS_ATIVOS.definir(fila_jobs.estatisticas()['ativos'])
+    return PlainTextResponse(REGISTRO.exportar(), media_type="text/plain; version=0.0.4")
+
+@app.get("/perfis/{id_perfil}", summary="Resumo do perfil de uma roteirização com profile=true")
+def resumo_perfil(id_perfil: str):
+    try:
+        return FileResponse(caminho_artefato(id_perfil, "resumo.json"), media_type="application/json")
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+@app.get("/perfis/{id_perfil}/{arquivo}", summary="Baixa um artefato do perfil (perfil.prof, perfil.txt, log_busca.txt, resumo.json)")
+def baixar_artefato_perfil(id_perfil: str, arquivo: str):
+    try:
+        return FileResponse(caminho_artefato(id_perfil, arquivo), filename=f"{id_perfil}_{arquivo}")
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+@app.get("/cache/solucoes", summary="Estatísticas do cache de soluções")
+def estatisticas_cache_solucoes():
+    return cache_solucoes.estatisticas()
+
+@app.delete("/cache/solucoes", summary="Esvazia o cache de soluções")
+def limpar_cache_solucoes():
+    cache_solucoes.limpar()
+    return cache_solucoes.estatisticas()
 
 @app.post("/rede", summary="Configura uma rede para análise de fluxo")
 def configurar_rede(rede: RedeDeEntrega):
-    db["rede_formatada_usuario"] = rede.dict()
-    db["resultado_fluxo"] = None
+    with trava_fluxo:
+        db["rede_formatada_usuario"] = rede.model_dump()
+        db["resultado_fluxo"] = None
+        db["rede_fluxo"] = None
     return {"mensagem": f"Rede com {len(rede.rotas)} rotas configurada com sucesso."}
 
-@app.post("/fluxo/calcular", summary="Dispara o cálculo de fluxo máximo (usando API externa)")
-async def calcular_fluxo():
+@app.post("/fluxo/calcular", summary="Dispara o cálculo de fluxo máximo (motor local)")
+def calcular_fluxo(algoritmo: str = "dinic"):
     rede_usuario = db.get("rede_formatada_usuario")
     if not rede_usuario: raise HTTPException(status_code=400, detail="Rede não configurada.")
-    nodes = sorted(list(set([r['origem'] for r in rede_usuario['rotas']] + [r['destino'] for r in rede_usuario['rotas']] + rede_usuario['fontes'] + rede_usuario['sumidouros'])))
-    mapa_nome_para_indice = {nome: i for i, nome in enumerate(nodes)}
-    payload = {"nodeCount": len(nodes), "sources": [mapa_nome_para_indice[n] for n in rede_usuario['fontes']], "sinks": [mapa_nome_para_indice[n] for n in rede_usuario['sumidouros']], "edges": [{"from": mapa_nome_para_indice[r['origem']], "to": mapa_nome_para_indice[r['destino']], "capacity": r['capacidade']} for r in rede_usuario['rotas']]}
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(DEV2_FLUXO_API_URL, json=payload, timeout=20.0)
-            response.raise_for_status(); resultado_dev2 = response.json()
-    except httpx.RequestError as exc: raise HTTPException(status_code=503, detail=f"Erro ao comunicar com API de fluxo: {exc}.")
-    mapa_indice_para_nome = {i: nome for nome, i in mapa_nome_para_indice.items()}
-    resultado_formatado = {"fluxo_maximo": resultado_dev2.get("maxFlow"), "rotas_com_fluxo": [{"origem": mapa_indice_para_nome.get(e.get("from")), "destino": mapa_indice_para_nome.get(e.get("to")), "capacidade": e.get("capacity"), "fluxo": e.get("flow")} for e in resultado_dev2.get("edges", [])]}
-    db["resultado_fluxo"] = resultado_formatado
-    return resultado_formatado
+    cronometro = Cronometro()
+    with trava_fluxo:
+        cronometro.marcar("espera")
+        try:
+            rede_fluxo = RedeFluxo.de_dicionario(rede_usuario)
+            cronometro.marcar("construcao")
+            rede_fluxo.resolver(algoritmo)
+            cronometro.marcar("resolucao")
+        except ValueError as e: raise HTTPException(status_code=400, detail=str(e))
+        db["rede_fluxo"] = rede_fluxo
+        db["resultado_fluxo"] = resultado_formatado = rede_fluxo.resultado()
+    timings = cronometro.timings()
+    FLUXO_OPERACOES.observar(timings['total_s'], operacao="calcular")
+    return {**resultado_formatado, "timings": timings}
+
+@app.post("/fluxo/simular", summary="Consulta \"e se\" incremental sobre o último fluxo calculado")
+def simular_fluxo(consulta: ConsultaFluxo, algoritmo: str = "dinic"):
+    """
+    Aplica um lote de alterações (capacidade, remover_rota, fechar_no) sobre
+    o grafo residual guardado e devolve o novo fluxo máximo e a
+    `variacao_fluxo`. Com `persistir`, as alterações ficam na rede.
+    """
+    if not db.get("rede_formatada_usuario"): raise HTTPException(status_code=400, detail="Rede não configurada.")
+    cronometro = Cronometro()
+    with trava_fluxo:
+        cronometro.marcar("espera")
+        try:
+            rede_fluxo = db.get("rede_fluxo")
+            if rede_fluxo is None:
+                rede_fluxo = RedeFluxo.de_dicionario(db["rede_formatada_usuario"])
+                rede_fluxo.resolver(algoritmo)
+                db["rede_fluxo"], db["resultado_fluxo"] = rede_fluxo, rede_fluxo.resultado()
+                cronometro.marcar("resolucao")
+            resultado = rede_fluxo.simular([a.dict(exclude_none=True) for a in consulta.alteracoes], algoritmo, consulta.persistir)
+            cronometro.marcar("simulacao")
+        except ValueError as e: raise HTTPException(status_code=400, detail=str(e))
+        if consulta.persistir: db["resultado_fluxo"] = rede_fluxo.resultado()
+    timings = cronometro.timings()
+    FLUXO_OPERACOES.observar(timings['total_s'], operacao="simular")
+    return {**resultado, "timings": timings}
 
 @app.get("/resultados", summary="Obtém os resultados da última análise de fluxo")
 def obter_resultados():
     resultado = db.get("resultado_fluxo")
     if not resultado: raise HTTPException(status_code=404, detail="Nenhum cálculo de fluxo foi realizado.")
-    return {"rede_configurada": db.get("rede_formatada_usuario"), "analise_fluxo": resultado}
\ No newline at end of file
+    # Corte mínimo e rotas limitantes: calculados uma vez por versão da rede
+    cronometro = Cronometro()
+    with trava_fluxo:
+        cronometro.marcar("espera")
+        gargalos = db["rede_fluxo"].analisar_gargalos() if db.get("rede_fluxo") else None
+        cronometro.marcar("gargalos")
+    timings = cronometro.timings()
+    FLUXO_OPERACOES.observar(timings['total_s'], operacao="gargalos")
+    return {"rede_configurada": db.get("rede_formatada_usuario"), "analise_fluxo": resultado, "gargalos": gargalos, "timings": timings}
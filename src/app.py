@@ -3,17 +3,20 @@ import json
 import requests
 import os
 import glob
-import random
+import hashlib
 import pandas as pd
 import folium
 import streamlit.components.v1 as components
-import time
-from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
+import sys
 from datetime import datetime
 from fpdf import FPDF
 from fpdf.enums import XPos, YPos
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.core.geocodificacao import geocodificar_enderecos, criar_provedor_geocodificacao, CacheGeocodificacao
+from src.core.geometria_rotas import ServicoGeometria
+from src.core.polyline import simplificar, tolerancia_para_zoom
+
 st.set_page_config(layout="wide", page_title="Otimizador de Entregas")
 API_BASE_URL = "http://127.0.0.1:8000"
 
@@ -60,21 +63,18 @@ def gerar_relatorio_pdf(solucao, problema):
     return bytes(pdf.output())
 
 def geocode_enderecos(df):
-    st.info("Iniciando geocodificação dos endereços... Isso pode levar um tempo.")
-    geolocator = Nominatim(user_agent=f"otimizador_entregas_{random.randint(1000,9999)}")
-    geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1, error_wait_seconds=10)
-    coordenadas, progress_text, progress_bar, total = {}, st.empty(), st.progress(0), len(df)
-    for i, row in enumerate(df.itertuples(index=False)):
-        endereco_atual = row.Endereço
-        try:
-            location = geocode(f"{endereco_atual}, Maceió, AL, Brasil", timeout=20)
-            coordenadas[endereco_atual] = (location.latitude, location.longitude) if location else None
-        except Exception as e:
-            st.error(f"Erro ao geocodificar '{endereco_atual}': {e}")
-            coordenadas[endereco_atual] = None
-        progress_text.text(f"Geocodificando: {i + 1} de {total} endereços.")
-        progress_bar.progress((i + 1) / total)
-    progress_text.empty(); st.success("Geocodificação concluída!")
+    progress_text, progress_bar = st.empty(), st.progress(0)
+    def ao_progredir(feitos, total):
+        progress_text.text(f"Geocodificando: {feitos} de {total} endereços novos.")
+        progress_bar.progress(feitos / total)
+    coordenadas, estatisticas = geocodificar_enderecos(
+        list(df['Endereço']), provedor=criar_provedor_geocodificacao(), cache=CacheGeocodificacao(), ao_progredir=ao_progredir
+    )
+    for endereco, erro in estatisticas['erros'].items():
+        st.error(f"Erro ao geocodificar '{endereco}': {erro}")
+    progress_text.empty(); progress_bar.empty()
+    st.success(f"Geocodificação concluída! {estatisticas['acertos_cache'] + estatisticas['negativos_cache']} de {estatisticas['unicos']} endereços vieram do cache "
+               f"({estatisticas['taxa_acerto_cache']:.0%}), {estatisticas['consultados']} consultados em {estatisticas['tempo_s']:.1f}s.")
     return {k: v for k, v in coordenadas.items() if v}
 
 def chamar_api_roteirizacao(problema_vrp):
@@ -90,54 +90,32 @@ def chamar_api_roteirizacao(problema_vrp):
 def criar_mapa_folium(solucao, problema):
     coordenadas, deposito_nome = problema['coordenadas'], problema['nome_deposito']
     if deposito_nome not in coordenadas: return None
-    mapa = folium.Map(location=coordenadas[deposito_nome], zoom_start=14, tiles="CartoDB positron")
+    zoom = 14
+    mapa = folium.Map(location=coordenadas[deposito_nome], zoom_start=zoom, tiles="CartoDB positron")
     for nome, coord in coordenadas.items():
         if coord: folium.Marker(location=coord, popup=f"<b>{nome}</b>", icon=folium.Icon(icon='home' if nome != deposito_nome else 'truck', prefix='fa', color='blue' if nome == deposito_nome else 'orange')).add_to(mapa)
     cores = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b']
+    servico = ServicoGeometria()
+    caminhos = servico.geometrias_solucao(solucao, coordenadas)
+    if servico.falhas:
+        st.warning("Aviso: Não foi possível desenhar o caminho exato de alguns trechos. Mostrando linha reta.", icon="⚠️")
+    # Geometria simplificada para 1 px dois níveis de zoom acima do inicial: o HTML fica menor sem perda visível
+    tolerancia = tolerancia_para_zoom(zoom + 2, coordenadas[deposito_nome][0])
     for i, rota in enumerate(solucao['rotas_otimizadas']):
-        caminho = []
-        locais_rota = [p['local'] for p in rota['rota']]
-        for j in range(len(locais_rota) - 1):
-            local_atual, local_seguinte = locais_rota[j], locais_rota[j+1]
-            if local_atual in coordenadas and local_seguinte in coordenadas:
-                 time.sleep(0.2) 
-                 segmento = get_route_from_osrm(coordenadas[local_atual], coordenadas[local_seguinte])
-                 if segmento: caminho.extend(segmento)
+        caminho = caminhos.get(rota['veiculo_id'])
+        if caminho: caminho = simplificar(caminho, tolerancia).tolist()
         if caminho: folium.PolyLine(locations=caminho, color=cores[i % len(cores)], weight=5, opacity=0.8, tooltip=f"Veículo {rota['veiculo_id']}").add_to(mapa)
     return mapa
 
-def get_route_from_osrm(c1, c2):
-    if not c1 or not c2: return None
-    url = f"http://router.project-osrm.org/route/v1/driving/{c1[1]},{c1[0]};{c2[1]},{c2[0]}?overview=full&geometries=polyline"
-    try:
-        r = requests.get(url, timeout=15); r.raise_for_status(); data = r.json()
-        if data.get('code') == 'Ok' and data.get('routes'):
-            return decode_polyline(data['routes'][0]['geometry'])
-    except Exception as e:
-        st.warning(f"Aviso: Não foi possível desenhar o caminho exato. Mostrando linha reta. (Erro: {e})", icon="⚠️")
-        return [c1, c2]
-    return [c1, c2]
-
-def decode_polyline(polyline_str):
-    index, lat, lng = 0, 0, 0
-    coordinates = []
-    changes = {'lat': 0, 'lng': 0}
-    while index < len(polyline_str):
-        for unit in ['lat', 'lng']:
-            shift, result = 0, 0
-            while True:
-                if index >= len(polyline_str): return coordinates
-                byte = ord(polyline_str[index]) - 63
-                index += 1
-                result |= (byte & 0x1f) << shift
-                shift += 5
-                if not byte >= 0x20: break
-            if result & 1: changes[unit] = ~(result >> 1)
-            else: changes[unit] = (result >> 1)
-        lat += changes['lat']
-        lng += changes['lng']
-        coordinates.append((lat / 100000.0, lng / 100000.0))
-    return coordinates
+def mapa_html(solucao, problema):
+    """HTML do mapa, memorizado por hash da solução: reruns do Streamlit não refazem chamadas nem renderização."""
+    rotas = [[p['local'] for p in rota['rota']] for rota in solucao['rotas_otimizadas']]
+    chave = hashlib.sha256(json.dumps({"rotas": rotas, "coordenadas": problema['coordenadas'], "deposito": problema['nome_deposito']}, sort_keys=True).encode()).hexdigest()
+    mapas = st.session_state.setdefault('mapas_renderizados', {})
+    if chave not in mapas:
+        mapa = criar_mapa_folium(solucao, problema)
+        mapas[chave] = mapa._repr_html_() if mapa else None
+    return mapas[chave]
 
 st.title("🚚 Sistema de Otimização de Entregas")
 st.sidebar.title("⚙️ Configurações da Otimização")
@@ -210,7 +188,7 @@ if st.session_state.get('df_entregas') is not None:
     st.sidebar.markdown("---")
     if st.sidebar.button("Limpar Caches", use_container_width=True):
         data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
-        files_to_remove = glob.glob(os.path.join(data_dir, 'matriz_*.json'))
+        files_to_remove = glob.glob(os.path.join(data_dir, 'matrizes', '*.npy')) + glob.glob(os.path.join(data_dir, 'cache_matriz.sqlite*'))
         if files_to_remove:
             for f in files_to_remove: os.remove(f)
             st.sidebar.success(f"{len(files_to_remove)} caches de matrizes limpos!")
@@ -230,9 +208,9 @@ if 'solucao_vrp' in st.session_state and st.session_state['solucao_vrp']:
     if 'custo_total' in solucao:
         col3.metric("Custo Total Estimado", f"R$ {solucao['custo_total']:.2f}")
 
-    mapa = criar_mapa_folium(solucao, problema)
-    if mapa:
-        components.html(mapa._repr_html_(), height=500, scrolling=True)
+    html_mapa = mapa_html(solucao, problema)
+    if html_mapa:
+        components.html(html_mapa, height=500, scrolling=True)
     
     st.subheader("Plano de Rotas por Veículo")
     rotas_formatadas = []
@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import numpy as np
+# (cache persistente de tempo/distância por par de coordenadas)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CAMINHO_PADRAO = os.path.join(ROOT_DIR, 'data', 'cache_matriz.sqlite')
+DESCONHECIDO = -1
+
+class CacheParesMatriz:
+    """
+    Guarda tempo e distância de cada par ordenado de locais, com a chave nas
+    coordenadas arredondadas (5 casas decimais, ~1 m). Um problema novo monta
+    a matriz a partir dos pares já conhecidos, mesmo que o conjunto de
+    locais não seja idêntico ao de uma execução anterior.
+    """
+    def __init__(self, caminho: str = None, casas_decimais: int = 5):
+        self.caminho = caminho or CAMINHO_PADRAO
+        self.escala = 10 ** casas_decimais
+        self.conexao = sqlite3.connect(self.caminho, timeout=30)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute(
+            "CREATE TABLE IF NOT EXISTS pares ("
+            " lat1 INTEGER, lon1 INTEGER, lat2 INTEGER, lon2 INTEGER,"
+            " tempo INTEGER NOT NULL, distancia INTEGER NOT NULL,"
+            " PRIMARY KEY (lat1, lon1, lat2, lon2)) WITHOUT ROWID"
+        )
+        self.conexao.commit()
+
+    def _chave(self, coord):
+        return round(coord[0] * self.escala), round(coord[1] * self.escala)
+
+    def buscar(self, coordenadas: list):
+        """
+        Devolve (tempo, distancia) como arrays int32 NxN, com DESCONHECIDO
+        nos pares que ainda não estão no cache. A diagonal é sempre 0.
+        """
+        n = len(coordenadas)
+        tempo = np.full((n, n), DESCONHECIDO, dtype=np.int32)
+        distancia = np.full((n, n), DESCONHECIDO, dtype=np.int32)
+        np.fill_diagonal(tempo, 0)
+        np.fill_diagonal(distancia, 0)
+
+        cur = self.conexao.cursor()
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS locais (idx INTEGER, lat INTEGER, lon INTEGER)")
+        cur.execute("DELETE FROM locais")
+        cur.executemany("INSERT INTO locais VALUES (?, ?, ?)", [(i, *self._chave(c)) for i, c in enumerate(coordenadas)])
+        cur.execute(
+            "SELECT a.idx, b.idx, p.tempo, p.distancia FROM locais a, locais b"
+            " JOIN pares p ON p.lat1 = a.lat AND p.lon1 = a.lon AND p.lat2 = b.lat AND p.lon2 = b.lon"
+            " WHERE a.idx != b.idx"
+        )
+        linhas = np.array(cur.fetchall(), dtype=np.int64).reshape(-1, 4)
+        # Fecha a transação de leitura: se ficasse aberta, o salvar() seguinte
+        # falharia com "database is locked" quando outro processo gravasse antes
+        self.conexao.commit()
+        tempo[linhas[:, 0], linhas[:, 1]] = linhas[:, 2]
+        distancia[linhas[:, 0], linhas[:, 1]] = linhas[:, 3]
+        return tempo, distancia
+
+    def salvar(self, pares: list):
+        """Grava uma lista de (coord_origem, coord_destino, tempo, distancia)."""
+        self.conexao.executemany(
+            "INSERT OR REPLACE INTO pares VALUES (?, ?, ?, ?, ?, ?)",
+            [(*self._chave(c1), *self._chave(c2), int(t), int(d)) for c1, c2, t, d in pares]
+        )
+        self.conexao.commit()
+
+    def amostrar(self, limite: int = 200_000):
+        """
+        Até `limite` pares aleatórios do cache, como (origens, destinos,
+        tempo, distancia): coordenadas em arrays Nx2 (lat, lon) e valores
+        em arrays int64. Base para calibrar o estimador offline.
+        """
+        linhas = self.conexao.execute(
+            "SELECT lat1, lon1, lat2, lon2, tempo, distancia FROM pares ORDER BY RANDOM() LIMIT ?", (int(limite),)
+        ).fetchall()
+        self.conexao.commit()
+        pares = np.array(linhas, dtype=np.int64).reshape(-1, 6)
+        return pares[:, 0:2] / self.escala, pares[:, 2:4] / self.escala, pares[:, 4], pares[:, 5]
+
+    def fechar(self):
+        self.conexao.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        self.fechar()
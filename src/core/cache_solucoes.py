@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+# (cache de soluções do VRP para requisições repetidas)
+
+# Mudanças no modelo do solver que alteram as soluções devem incrementar a versão
+VERSAO_SOLVER = 1
+
+def _normalizar(valor):
+    """Forma canônica: dicts ordenados, tuplas como listas, floats arredondados e vazios como None."""
+    if isinstance(valor, dict):
+        return {str(k): _normalizar(v) for k, v in sorted(valor.items(), key=lambda item: str(item[0]))} or None
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(v) for v in valor] or None
+    if isinstance(valor, float):
+        return int(valor) if valor.is_integer() else round(valor, 6)
+    return valor
+
+def chave_canonica(dados_problema: dict, parametros_solver: dict = None) -> str:
+    """
+    Hash SHA-256 do problema normalizado (coordenadas, demandas, janelas,
+    custos, frota, balanceamento...) e dos parâmetros do solver. A ordem
+    das chaves e a forma de envio (tupla/lista, 0 / 0.0, None / {}) não
+    mudam a chave.
+    """
+    dados = dict(dados_problema)
+    if dados.get('balancear_carga_por') == 'nenhum':
+        dados['balancear_carga_por'] = None
+    canonico = {"problema": _normalizar(dados), "parametros": _normalizar(parametros_solver or {}), "versao": VERSAO_SOLVER}
+    return hashlib.sha256(json.dumps(canonico, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+class CacheSolucoes:
+    """
+    Cache LRU com TTL e limite de itens. Com `diretorio`, cada solução é
+    gravada em <chave>.json e o cache sobrevive a reinícios da API.
+    """
+    def __init__(self, max_itens: int = 256, ttl_segundos: float = 3600, diretorio: str = None):
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self.diretorio = diretorio
+        self.acertos = 0
+        self.falhas = 0
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+            self._carregar_do_disco()
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.diretorio, f"{chave}.json")
+
+    def _carregar_do_disco(self):
+        entradas = []
+        for nome in os.listdir(self.diretorio):
+            if not nome.endswith('.json'): continue
+            try:
+                with open(os.path.join(self.diretorio, nome), 'r', encoding='utf-8') as f:
+                    entrada = json.load(f)
+                entradas.append((entrada['criado_em'], nome[:-len('.json')], entrada['solucao']))
+            except (OSError, ValueError, KeyError):
+                continue
+        for criado_em, chave, solucao in sorted(entradas, key=lambda e: e[0]):
+            self._inserir(chave, solucao, criado_em, persistir=False)
+        self._remover_expirados()
+
+    def _expirado(self, criado_em: float) -> bool:
+        return time.time() - criado_em > self.ttl_segundos
+
+    def _remover(self, chave: str):
+        self._itens.pop(chave, None)
+        if self.diretorio:
+            try: os.remove(self._caminho(chave))
+            except FileNotFoundError: pass
+
+    def _remover_expirados(self):
+        for chave in [c for c, (criado_em, _) in self._itens.items() if self._expirado(criado_em)]:
+            self._remover(chave)
+
+    def _inserir(self, chave: str, solucao: dict, criado_em: float, persistir: bool = True):
+        self._itens[chave] = (criado_em, solucao)
+        self._itens.move_to_end(chave)
+        if persistir and self.diretorio:
+            temporario = f"{self._caminho(chave)}.tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump({"criado_em": criado_em, "solucao": solucao}, f)
+            os.replace(temporario, self._caminho(chave))
+        while len(self._itens) > self.max_itens:
+            self._remover(next(iter(self._itens)))
+
+    def obter(self, chave: str):
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is None or self._expirado(item[0]):
+                if item is not None: self._remover(chave)
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[1]
+
+    def guardar(self, chave: str, solucao: dict):
+        with self._trava:
+            self._inserir(chave, solucao, time.time())
+
+    def limpar(self):
+        with self._trava:
+            for chave in list(self._itens):
+                self._remover(chave)
+
+    def estatisticas(self) -> dict:
+        total = self.acertos + self.falhas
+        return {
+            "itens": len(self._itens), "max_itens": self.max_itens, "ttl_segundos": self.ttl_segundos,
+            "acertos": self.acertos, "falhas": self.falhas,
+            "taxa_acerto": round(self.acertos / total, 4) if total else 0.0,
+        }
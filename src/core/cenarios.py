@@ -0,0 +1,105 @@
+import copy
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.core.solucionador_vrp import SolucionadorVRP
+# (varredura de cenários do VRP: matrizes carregadas uma vez, cenários resolvidos em paralelo)
+
+MAX_CENARIOS = 500
+
+# Variações aceitas na grade e como cada uma é aplicada ao problema base
+VARIACOES = ("num_veiculos", "capacidade_veiculo", "multiplicador_demanda", "custo_km", "custo_hora", "tempo_servico")
+
+def gerar_cenarios(grade: dict) -> list:
+    """
+    Produto cartesiano da grade, ex.: {"num_veiculos": [3, 4], "multiplicador_demanda": [1.0, 1.5]}
+    gera 4 cenários. Cada cenário é {"nome": ..., "variacoes": {...}}.
+    """
+    desconhecidas = set(grade) - set(VARIACOES)
+    if desconhecidas:
+        raise ValueError(f"Variações desconhecidas: {', '.join(sorted(desconhecidas))}. Opções: {', '.join(VARIACOES)}.")
+    chaves = [c for c in VARIACOES if grade.get(c)]
+    combinacoes = list(itertools.product(*(grade[c] for c in chaves)))
+    if len(combinacoes) > MAX_CENARIOS:
+        raise ValueError(f"A grade gera {len(combinacoes)} cenários (máximo {MAX_CENARIOS}).")
+    cenarios = []
+    for valores in combinacoes:
+        variacoes = dict(zip(chaves, valores))
+        cenarios.append({"nome": ", ".join(f"{c}={v}" for c, v in variacoes.items()) or "base", "variacoes": variacoes})
+    return cenarios
+
+def aplicar_cenario(problema_base: dict, variacoes: dict) -> dict:
+    """Cópia do problema base com as variações aplicadas (a demanda do depósito continua zero)."""
+    dados = copy.deepcopy(problema_base)
+    for chave, valor in variacoes.items():
+        if chave == "multiplicador_demanda":
+            dados['demandas'] = {local: (int(round(d * valor)) if local != dados['nome_deposito'] else 0) for local, d in dados['demandas'].items()}
+        elif chave in VARIACOES:
+            dados[chave] = valor
+        else:
+            raise ValueError(f"Variação desconhecida: '{chave}'.")
+    return dados
+
+
+# Matrizes do processo worker, recebidas uma vez na criação do processo
+_MATRIZES_WORKER = None
+
+def _iniciar_worker(matriz_tempo, matriz_distancia):
+    global _MATRIZES_WORKER
+    _MATRIZES_WORKER = (matriz_tempo, matriz_distancia)
+
+def _resolver_cenario(dados: dict):
+    return SolucionadorVRP(dados, matrizes=_MATRIZES_WORKER).resolver()
+
+def resumir(cenario: dict, solucao: dict) -> dict:
+    resumo = {"nome": cenario['nome'], "variacoes": cenario['variacoes'], "viavel": bool(solucao)}
+    if solucao:
+        paradas = sum(len(rota['rota']) - 1 for rota in solucao['rotas_otimizadas'])
+        resumo.update({
+            "custo_total": round(solucao['custo_total'], 2), "distancia_total_metros": solucao['distancia_total_metros'],
+            "veiculos_usados": len(solucao['rotas_otimizadas']), "paradas_atendidas": paradas,
+            "tempo_busca_s": solucao['metricas'].get('tempo_busca_s'),
+        })
+        if solucao.get('perfil'): resumo['perfil'] = solucao['perfil']['id']
+    return resumo
+
+def executar_cenarios(problema_base: dict, cenarios: list, max_workers: int = None, solver=None):
+    """
+    Gerador: resolve os cenários em processos paralelos e devolve
+    (indice, cenario, solucao, erro) à medida que cada um termina. As
+    matrizes de tempo e distância são montadas uma vez aqui (todos os
+    cenários têm as mesmas coordenadas) e enviadas a cada worker na criação
+    do processo, sem nova consulta ao cache nem ao provedor. Com
+    `max_workers=1` os cenários rodam em sequência neste processo (é o caso
+    de um job da API, que já ocupa um processo do pool de jobs).
+    """
+    solver = solver or SolucionadorVRP(problema_base)
+    matriz_tempo, matriz_distancia = solver._criar_matrizes()
+    max_workers = max(1, min(max_workers or int(os.environ.get("VRP_CENARIOS_WORKERS", os.cpu_count() or 2)), len(cenarios)))
+    print(f"🧪 Resolvendo {len(cenarios)} cenários em até {max_workers} processos...")
+    if max_workers == 1:
+        for i, c in enumerate(cenarios):
+            try:
+                yield i, c, SolucionadorVRP(aplicar_cenario(problema_base, c['variacoes']), matrizes=(matriz_tempo, matriz_distancia)).resolver(), None
+            except Exception as e:
+                yield i, c, None, str(e)
+        return
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_iniciar_worker, initargs=(matriz_tempo, matriz_distancia)) as pool:
+        futures = {pool.submit(_resolver_cenario, aplicar_cenario(problema_base, c['variacoes'])): i for i, c in enumerate(cenarios)}
+        for future in as_completed(futures):
+            i = futures[future]
+            erro = future.exception()
+            yield i, cenarios[i], (None if erro else future.result()), (str(erro) if erro else None)
+
+def simular_cenarios(problema_base: dict, grade: dict = None, cenarios: list = None, max_workers: int = None, incluir_solucoes: bool = False, solver=None) -> dict:
+    """Roda a grade (ou a lista de cenários) e devolve os resumos na ordem dos cenários."""
+    inicio = time.perf_counter()
+    cenarios = cenarios if cenarios is not None else gerar_cenarios(grade or {})
+    resultados = [None] * len(cenarios)
+    for i, cenario, solucao, erro in executar_cenarios(problema_base, cenarios, max_workers, solver):
+        resultados[i] = resumir(cenario, solucao)
+        if erro: resultados[i]['erro'] = erro
+        if incluir_solucoes: resultados[i]['solucao'] = solucao
+    return {"cenarios": resultados, "tempo_total_s": round(time.perf_counter() - inicio, 3)}
@@ -0,0 +1,313 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from src.core.metricas import Cronometro
+from src.core.solucionador_vrp import SolucionadorVRP, processos_por_job, resolver_problema
+# (modo de decomposição do VRP: clusters por varredura, sub-problemas em paralelo e reparo nas fronteiras)
+
+# Acima deste número de paradas o modelo único do OR-Tools deixa de dar
+# boas soluções no tempo limite (e a matriz NxN fica cara demais)
+LIMIAR_DECOMPOSICAO = int(os.environ.get("VRP_LIMIAR_DECOMPOSICAO", 400))
+MAX_PARADAS_CLUSTER = 150
+ROTAS_FRONTEIRA = 2          # rotas de cada lado da fronteira que entram no reparo
+MAX_PASSADAS_REPARO = 50
+
+# Campos do problema que valem por parada e precisam ser recortados por cluster
+_CAMPOS_POR_PARADA = ('coordenadas', 'demandas', 'janelas_de_tempo', 'prioridades')
+_CAMPOS_IGNORADOS = ('plano_anterior', 'portfolio', 'decomposicao', 'max_paradas_cluster', 'num_veiculos')
+
+def usar_decomposicao(dados: dict) -> bool:
+    """`decomposicao` explícito no problema ou, se ausente, automático acima de LIMIAR_DECOMPOSICAO paradas."""
+    if dados.get('decomposicao') is not None:
+        return bool(dados['decomposicao'])
+    return len(dados['coordenadas']) - 1 > LIMIAR_DECOMPOSICAO
+
+def _angulos(dados: dict, paradas: list) -> np.ndarray:
+    lat0, lon0 = dados['coordenadas'][dados['nome_deposito']]
+    coords = np.array([dados['coordenadas'][p] for p in paradas], dtype=np.float64).reshape(-1, 2)
+    return np.arctan2(coords[:, 0] - lat0, (coords[:, 1] - lon0) * math.cos(math.radians(lat0)))
+
+def particionar_paradas(dados: dict, max_paradas: int = None) -> list:
+    """
+    Varredura angular em torno do depósito, começando no maior vão entre
+    paradas vizinhas: cada cluster é uma fatia contígua com parte parecida
+    da demanda total e no máximo `max_paradas` paradas. Nunca há mais
+    clusters que veículos: com frota pequena, fatias vizinhas são juntadas
+    e o cluster passa de `max_paradas`. Devolve as listas de paradas na
+    ordem da varredura.
+    """
+    max_paradas = max_paradas or MAX_PARADAS_CLUSTER
+    deposito = dados['nome_deposito']
+    paradas = [nome for nome in dados['coordenadas'] if nome != deposito]
+    if not paradas: return []
+    angulos = _angulos(dados, paradas)
+    ordem = np.argsort(angulos, kind='stable')
+    ordenados = angulos[ordem]
+    vaos = np.append(np.diff(ordenados), ordenados[0] + 2 * math.pi - ordenados[-1])
+    ordem = np.roll(ordem, -((int(np.argmax(vaos)) + 1) % len(ordem)))
+
+    # Fatias pelos quantis da demanda acumulada ao longo da varredura (sem
+    # demanda, pelo número de paradas); fatias acima de max_paradas são
+    # divididas em partes iguais
+    pesos = np.array([dados['demandas'].get(paradas[i], 0) for i in ordem], dtype=np.float64)
+    if not pesos.sum(): pesos[:] = 1
+    num_clusters = min(dados['num_veiculos'], max(1, math.ceil(len(paradas) / max_paradas)))
+    meio = np.cumsum(pesos) - pesos / 2
+    fatia = np.minimum((meio / pesos.sum() * num_clusters).astype(int), num_clusters - 1)
+    clusters = []
+    for k in range(num_clusters):
+        membros = [paradas[i] for i in ordem[fatia == k]]
+        partes = math.ceil(len(membros) / max_paradas)
+        clusters += [list(parte) for parte in np.array_split(membros, partes)] if partes > 1 else ([membros] if membros else [])
+    # A divisão pode criar mais clusters que veículos: junta o par vizinho menor
+    while len(clusters) > dados['num_veiculos']:
+        i = min(range(len(clusters) - 1), key=lambda i: len(clusters[i]) + len(clusters[i + 1]))
+        clusters[i:i + 2] = [clusters[i] + clusters[i + 1]]
+    return clusters
+
+def alocar_veiculos(demandas_clusters: list, num_veiculos: int, capacidade: int) -> list:
+    """
+    Veículos por cluster, somando no máximo `num_veiculos`: primeiro o
+    mínimo que carrega a demanda de cada um; as sobras vão, uma a uma, para
+    o cluster com mais demanda por veículo. Se a frota não cobre o mínimo,
+    cada cluster recebe um veículo (os de maior demanda primeiro; com mais
+    clusters que veículos, os restantes ficam com zero e não são atendidos)
+    e o resto segue a mesma regra das sobras.
+    """
+    minimos = [max(1, math.ceil(d / capacidade)) for d in demandas_clusters]
+    if sum(minimos) > num_veiculos:
+        veiculos = [0] * len(demandas_clusters)
+        for i in sorted(range(len(veiculos)), key=lambda i: demandas_clusters[i], reverse=True)[:num_veiculos]:
+            veiculos[i] = 1
+    else:
+        veiculos = minimos
+    for _ in range(num_veiculos - sum(veiculos)):
+        i = max(range(len(veiculos)), key=lambda i: demandas_clusters[i] / veiculos[i])
+        veiculos[i] += 1
+    return veiculos
+
+def montar_subproblema(dados: dict, paradas: list, num_veiculos: int) -> dict:
+    nomes = set(paradas) | {dados['nome_deposito']}
+    sub = {chave: valor for chave, valor in dados.items() if chave not in _CAMPOS_POR_PARADA + _CAMPOS_IGNORADOS}
+    sub['coordenadas'] = {nome: dados['coordenadas'][nome] for nome in [dados['nome_deposito']] + paradas}
+    sub['demandas'] = {nome: d for nome, d in dados['demandas'].items() if nome in nomes}
+    for campo in ('janelas_de_tempo', 'prioridades'):
+        if dados.get(campo): sub[campo] = {nome: v for nome, v in dados[campo].items() if nome in nomes}
+    sub['num_veiculos'] = num_veiculos
+    return sub
+
+
+class _ReparoFronteira:
+    """
+    Busca local (realocação e troca de paradas) nas rotas dos dois lados da
+    fronteira entre clusters vizinhos. As matrizes cobrem só o depósito e
+    as paradas dessas rotas, vindas do cache de pares (e do provedor para
+    os pares entre clusters que ainda não existirem).
+    """
+    def __init__(self, dados: dict, rotas: list):
+        self.dados, self.rotas = dados, rotas
+        deposito = dados['nome_deposito']
+        nomes = [deposito] + [p['local'] for rota in rotas for p in rota['rota'] if p['local'] != deposito]
+        self.nomes = nomes
+        self.solver = SolucionadorVRP(montar_subproblema(dados, nomes[1:], 1))
+        self.tempo, self.distancia = self.solver._criar_matrizes()
+        custo, self.tempo_arcos, _ = self.solver._matrizes_de_transito(self.tempo, self.distancia)
+        # Sem custo por km/hora, o critério passa a ser a distância
+        self.criterio = "custo" if np.any(custo) else "distancia"
+        custo = custo if self.criterio == "custo" else np.array(self.distancia, dtype=np.int64)
+        # Como em _formatar_solucao, a volta ao depósito não entra no custo da rota
+        custo[:, 0] = 0
+        self.custo = custo.tolist()
+        indice = {nome: i for i, nome in enumerate(nomes)}
+        self.sequencias = [[indice[p['local']] for p in rota['rota'] if p['local'] != deposito] for rota in rotas]
+        self.demandas = [dados['demandas'].get(nome, 0) for nome in nomes]
+
+    def otimizar(self) -> dict:
+        """Primeira melhoria, com o custo de cada movimento calculado só nas arestas que mudam."""
+        capacidade, c, demandas = self.dados['capacidade_veiculo'], self.custo, self.demandas
+        seqs = [[0] + s + [0] for s in self.sequencias]  # com o depósito nas pontas
+        cargas = [sum(demandas[i] for i in s) for s in seqs]
+        movimentos, reducao = 0, 0
+        for _ in range(MAX_PASSADAS_REPARO):
+            melhorou = False
+            for a in range(len(seqs)):
+                for b in range(len(seqs)):
+                    if a == b: continue
+                    # Realocação: tira a parada de a e insere na melhor posição de b
+                    pos = 1
+                    while pos < len(seqs[a]) - 1:
+                        sa, sb = seqs[a], seqs[b]
+                        i = sa[pos]
+                        if cargas[b] + demandas[i] <= capacidade:
+                            economia = c[sa[pos - 1]][i] + c[i][sa[pos + 1]] - c[sa[pos - 1]][sa[pos + 1]]
+                            melhor, onde = 0, None
+                            for k in range(len(sb) - 1):
+                                ganho = economia - (c[sb[k]][i] + c[i][sb[k + 1]] - c[sb[k]][sb[k + 1]])
+                                if ganho > melhor: melhor, onde = ganho, k
+                            if onde is not None:
+                                del sa[pos]
+                                sb.insert(onde + 1, i)
+                                cargas[a] -= demandas[i]; cargas[b] += demandas[i]
+                                movimentos += 1; reducao += melhor; melhorou = True
+                                continue
+                        pos += 1
+                    if a > b: continue
+                    # Troca: uma parada de a pela de b, cada uma na posição da outra
+                    sa, sb = seqs[a], seqs[b]
+                    for pa in range(1, len(sa) - 1):
+                        for pb in range(1, len(sb) - 1):
+                            i, j = sa[pa], sb[pb]
+                            delta_carga = demandas[j] - demandas[i]
+                            if cargas[a] + delta_carga > capacidade or cargas[b] - delta_carga > capacidade: continue
+                            ganho = (c[sa[pa - 1]][i] + c[i][sa[pa + 1]] - c[sa[pa - 1]][j] - c[j][sa[pa + 1]]
+                                     + c[sb[pb - 1]][j] + c[j][sb[pb + 1]] - c[sb[pb - 1]][i] - c[i][sb[pb + 1]])
+                            if ganho > 0:
+                                sa[pa], sb[pb] = j, i
+                                cargas[a] += delta_carga; cargas[b] -= delta_carga
+                                movimentos += 1; reducao += ganho; melhorou = True
+            if not melhorou: break
+        self.sequencias = [s[1:-1] for s in seqs]
+        return {"movimentos": movimentos, "criterio": self.criterio, "reducao": int(reducao)}
+
+    def rotas_atualizadas(self) -> list:
+        """Rotas no formato de _formatar_solucao (o retorno ao depósito não entra na distância nem no custo)."""
+        tempo_servico = self.dados.get('tempo_servico') or 0
+        custo_km, custo_hora = self.dados.get('custo_km') or 0, self.dados.get('custo_hora') or 0
+        rotas = []
+        for rota, seq in zip(self.rotas, self.sequencias):
+            if not seq: continue
+            pontos, chegada, distancia, custo, anterior = [], 0, 0, 0.0, 0
+            for i in [0] + seq:
+                if i:
+                    dist_arco = int(self.distancia[anterior, i])
+                    tempo_arco = int(self.tempo[anterior, i]) + tempo_servico
+                    chegada += int(self.tempo_arcos[anterior, i])
+                    distancia += dist_arco
+                    custo += dist_arco / 1000.0 * custo_km + tempo_arco / 3600.0 * custo_hora
+                pontos.append({"local": self.nomes[i], "horario_chegada": f"{chegada // 3600:02d}:{(chegada % 3600) // 60:02d}"})
+                anterior = i
+            rotas.append({**rota, 'rota': pontos, 'distancia_metros': distancia, 'carga_total': sum(self.demandas[i] for i in seq), 'custo_rota': custo})
+        return rotas
+
+
+def _fronteiras(clusters: list, rotas_por_cluster: list, dados: dict):
+    """Para cada par de clusters vizinhos na varredura, as rotas de cada lado mais próximas da fronteira."""
+    for a in range(len(clusters) - 1):
+        b = a + 1
+        if not rotas_por_cluster[a] or not rotas_por_cluster[b]: continue
+        # A fronteira fica entre a última parada de a e a primeira de b
+        limite = _angulos(dados, [clusters[a][-1], clusters[b][0]]).mean()
+        escolhidas = []
+        for c in (a, b):
+            distancia_angular = lambda rota: np.abs(np.angle(np.exp(1j * (_angulos(dados, [p['local'] for p in rota['rota'] if p['local'] != dados['nome_deposito']]) - limite)))).min()
+            escolhidas += sorted(rotas_por_cluster[c], key=distancia_angular)[:ROTAS_FRONTEIRA]
+        yield a, b, escolhidas
+
+def _resolver_subproblemas(subproblemas: dict, max_workers: int):
+    """(indice, solucao, erro) de cada sub-problema à medida que termina; com um worker, em sequência neste processo."""
+    if max_workers == 1:
+        for i, dados in subproblemas.items():
+            try:
+                yield i, resolver_problema(dados), None
+            except Exception as e:
+                yield i, None, str(e)
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(resolver_problema, dados): i for i, dados in subproblemas.items()}
+        for future in as_completed(futures):
+            erro = future.exception()
+            yield futures[future], (None if erro else future.result()), (str(erro) if erro else None)
+
+def resolver_decomposto(dados_problema: dict, max_paradas_cluster: int = None, max_workers: int = None, reparar: bool = True):
+    """
+    Resolve instâncias grandes por partes: agrupa as paradas por varredura
+    angular e capacidade, divide a frota pela demanda de cada cluster,
+    resolve os sub-problemas (cada um com a sua matriz, bem menor que a
+    NxN) e, no fim, realoca e troca paradas entre as rotas vizinhas de
+    clusters adjacentes. Com janelas de tempo o reparo é pulado, porque ele
+    não reavalia os horários. Sem `max_workers`, os sub-problemas usam
+    processos_por_job("VRP_DECOMPOSICAO_WORKERS") processos; com um só,
+    rodam em sequência no processo que chamou (ex.: um job da API).
+    """
+    inicio = time.perf_counter()
+    cronometro = Cronometro()
+    max_paradas_cluster = max_paradas_cluster or dados_problema.get('max_paradas_cluster') or MAX_PARADAS_CLUSTER
+    clusters = particionar_paradas(dados_problema, max_paradas_cluster)
+    demandas = [sum(dados_problema['demandas'].get(p, 0) for p in c) for c in clusters]
+    veiculos = alocar_veiculos(demandas, dados_problema['num_veiculos'], dados_problema['capacidade_veiculo'])
+    max_workers = max(1, min(max_workers or processos_por_job("VRP_DECOMPOSICAO_WORKERS"), len(clusters)))
+    cronometro.marcar("particao")
+    print(f"🧩 Decomposição: {len(clusters)} clusters (até {max_paradas_cluster} paradas) em até {max_workers} processos...")
+
+    resumo = [{"paradas": len(c), "demanda": d, "veiculos": v, "status": "sem_solucao" if v else "sem_veiculos"} for c, d, v in zip(clusters, demandas, veiculos)]
+    solucoes = [None] * len(clusters)
+    subproblemas = {i: montar_subproblema(dados_problema, c, v) for i, (c, v) in enumerate(zip(clusters, veiculos)) if v}
+    for i, solucao, erro in _resolver_subproblemas(subproblemas, max_workers):
+        if erro:
+            resumo[i].update(status="erro", erro=erro)
+        elif solucao:
+            solucoes[i] = solucao
+            resumo[i].update(status="ok", objetivo=solucao['metricas'].get('objetivo'), tempo_busca_s=solucao['metricas'].get('tempo_busca_s'))
+            if solucao.get('perfil'): resumo[i]['perfil'] = solucao['perfil']['id']
+
+    cronometro.marcar("clusters")
+
+    # Veículos renumerados em faixas por cluster, na ordem da varredura
+    rotas_por_cluster, primeiro_veiculo = [], 0
+    for i, solucao in enumerate(solucoes):
+        rotas = [] if solucao is None else [{**rota, 'veiculo_id': primeiro_veiculo + rota['veiculo_id'], 'cluster': i} for rota in solucao['rotas_otimizadas']]
+        rotas_por_cluster.append(rotas)
+        primeiro_veiculo += veiculos[i]
+
+    reparo = {"pares_de_clusters": 0, "movimentos": 0, "reducao": 0, "criterio": None}
+    if not reparar or dados_problema.get('janelas_de_tempo'):
+        reparo['ignorado'] = True
+    else:
+        for a, b, escolhidas in _fronteiras(clusters, rotas_por_cluster, dados_problema):
+            reparador = _ReparoFronteira(dados_problema, escolhidas)
+            resultado = reparador.otimizar()
+            reparo['pares_de_clusters'] += 1
+            reparo['movimentos'] += resultado['movimentos']
+            reparo['reducao'] += resultado['reducao']
+            reparo['criterio'] = resultado['criterio']
+            if resultado['movimentos']:
+                ids = {id(rota) for rota in escolhidas}
+                novas = {rota['veiculo_id']: rota for rota in reparador.rotas_atualizadas()}
+                for c in (a, b):
+                    rotas_por_cluster[c] = [novas.get(rota['veiculo_id']) if id(rota) in ids else rota for rota in rotas_por_cluster[c]]
+                    rotas_por_cluster[c] = [rota for rota in rotas_por_cluster[c] if rota is not None]
+
+    cronometro.marcar("reparo")
+    rotas = sorted((rota for rotas in rotas_por_cluster for rota in rotas), key=lambda rota: rota['veiculo_id'])
+    atendidas = {p['local'] for rota in rotas for p in rota['rota']}
+    if not rotas: return None
+    metricas = {
+        "tempo_busca_s": round(time.perf_counter() - inicio, 3),
+        # Das rotas finais (depois do reparo), com o custo das rotas formatadas, na escala do objetivo do solver
+        "objetivo": int(round(sum(rota['custo_rota'] for rota in rotas) * SolucionadorVRP.FATOR_CUSTO)),
+        "paradas_nao_atendidas": len(set(dados_problema['coordenadas']) - atendidas),
+        "pares_total": sum(s['metricas'].get('pares_total', 0) for s in solucoes if s),
+        "pares_cache": sum(s['metricas'].get('pares_cache', 0) for s in solucoes if s),
+        "decomposicao": {"clusters": resumo, "reparo_fronteira": reparo},
+    }
+    # Fases dos sub-problemas somadas (rodam em paralelo, então podem passar de clusters_s)
+    subproblemas = {}
+    for solucao in filter(None, solucoes):
+        for fase, duracao in solucao.get('timings', {}).items():
+            if fase.endswith('_s') and fase != 'http_s': subproblemas[fase] = round(subproblemas.get(fase, 0) + duracao, 4)
+    solucao = {
+        'rotas_otimizadas': rotas,
+        'distancia_total_metros': int(sum(rota['distancia_metros'] for rota in rotas)),
+        'custo_total': sum(rota['custo_rota'] for rota in rotas),
+        'metricas': metricas,
+        'timings': cronometro.timings(subproblemas=subproblemas, http_s=[d for s in solucoes if s for d in s.get('timings', {}).get('http_s', [])],
+                                      provedor_matriz=next((s['timings']['provedor_matriz'] for s in solucoes if s and s.get('timings', {}).get('provedor_matriz')), None)),
+    }
+    # Com profile, cada sub-problema tem o seu perfil (um por cluster, na ordem da varredura)
+    if dados_problema.get('profile'):
+        solucao['perfil'] = {"clusters": [r.get('perfil') for r in resumo]}
+    return solucao
@@ -0,0 +1,427 @@
+import heapq
+import time
+from collections import deque
+# (motor de fluxo máximo em processo, substitui a API Java do Dev 2)
+
+class GrafoResidual:
+    """
+    Grafo residual em estrela direta (listas planas de arcos).
+    O arco 2k é o sentido de ida de uma aresta e o 2k+1 é o seu reverso,
+    então o fluxo de uma aresta é sempre a capacidade residual do reverso.
+    """
+    def __init__(self, num_nos: int):
+        self.num_nos = num_nos
+        self.cabeca = [-1] * num_nos
+        self.prox = []
+        self.destino = []
+        self.residual = []
+
+    def adicionar_aresta(self, u: int, v: int, capacidade: int) -> int:
+        """Adiciona a aresta u->v e devolve o índice do arco de ida."""
+        arco = len(self.destino)
+        self.destino.append(v); self.residual.append(capacidade)
+        self.prox.append(self.cabeca[u]); self.cabeca[u] = arco
+        self.destino.append(u); self.residual.append(0)
+        self.prox.append(self.cabeca[v]); self.cabeca[v] = arco + 1
+        return arco
+
+    def origem_do_arco(self, arco: int) -> int:
+        return self.destino[arco ^ 1]
+
+    def fluxo_do_arco(self, arco: int) -> int:
+        return self.residual[arco ^ 1]
+
+    def capacidade_do_arco(self, arco: int) -> int:
+        """Capacidade atual de um arco de ida (o reverso começa com zero)."""
+        return self.residual[arco] + self.residual[arco ^ 1]
+
+
+def edmonds_karp(grafo: GrafoResidual, s: int, t: int, limite=None) -> int:
+    """Caminhos aumentantes mínimos via BFS. Devolve o fluxo enviado de s para t."""
+    if s == t: return 0
+    cabeca, prox, destino, residual = grafo.cabeca, grafo.prox, grafo.destino, grafo.residual
+    total = 0
+    while limite is None or total < limite:
+        arco_pai = [-1] * grafo.num_nos
+        arco_pai[s] = -2
+        fila = deque([s])
+        while fila and arco_pai[t] == -1:
+            u = fila.popleft()
+            e = cabeca[u]
+            while e != -1:
+                v = destino[e]
+                if residual[e] > 0 and arco_pai[v] == -1:
+                    arco_pai[v] = e
+                    fila.append(v)
+                e = prox[e]
+        if arco_pai[t] == -1:
+            break
+
+        gargalo = None if limite is None else limite - total
+        v = t
+        while v != s:
+            e = arco_pai[v]
+            if gargalo is None or residual[e] < gargalo: gargalo = residual[e]
+            v = destino[e ^ 1]
+        v = t
+        while v != s:
+            e = arco_pai[v]
+            residual[e] -= gargalo
+            residual[e ^ 1] += gargalo
+            v = destino[e ^ 1]
+        total += gargalo
+    return total
+
+
+def dinic(grafo: GrafoResidual, s: int, t: int, limite=None) -> int:
+    """Algoritmo de Dinic (grafo de níveis + fluxo bloqueante com DFS iterativa)."""
+    if s == t: return 0
+    cabeca, prox, destino, residual = grafo.cabeca, grafo.prox, grafo.destino, grafo.residual
+    total = 0
+    while limite is None or total < limite:
+        nivel = [-1] * grafo.num_nos
+        nivel[s] = 0
+        fila = deque([s])
+        while fila:
+            u = fila.popleft()
+            e = cabeca[u]
+            while e != -1:
+                v = destino[e]
+                if residual[e] > 0 and nivel[v] < 0:
+                    nivel[v] = nivel[u] + 1
+                    fila.append(v)
+                e = prox[e]
+        if nivel[t] < 0:
+            break
+
+        atual = cabeca[:]
+        caminho = []
+        u = s
+        while True:
+            if u == t:
+                gargalo = None if limite is None else limite - total
+                for e in caminho:
+                    if gargalo is None or residual[e] < gargalo: gargalo = residual[e]
+                for e in caminho:
+                    residual[e] -= gargalo
+                    residual[e ^ 1] += gargalo
+                total += gargalo
+                if limite is not None and total >= limite:
+                    break
+                # Recua até antes do primeiro arco saturado do caminho
+                k = 0
+                while residual[caminho[k]] > 0: k += 1
+                del caminho[k:]
+                u = destino[caminho[-1]] if caminho else s
+                continue
+
+            e = atual[u]
+            while e != -1 and (residual[e] == 0 or nivel[destino[e]] != nivel[u] + 1):
+                e = prox[e]
+            atual[u] = e
+            if e != -1:
+                caminho.append(e)
+                u = destino[e]
+                continue
+
+            # Beco sem saída: poda o nó e recua um arco
+            if u == s: break
+            nivel[u] = -1
+            e = caminho.pop()
+            u = destino[e ^ 1]
+            atual[u] = prox[atual[u]]
+    return total
+
+
+ALGORITMOS = {
+    "edmonds_karp": edmonds_karp,
+    "dinic": dinic,
+}
+
+
+class RedeFluxo:
+    """
+    Problema de fluxo máximo com várias fontes e sumidouros, ligados a uma
+    super-fonte e a um super-sumidouro. As arestas são tuplas
+    (origem, destino, capacidade) com os nomes dos nós.
+    """
+    def __init__(self, fontes, sumidouros, arestas):
+        self.fontes = list(fontes)
+        self.sumidouros = list(sumidouros)
+        self.arestas = [(o, d, int(c)) for o, d, c in arestas]
+
+        self.indice_no = {}
+        for nome in self.fontes + self.sumidouros:
+            self.indice_no.setdefault(nome, len(self.indice_no))
+        for o, d, _ in self.arestas:
+            self.indice_no.setdefault(o, len(self.indice_no))
+            self.indice_no.setdefault(d, len(self.indice_no))
+
+        num_nos = len(self.indice_no)
+        self.super_fonte, self.super_sumidouro = num_nos, num_nos + 1
+        self.grafo = GrafoResidual(num_nos + 2)
+        self.arcos = [self.grafo.adicionar_aresta(self.indice_no[o], self.indice_no[d], c) for o, d, c in self.arestas]
+
+        # Nenhuma fonte pode enviar mais do que a soma de todas as capacidades
+        capacidade_ilimitada = sum(c for _, _, c in self.arestas) + 1
+        self.arcos_fontes = {nome: self.grafo.adicionar_aresta(self.super_fonte, self.indice_no[nome], capacidade_ilimitada) for nome in dict.fromkeys(self.fontes)}
+        self.arcos_sumidouros = {nome: self.grafo.adicionar_aresta(self.indice_no[nome], self.super_sumidouro, capacidade_ilimitada) for nome in dict.fromkeys(self.sumidouros)}
+        self.fluxo_maximo = 0
+        self._capacidade_ilimitada = capacidade_ilimitada
+        self._soma_capacidades = capacidade_ilimitada - 1
+        self.versao = 0        # muda a cada alteração do fluxo ou das capacidades
+        self._analise = None   # (versao, resultado de analisar_gargalos)
+        self._arcos_por_par = {}
+        for (o, d, _), arco in zip(self.arestas, self.arcos):
+            self._arcos_por_par.setdefault((o, d), []).append(arco)
+
+    @classmethod
+    def de_dicionario(cls, rede: dict) -> 'RedeFluxo':
+        """Monta a partir do formato da API (fontes, sumidouros, rotas)."""
+        return cls(rede['fontes'], rede['sumidouros'], [(r['origem'], r['destino'], r['capacidade']) for r in rede['rotas']])
+
+    @classmethod
+    def de_rede_logistica(cls, rede) -> 'RedeFluxo':
+        """Monta a partir de uma RedeLogistica: depósitos são fontes e zonas de entrega são sumidouros."""
+        from src.core.modelo_rede import Deposito, ZonaEntrega
+        fontes = [no.nome for no in rede.nos.values() if isinstance(no, Deposito)]
+        sumidouros = [no.nome for no in rede.nos.values() if isinstance(no, ZonaEntrega)]
+        return cls(fontes, sumidouros, list(rede.iterar_arestas()))
+
+    def resolver(self, algoritmo: str = "dinic") -> int:
+        if algoritmo not in ALGORITMOS:
+            raise ValueError(f"Algoritmo de fluxo desconhecido: '{algoritmo}'. Opções: {', '.join(ALGORITMOS)}.")
+        self.fluxo_maximo += ALGORITMOS[algoritmo](self.grafo, self.super_fonte, self.super_sumidouro)
+        self.versao += 1
+        return self.fluxo_maximo
+
+    def resultado(self) -> dict:
+        """Resultado no mesmo formato devolvido pelo endpoint /fluxo/calcular."""
+        return {
+            "fluxo_maximo": self.fluxo_maximo,
+            "rotas_com_fluxo": [
+                {"origem": o, "destino": d, "capacidade": self.grafo.capacidade_do_arco(arco), "fluxo": self.grafo.fluxo_do_arco(arco)}
+                for (o, d, _), arco in zip(self.arestas, self.arcos)
+            ]
+        }
+
+    # --- Consultas "e se" sobre o grafo residual já resolvido ---
+
+    def _planejar_alteracoes(self, alteracoes) -> dict:
+        """
+        Traduz as alterações em {arco: nova capacidade}, validando o lote
+        inteiro antes de mexer no grafo. Tipos aceitos:
+          {"tipo": "capacidade", "origem", "destino", "delta" e/ou "fator"}
+          {"tipo": "remover_rota", "origem", "destino"}
+          {"tipo": "fechar_no", "no"}
+        Rotas paralelas entre o mesmo par de nós são alteradas juntas.
+        """
+        grafo, plano = self.grafo, {}
+        capacidade = lambda arco: plano.get(arco, grafo.capacidade_do_arco(arco))
+        for alteracao in alteracoes:
+            tipo = alteracao.get('tipo')
+            if tipo in ("capacidade", "remover_rota"):
+                arcos = self._arcos_por_par.get((alteracao.get('origem'), alteracao.get('destino')))
+                if not arcos:
+                    raise ValueError(f"Rota '{alteracao.get('origem')}' -> '{alteracao.get('destino')}' não existe na rede.")
+                for arco in arcos:
+                    if tipo == "remover_rota":
+                        plano[arco] = 0
+                    else:
+                        fator, delta = alteracao.get('fator'), alteracao.get('delta')
+                        if fator is None and delta is None:
+                            raise ValueError("Alteração de capacidade precisa de 'delta' ou 'fator'.")
+                        plano[arco] = max(0, int(round(capacidade(arco) * (1 if fator is None else fator))) + int(delta or 0))
+            elif tipo == "fechar_no":
+                no = alteracao.get('no')
+                if no not in self.indice_no:
+                    raise ValueError(f"Nó '{no}' não existe na rede.")
+                # Todo arco que toca o nó (de ida ou reverso) pertence a uma aresta a zerar
+                e = grafo.cabeca[self.indice_no[no]]
+                while e != -1:
+                    plano[e & ~1] = 0
+                    e = grafo.prox[e]
+            else:
+                raise ValueError(f"Tipo de alteração desconhecido: '{tipo}'. Opções: capacidade, remover_rota, fechar_no.")
+        return plano
+
+    def _definir_capacidade(self, arco: int, nova: int, algoritmo) -> int:
+        """
+        Muda a capacidade de um arco mantendo o fluxo viável. Se o fluxo
+        atual passa da nova capacidade, o excesso é primeiro desviado por
+        outro caminho da origem ao destino do arco e o que sobrar é
+        cancelado (devolvido à super-fonte e retirado do super-sumidouro).
+        Devolve quanto o fluxo total diminuiu.
+        """
+        residual = self.grafo.residual
+        fluxo = residual[arco ^ 1]
+        if nova >= fluxo:
+            residual[arco] = nova - fluxo
+            return 0
+        excesso = fluxo - nova
+        residual[arco], residual[arco ^ 1] = 0, nova
+        u, v = self.grafo.origem_do_arco(arco), self.grafo.destino[arco]
+        s, t = self.super_fonte, self.super_sumidouro
+        resto = excesso - algoritmo(self.grafo, u, v, excesso)
+        if resto:
+            devolvido = resto if u == s else algoritmo(self.grafo, u, s, resto)
+            retirado = resto if v == t else algoritmo(self.grafo, t, v, resto)
+            if devolvido != resto or retirado != resto:
+                raise RuntimeError("Não foi possível cancelar o excesso de fluxo.")
+        return resto
+
+    def _recalcular_do_zero(self, algoritmo):
+        residual = self.grafo.residual
+        for arco in range(0, len(residual), 2):
+            residual[arco], residual[arco + 1] = residual[arco] + residual[arco + 1], 0
+        self.fluxo_maximo = algoritmo(self.grafo, self.super_fonte, self.super_sumidouro)
+
+    def _aplicar_plano(self, plano: dict, algoritmo) -> dict:
+        """Aplica {arco: capacidade} e reaumenta o fluxo; devolve as capacidades anteriores."""
+        anteriores = {arco: self.grafo.capacidade_do_arco(arco) for arco in plano}
+        # Os arcos da super-fonte e do super-sumidouro continuam "ilimitados":
+        # acima da soma das capacidades das rotas
+        num_arcos_rotas = 2 * len(self.arcos)
+        self._soma_capacidades += sum(nova - anteriores[arco] for arco, nova in plano.items() if arco < num_arcos_rotas)
+        if self._soma_capacidades >= self._capacidade_ilimitada:
+            aumento = self._soma_capacidades + 1 - self._capacidade_ilimitada
+            self._capacidade_ilimitada += aumento
+            for arco in [*self.arcos_fontes.values(), *self.arcos_sumidouros.values()]:
+                if arco not in plano and self.grafo.capacidade_do_arco(arco) > 0:
+                    self.grafo.residual[arco] += aumento
+        plano = {arco: (self._capacidade_ilimitada if arco >= num_arcos_rotas and nova > 0 else nova) for arco, nova in plano.items()}
+        try:
+            for arco, nova in plano.items():
+                self.fluxo_maximo -= self._definir_capacidade(arco, nova, algoritmo)
+            self.fluxo_maximo += algoritmo(self.grafo, self.super_fonte, self.super_sumidouro)
+        except RuntimeError:
+            # O lote parou no meio: grava todas as capacidades novas (fluxo zero) e recalcula
+            residual = self.grafo.residual
+            for arco, nova in plano.items():
+                residual[arco], residual[arco ^ 1] = nova, 0
+            self._recalcular_do_zero(algoritmo)
+        return anteriores
+
+    def simular(self, alteracoes, algoritmo: str = "dinic", persistir: bool = False) -> dict:
+        """
+        Consulta "e se": aplica um lote de alterações sobre o fluxo já
+        calculado, atualizando-o de forma incremental (só desvia, cancela
+        ou aumenta o que mudou). Com persistir=False, o grafo residual é
+        copiado antes e devolvido depois da consulta: a rede volta exatamente
+        ao estado anterior e `versao` (com a análise de gargalos guardada)
+        não muda.
+        """
+        if algoritmo not in ALGORITMOS:
+            raise ValueError(f"Algoritmo de fluxo desconhecido: '{algoritmo}'. Opções: {', '.join(ALGORITMOS)}.")
+        funcao = ALGORITMOS[algoritmo]
+        inicio = time.perf_counter()
+        plano = self._planejar_alteracoes(alteracoes)
+        fluxo_anterior = self.fluxo_maximo
+        estado = None if persistir else (self.grafo.residual[:], self.fluxo_maximo, self._soma_capacidades, self._capacidade_ilimitada)
+        anteriores = self._aplicar_plano(plano, funcao)
+
+        rotas_alteradas = []
+        nomes = {i: nome for nome, i in self.indice_no.items()}
+        for arco in sorted(plano):
+            if arco < 2 * len(self.arcos):
+                rotas_alteradas.append({
+                    "origem": nomes[self.grafo.origem_do_arco(arco)], "destino": nomes[self.grafo.destino[arco]],
+                    "capacidade_anterior": anteriores[arco], "capacidade": self.grafo.capacidade_do_arco(arco),
+                    "fluxo": self.grafo.fluxo_do_arco(arco),
+                })
+        resultado = {
+            "fluxo_maximo": self.fluxo_maximo,
+            "fluxo_maximo_anterior": fluxo_anterior,
+            "variacao_fluxo": self.fluxo_maximo - fluxo_anterior,
+            "rotas_alteradas": rotas_alteradas,
+            "persistido": persistir,
+        }
+        if persistir:
+            self.versao += 1
+        else:
+            self.grafo.residual[:], self.fluxo_maximo, self._soma_capacidades, self._capacidade_ilimitada = estado
+        resultado["tempo_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+        return resultado
+
+
+    # --- Corte mínimo e sensibilidade, a partir do grafo residual já resolvido ---
+
+    def _larguras(self, origem: int, reverso: bool = False) -> list:
+        """
+        Maior gargalo de um caminho residual da `origem` até cada nó (ou de
+        cada nó até a `origem`, com reverso=True): Dijkstra de gargalo.
+        Os arcos da super-fonte e do super-sumidouro contam como ilimitados.
+        """
+        cabeca, prox, destino, residual = self.grafo.cabeca, self.grafo.prox, self.grafo.destino, self.grafo.residual
+        num_arcos_rotas = 2 * len(self.arcos)
+        ilimitado = float('inf')
+        largura = [0] * self.grafo.num_nos
+        largura[origem] = ilimitado
+        heap = [(-ilimitado, origem)]
+        while heap:
+            w, u = heapq.heappop(heap)
+            w = -w
+            if w < largura[u]: continue
+            e = cabeca[u]
+            while e != -1:
+                arco = e ^ 1 if reverso else e
+                r = residual[arco]
+                if r > 0:
+                    v = destino[e]
+                    nova = w if arco >= num_arcos_rotas or r > w else r
+                    if nova > largura[v]:
+                        largura[v] = nova
+                        heapq.heappush(heap, (-nova, v))
+                e = prox[e]
+        return largura
+
+    def analisar_gargalos(self) -> dict:
+        """
+        Corte mínimo e sensibilidade de cada rota numa passada sobre o
+        grafo residual (sem resolver o fluxo de novo). Uma rota é
+        `limitante` quando a super-fonte alcança a origem e o destino
+        alcança o super-sumidouro no residual: cada unidade a mais de
+        capacidade aumenta o fluxo máximo em uma unidade, até pelo menos
+        `capacidade_extra_util` (None = sem limite). O resultado fica
+        guardado até a próxima alteração da rede (ver `versao`).
+        """
+        if self._analise is not None and self._analise[0] == self.versao:
+            return self._analise[1]
+        largura_fonte = self._larguras(self.super_fonte)
+        largura_sumidouro = self._larguras(self.super_sumidouro, reverso=True)
+        grafo = self.grafo
+
+        rotas, corte, limitantes = [], [], []
+        for (o, d, _), arco in zip(self.arestas, self.arcos):
+            u, v = grafo.origem_do_arco(arco), grafo.destino[arco]
+            capacidade, fluxo = grafo.capacidade_do_arco(arco), grafo.fluxo_do_arco(arco)
+            no_corte = capacidade > 0 and largura_fonte[u] > 0 and largura_fonte[v] == 0
+            limitante = capacidade > 0 and largura_fonte[u] > 0 and largura_sumidouro[v] > 0
+            extra = min(largura_fonte[u], largura_sumidouro[v]) if limitante else 0
+            rota = {
+                "origem": o, "destino": d, "capacidade": capacidade, "fluxo": fluxo,
+                "utilizacao": round(fluxo / capacidade, 4) if capacidade else 0.0,
+                "no_corte_minimo": no_corte, "limitante": limitante,
+                "capacidade_extra_util": None if extra == float('inf') else extra,
+            }
+            rotas.append(rota)
+            if no_corte: corte.append(rota)
+            if limitante: limitantes.append(rota)
+
+        resultado = {
+            "versao": self.versao,
+            "fluxo_maximo": self.fluxo_maximo,
+            "capacidade_corte_minimo": sum(r['capacidade'] for r in corte),
+            "lado_fonte_do_corte": sorted(nome for nome, i in self.indice_no.items() if largura_fonte[i] > 0),
+            "corte_minimo": [{"origem": r['origem'], "destino": r['destino'], "capacidade": r['capacidade']} for r in corte],
+            "rotas_limitantes": [{"origem": r['origem'], "destino": r['destino'], "capacidade_extra_util": r['capacidade_extra_util']} for r in limitantes],
+            "rotas": rotas,
+        }
+        self._analise = (self.versao, resultado)
+        return resultado
+
+def calcular_fluxo_maximo(rede: dict, algoritmo: str = "dinic") -> dict:
+    """Calcula o fluxo máximo de uma rede no formato da API."""
+    rede_fluxo = RedeFluxo.de_dicionario(rede)
+    rede_fluxo.resolver(algoritmo)
+    return rede_fluxo.resultado()
@@ -0,0 +1,189 @@
+import itertools
+import json
+import os
+import re
+
+import numpy as np
+# (leitura incremental do JSON da rede e formato binário de snapshot da RedeLogistica)
+
+class ErroCarregamentoRede(ValueError):
+    """Registro inválido no arquivo da rede; `linha` aponta onde ele começa (1 = primeira linha)."""
+    def __init__(self, mensagem: str, linha: int = None, caminho: str = None):
+        self.linha = linha
+        self.caminho = caminho
+        local = f"{os.path.basename(caminho)}:{linha}" if caminho and linha else (f"linha {linha}" if linha else caminho)
+        super().__init__(f"{local}: {mensagem}" if local else mensagem)
+
+
+_ESPACOS = re.compile(r'[ \t\r\n]*')
+
+class _LeitorIncremental:
+    """Buffer de texto lido em blocos, com contagem de linhas da parte já consumida."""
+    def __init__(self, arquivo, caminho: str, tamanho_bloco: int):
+        self.arquivo, self.caminho, self.tamanho_bloco = arquivo, caminho, tamanho_bloco
+        self.buffer, self.pos, self.fim_arquivo = "", 0, False
+        self.linha, self._pos_linha = 1, 0
+        self._decoder = json.JSONDecoder()
+
+    def _ler_mais(self) -> bool:
+        if self.fim_arquivo: return False
+        bloco = self.arquivo.read(self.tamanho_bloco)
+        if not bloco:
+            self.fim_arquivo = True
+            return False
+        # Descarta o que já foi consumido, mantendo a contagem de linhas
+        self.linha_atual()
+        self.buffer = self.buffer[self.pos:] + bloco
+        self._pos_linha -= self.pos
+        self.pos = 0
+        return True
+
+    def linha_atual(self) -> int:
+        self.linha += self.buffer.count('\n', self._pos_linha, self.pos)
+        self._pos_linha = self.pos
+        return self.linha
+
+    def erro(self, mensagem: str) -> ErroCarregamentoRede:
+        return ErroCarregamentoRede(mensagem, self.linha_atual(), self.caminho)
+
+    def proximo_caractere(self) -> str:
+        """Pula espaços e devolve o próximo caractere sem consumi-lo ('' no fim do arquivo)."""
+        while True:
+            self.pos = _ESPACOS.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer): return self.buffer[self.pos]
+            if not self._ler_mais(): return ''
+
+    def esperar(self, caractere: str):
+        if self.proximo_caractere() != caractere:
+            raise self.erro(f"esperado '{caractere}', encontrado '{self.proximo_caractere() or 'fim do arquivo'}'")
+        self.pos += 1
+
+    def lote(self) -> list:
+        """
+        Decodifica de uma vez todos os objetos completos do buffer a partir
+        de `pos` (o trecho até o último '}' antes de um ']') e devolve
+        (registros, linha de cada um). Devolve ([], []) quando o trecho não
+        serve (objeto cortado ou aninhado, chaves dentro de textos): aí a
+        leitura segue elemento a elemento por valor().
+        """
+        fim_lista = self.buffer.find(']', self.pos)
+        corte = self.buffer.rfind('}', self.pos, fim_lista if fim_lista >= 0 else len(self.buffer))
+        if corte < 0: return [], []
+        trecho = self.buffer[self.pos:corte + 1]
+        try:
+            registros = json.loads('[' + trecho + ']')
+        except ValueError:
+            return [], []
+        pedacos = trecho.split('{')
+        if len(pedacos) - 1 != len(registros): return [], []
+        linhas = list(itertools.accumulate((pedaco.count('\n') for pedaco in pedacos[:-1]), initial=self.linha_atual()))[1:]
+        self.pos = corte + 1
+        return registros, linhas
+
+    def valor(self):
+        """Decodifica o próximo valor JSON completo, lendo mais blocos se ele estiver cortado."""
+        while True:
+            try:
+                valor, fim = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if self._ler_mais(): continue
+                raise ErroCarregamentoRede(f"JSON inválido: {e.msg}", self.linha_atual() + self.buffer.count('\n', self.pos, e.pos), self.caminho)
+            # Um número no fim do buffer pode continuar no próximo bloco
+            if fim == len(self.buffer) and not self.fim_arquivo and self._ler_mais(): continue
+            self.pos = fim
+            return valor
+
+
+def iterar_json_rede(caminho: str, secoes_incrementais=("vertices", "rotas"), tamanho_bloco: int = 1 << 20):
+    """
+    Percorre o JSON da rede sem carregá-lo inteiro. As listas em
+    `secoes_incrementais` saem em lotes, como (secao, registros, linhas):
+    os objetos completos de cada bloco lido, decodificados numa só chamada
+    ao json (ver _LeitorIncremental.lote), com a linha onde cada um começa.
+    As demais chaves do objeto raiz saem uma vez, como (chave, valor,
+    linha). Erros de sintaxe indicam a linha.
+    """
+    with open(caminho, 'r', encoding='utf-8') as arquivo:
+        leitor = _LeitorIncremental(arquivo, caminho, tamanho_bloco)
+        leitor.esperar('{')
+        if leitor.proximo_caractere() == '}': return
+        while True:
+            leitor.proximo_caractere()
+            linha = leitor.linha_atual()
+            chave = leitor.valor()
+            if not isinstance(chave, str): raise leitor.erro("chave do objeto raiz deve ser texto")
+            leitor.esperar(':')
+            inicio = leitor.proximo_caractere()
+            if chave in secoes_incrementais:
+                if inicio != '[': raise leitor.erro(f"'{chave}' deve ser uma lista")
+                leitor.pos += 1
+                if leitor.proximo_caractere() == ']':
+                    leitor.pos += 1
+                else:
+                    while True:
+                        leitor.proximo_caractere()
+                        registros, linhas = leitor.lote()
+                        if not registros:
+                            linhas = [leitor.linha_atual()]
+                            registros = [leitor.valor()]
+                        yield chave, registros, linhas
+                        separador = leitor.proximo_caractere()
+                        leitor.pos += 1
+                        if separador == ']': break
+                        if separador != ',': raise leitor.erro(f"esperado ',' ou ']' na lista '{chave}'")
+            else:
+                yield chave, leitor.valor(), linha
+            separador = leitor.proximo_caractere()
+            leitor.pos += 1
+            if separador == '}': break
+            if separador != ',': raise leitor.erro("esperado ',' ou '}' no objeto raiz")
+
+
+# Snapshot binário: MAGIA | versão (uint32) | tamanho do cabeçalho (uint32) |
+# cabeçalho JSON | arrays alinhados em 64 bytes. O cabeçalho descreve cada
+# array (dtype, shape, offset) e guarda metadados como o nº de componentes.
+MAGIA_SNAPSHOT = b"REDELOG\0"
+VERSAO_SNAPSHOT = 1
+_ALINHAMENTO = 64
+
+def _alinhar(posicao: int) -> int:
+    return -(-posicao // _ALINHAMENTO) * _ALINHAMENTO
+
+def gravar_snapshot(caminho: str, arrays: dict, metadados: dict = None):
+    """Grava os arrays (1-D) num arquivo de snapshot, de forma atômica."""
+    arrays = {nome: np.ascontiguousarray(a) for nome, a in arrays.items()}
+    descricao, posicao = {}, 0
+    for nome, a in arrays.items():
+        descricao[nome] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": posicao}
+        posicao = _alinhar(posicao + a.nbytes)
+    cabecalho = json.dumps({"metadados": metadados or {}, "arrays": descricao}).encode()
+    inicio_dados = _alinhar(len(MAGIA_SNAPSHOT) + 8 + len(cabecalho))
+
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'wb') as f:
+        f.write(MAGIA_SNAPSHOT)
+        f.write(np.array([VERSAO_SNAPSHOT, len(cabecalho)], dtype='<u4').tobytes())
+        f.write(cabecalho)
+        for nome, a in arrays.items():
+            f.seek(inicio_dados + descricao[nome]['offset'])
+            f.write(a.tobytes())
+        f.truncate(inicio_dados + posicao)
+    os.replace(temporario, caminho)
+
+def ler_snapshot(caminho: str):
+    """Devolve (metadados, arrays) com os arrays mapeados em memória (somente leitura)."""
+    with open(caminho, 'rb') as f:
+        if f.read(len(MAGIA_SNAPSHOT)) != MAGIA_SNAPSHOT:
+            raise ValueError(f"'{caminho}' não é um snapshot de rede.")
+        versao, tamanho_cabecalho = np.frombuffer(f.read(8), dtype='<u4')
+        if versao != VERSAO_SNAPSHOT:
+            raise ValueError(f"Versão de snapshot {versao} não suportada (esperada {VERSAO_SNAPSHOT}). Gere o snapshot novamente.")
+        cabecalho = json.loads(f.read(int(tamanho_cabecalho)))
+    inicio_dados = _alinhar(len(MAGIA_SNAPSHOT) + 8 + int(tamanho_cabecalho))
+    arrays = {}
+    for nome, d in cabecalho['arrays'].items():
+        if not np.prod(d['shape']):
+            arrays[nome] = np.empty(d['shape'], dtype=d['dtype'])
+        else:
+            arrays[nome] = np.memmap(caminho, dtype=d['dtype'], mode='r', offset=inicio_dados + d['offset'], shape=tuple(d['shape']))
+    return cabecalho['metadados'], arrays
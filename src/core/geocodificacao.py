@@ -0,0 +1,230 @@
+import csv
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+# (geocodificação de endereços com cache persistente e provedores plugáveis)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CAMINHO_PADRAO = os.path.join(ROOT_DIR, 'data', 'cache_geocodificacao.sqlite')
+CONTEXTO_PADRAO = "Maceió, AL, Brasil"
+
+# Abreviações comuns nos CSVs de entrega, expandidas antes de montar a chave
+_ABREVIACOES = {"r": "rua", "av": "avenida", "tv": "travessa", "pca": "praca", "pc": "praca",
+                "rod": "rodovia", "estr": "estrada", "dr": "doutor", "prof": "professor", "sta": "santa", "sto": "santo"}
+
+def normalizar_endereco(endereco: str) -> str:
+    """
+    Chave canônica de um endereço: sem acentos, minúsculas, pontuação
+    trocada por espaço (as vírgulas separam as partes) e abreviações
+    expandidas. "Av. Dr. Antônio Gouveia, 925" e "avenida doutor antonio
+    gouveia,925" geram a mesma chave.
+    """
+    texto = unicodedata.normalize('NFKD', str(endereco)).encode('ascii', 'ignore').decode().lower()
+    partes = []
+    for parte in texto.split(','):
+        palavras = re.sub(r"[^a-z0-9]+", " ", parte).split()
+        if palavras: partes.append(" ".join(_ABREVIACOES.get(p, p) for p in palavras))
+    return ", ".join(partes)
+
+
+class CacheGeocodificacao:
+    """
+    Cache persistente endereço -> coordenada em SQLite. Endereços não
+    encontrados também são gravados (cache negativo, lat/lon nulos) e
+    expiram após ttl_negativo_s, para serem tentados de novo mais tarde.
+    """
+    def __init__(self, caminho: str = None, ttl_negativo_s: float = 7 * 24 * 3600):
+        self.caminho = caminho or CAMINHO_PADRAO
+        self.ttl_negativo_s = ttl_negativo_s
+        os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+        self._conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS enderecos (chave TEXT PRIMARY KEY, lat REAL, lon REAL, provedor TEXT, atualizado_em REAL)"
+        )
+        self._trava = threading.Lock()
+
+    def buscar(self, chaves: list) -> dict:
+        """Devolve {chave: (lat, lon) ou None (negativo)}; chaves ausentes ou negativos expirados ficam de fora."""
+        encontrados, limite_negativo = {}, time.time() - self.ttl_negativo_s
+        with self._trava:
+            for inicio in range(0, len(chaves), 500):
+                bloco = chaves[inicio:inicio + 500]
+                linhas = self._conexao.execute(
+                    f"SELECT chave, lat, lon, atualizado_em FROM enderecos WHERE chave IN ({','.join('?' * len(bloco))})", bloco
+                )
+                for chave, lat, lon, atualizado_em in linhas:
+                    if lat is not None: encontrados[chave] = (lat, lon)
+                    elif atualizado_em >= limite_negativo: encontrados[chave] = None
+        return encontrados
+
+    def salvar(self, resultados: dict, provedor: str):
+        agora = time.time()
+        linhas = [(chave, *(coord or (None, None)), provedor, agora) for chave, coord in resultados.items()]
+        with self._trava, self._conexao:
+            self._conexao.executemany("INSERT OR REPLACE INTO enderecos VALUES (?, ?, ?, ?, ?)", linhas)
+
+    def fechar(self):
+        self._conexao.close()
+
+
+class LimitadorTaxa:
+    """Espaça as chamadas (de várias threads) para no máximo `por_segundo` por segundo."""
+    def __init__(self, por_segundo: float = None):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self._proxima = 0.0
+        self._trava = threading.Lock()
+
+    def aguardar(self):
+        if not self.intervalo: return
+        with self._trava:
+            agora = time.monotonic()
+            horario = max(agora, self._proxima)
+            self._proxima = horario + self.intervalo
+        time.sleep(max(0.0, horario - agora))
+
+
+class ProvedorGeocodificacao:
+    """
+    Interface dos provedores. geocodificar() devolve (lat, lon) ou None
+    quando o endereço não existe; erros transitórios (rede, limite do
+    serviço) devem virar exceção, para não entrarem no cache negativo.
+    requisicoes_por_segundo e max_concorrencia vêm dos termos de uso.
+    """
+    nome = "base"
+    requisicoes_por_segundo = None
+    max_concorrencia = 1
+
+    def geocodificar(self, endereco: str, contexto: str = CONTEXTO_PADRAO):
+        raise NotImplementedError
+
+
+class ProvedorNominatim(ProvedorGeocodificacao):
+    """Nominatim (OpenStreetMap) via geopy: no máximo 1 requisição por segundo."""
+    nome = "nominatim"
+    requisicoes_por_segundo = 1
+    max_concorrencia = 1
+
+    def __init__(self, user_agent: str = None, timeout: float = 20):
+        from geopy.geocoders import Nominatim
+        self._geolocator = Nominatim(user_agent=user_agent or os.environ.get("GEOCODER_USER_AGENT", "otimizador_entregas"))
+        self.timeout = timeout
+
+    def geocodificar(self, endereco: str, contexto: str = CONTEXTO_PADRAO):
+        consulta = f"{endereco}, {contexto}" if contexto else endereco
+        local = self._geolocator.geocode(consulta, timeout=self.timeout)
+        return (local.latitude, local.longitude) if local else None
+
+
+class ProvedorGazetteer(ProvedorGeocodificacao):
+    """
+    Gazetteer local: CSV com as colunas endereco, lat, lon, já com os
+    endereços da cidade atendida. Sem limite de taxa.
+    """
+    nome = "gazetteer"
+    max_concorrencia = 8
+
+    def __init__(self, caminho: str = None):
+        caminho = caminho or os.environ.get("GAZETTEER_CSV", os.path.join(ROOT_DIR, 'data', 'gazetteer.csv'))
+        with open(caminho, 'r', encoding='utf-8') as f:
+            self._locais = {normalizar_endereco(linha['endereco']): (float(linha['lat']), float(linha['lon'])) for linha in csv.DictReader(f)}
+
+    def geocodificar(self, endereco: str, contexto: str = CONTEXTO_PADRAO):
+        return self._locais.get(normalizar_endereco(endereco))
+
+
+class ProvedorStub(ProvedorGeocodificacao):
+    """
+    Coordenadas determinísticas (hash do endereço) dentro de uma caixa em
+    volta de Maceió, para testes e benchmarks sem rede. Endereços que
+    contêm `marcador_inexistente` são tratados como não encontrados.
+    """
+    nome = "stub"
+    max_concorrencia = 8
+
+    def __init__(self, centro: tuple = (-9.62, -35.73), raio_graus: float = 0.06, atraso_s: float = 0.0, marcador_inexistente: str = "inexistente"):
+        self.centro, self.raio_graus, self.atraso_s = centro, raio_graus, atraso_s
+        self.marcador_inexistente = marcador_inexistente
+        self.requisicoes = 0
+        self._trava = threading.Lock()
+
+    def geocodificar(self, endereco: str, contexto: str = CONTEXTO_PADRAO):
+        with self._trava: self.requisicoes += 1
+        if self.atraso_s: time.sleep(self.atraso_s)
+        chave = normalizar_endereco(endereco)
+        if self.marcador_inexistente and self.marcador_inexistente in chave: return None
+        digest = hashlib.md5(chave.encode()).digest()
+        fracao_lat, fracao_lon = (int.from_bytes(digest[:4], 'big') / 2**32, int.from_bytes(digest[4:8], 'big') / 2**32)
+        return (round(self.centro[0] + (2 * fracao_lat - 1) * self.raio_graus, 6),
+                round(self.centro[1] + (2 * fracao_lon - 1) * self.raio_graus, 6))
+
+
+PROVEDORES = {
+    "nominatim": ProvedorNominatim,
+    "gazetteer": ProvedorGazetteer,
+    "stub": ProvedorStub,
+}
+
+def criar_provedor_geocodificacao(nome: str = None, **kwargs) -> ProvedorGeocodificacao:
+    """Cria o provedor pelo nome (padrão: variável de ambiente GEOCODER_BACKEND ou 'nominatim')."""
+    nome = nome or os.environ.get("GEOCODER_BACKEND", "nominatim")
+    if nome not in PROVEDORES:
+        raise ValueError(f"Provedor de geocodificação desconhecido: '{nome}'. Opções: {', '.join(PROVEDORES)}.")
+    return PROVEDORES[nome](**kwargs)
+
+
+def geocodificar_enderecos(enderecos: list, provedor: ProvedorGeocodificacao = None, cache: CacheGeocodificacao = None,
+                           contexto: str = CONTEXTO_PADRAO, ao_progredir=None):
+    """
+    Geocodifica uma lista de endereços. Endereços repetidos (pela chave
+    normalizada) são consultados uma vez, os que já estão no cache não vão
+    ao provedor e os novos são consultados em paralelo, até
+    provedor.max_concorrencia threads e dentro do limite de taxa.
+    ao_progredir(feitos, total) é chamado a cada consulta ao provedor.
+
+    Devolve ({endereco: (lat, lon) ou None}, estatisticas).
+    """
+    inicio = time.perf_counter()
+    provedor = provedor or criar_provedor_geocodificacao()
+    cache = cache or CacheGeocodificacao()
+    chaves = {endereco: normalizar_endereco(f"{endereco}, {contexto}" if contexto else endereco) for endereco in enderecos}
+    unicas = {}
+    for endereco, chave in chaves.items():
+        unicas.setdefault(chave, endereco)
+
+    resultados = cache.buscar(list(unicas))
+    acertos = sum(1 for coord in resultados.values() if coord is not None)
+    negativos = len(resultados) - acertos
+    pendentes = [chave for chave in unicas if chave not in resultados]
+
+    limitador, erros, novos, feitos = LimitadorTaxa(provedor.requisicoes_por_segundo), {}, {}, [0]
+    trava = threading.Lock()
+    def consultar(chave):
+        limitador.aguardar()
+        try:
+            novos[chave] = provedor.geocodificar(unicas[chave], contexto)
+        except Exception as e:
+            erros[unicas[chave]] = str(e)
+        with trava:
+            feitos[0] += 1
+            if ao_progredir: ao_progredir(feitos[0], len(pendentes))
+
+    if pendentes:
+        print(f"🌍 Geocodificando {len(pendentes)} endereços novos via {provedor.nome} ({len(unicas) - len(pendentes)} no cache)...")
+        with ThreadPoolExecutor(max_workers=max(1, min(provedor.max_concorrencia, len(pendentes)))) as executor:
+            list(executor.map(consultar, pendentes))
+        cache.salvar(novos, provedor.nome)
+    resultados.update(novos)
+
+    estatisticas = {
+        "total": len(enderecos), "unicos": len(unicas), "acertos_cache": acertos, "negativos_cache": negativos,
+        "consultados": len(pendentes), "nao_encontrados": sum(1 for coord in novos.values() if coord is None),
+        "erros": erros, "taxa_acerto_cache": round((acertos + negativos) / len(unicas), 4) if unicas else 0.0,
+        "tempo_s": round(time.perf_counter() - inicio, 3),
+    }
+    return {endereco: resultados.get(chave) for endereco, chave in chaves.items()}, estatisticas
@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import requests
+
+from src.core.metricas import HTTP_SAIDA
+from src.core.provedores_matriz import OSRM_URL
+from src.core.polyline import decodificar_lote
+from src.core.roteador_local import carregar_roteador
+# (geometria das rotas para os mapas: uma requisição /route por veículo e cache por trecho)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CAMINHO_PADRAO = os.path.join(ROOT_DIR, 'data', 'cache_geometria.sqlite')
+GEOMETRIA_BACKEND = os.environ.get("GEOMETRIA_BACKEND", "osrm")  # "osrm" ou "local" (RoteadorLocal)
+
+class CacheGeometria:
+    """
+    Cache em SQLite da geometria de cada trecho (origem -> destino), com as
+    coordenadas arredondadas como chave e os pontos já decodificados
+    (float64) como blob, para redesenhar o mapa sem decodificar de novo.
+    """
+    def __init__(self, caminho: str = None, casas_decimais: int = 5):
+        self.caminho = caminho or CAMINHO_PADRAO
+        self.casas_decimais = casas_decimais
+        os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+        self._conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS trechos (lat1 REAL, lon1 REAL, lat2 REAL, lon2 REAL, pontos BLOB, "
+            "PRIMARY KEY (lat1, lon1, lat2, lon2)) WITHOUT ROWID"
+        )
+        self._trava = threading.Lock()
+
+    def _chave(self, origem, destino) -> tuple:
+        return tuple(round(float(v), self.casas_decimais) for v in (*origem, *destino))
+
+    def buscar(self, trechos: list) -> dict:
+        """Devolve {indice do trecho: [(lat, lon), ...]} para os trechos (origem, destino) que estão no cache."""
+        encontrados = {}
+        with self._trava:
+            for i, (origem, destino) in enumerate(trechos):
+                linha = self._conexao.execute(
+                    "SELECT pontos FROM trechos WHERE lat1=? AND lon1=? AND lat2=? AND lon2=?", self._chave(origem, destino)
+                ).fetchone()
+                if linha is not None:
+                    encontrados[i] = [tuple(p) for p in np.frombuffer(linha[0], dtype=np.float64).reshape(-1, 2)]
+        return encontrados
+
+    def salvar(self, trechos: list, geometrias: list):
+        linhas = [(*self._chave(o, d), np.asarray(g, dtype=np.float64).tobytes()) for (o, d), g in zip(trechos, geometrias)]
+        with self._trava, self._conexao:
+            self._conexao.executemany("INSERT OR REPLACE INTO trechos VALUES (?, ?, ?, ?, ?)", linhas)
+
+    def fechar(self):
+        self._conexao.close()
+
+
+class ServicoGeometria:
+    """
+    Traça o caminho pelas ruas de uma sequência de paradas. Os trechos que
+    não estão no cache são pedidos numa única requisição /route com todos
+    os waypoints (steps=true devolve a geometria separada por trecho); se o
+    OSRM falhar, o trecho vira uma linha reta e não é gravado no cache.
+    Com um RoteadorLocal (ou GEOMETRIA_BACKEND=local), os trechos saem do
+    grafo viário local, sem rede.
+    """
+    def __init__(self, url_base: str = None, cache: CacheGeometria = None, max_waypoints: int = 100, timeout: float = 15, roteador=None):
+        self.url_base = (url_base or OSRM_URL).rstrip('/')
+        self.roteador = roteador or (carregar_roteador() if GEOMETRIA_BACKEND == "local" else None)
+        self.cache = cache or CacheGeometria()
+        self.max_waypoints = max_waypoints
+        self.timeout = timeout
+        self.requisicoes = 0
+        self.falhas = 0
+
+    def _consultar(self, pontos: list) -> list:
+        """Geometria de cada trecho entre waypoints consecutivos (len(pontos) - 1 listas)."""
+        if self.roteador is not None:
+            return [self.roteador.geometria(a, b) for a, b in zip(pontos, pontos[1:])]
+        loc = ";".join(f"{c[1]},{c[0]}" for c in pontos)
+        self.requisicoes += 1
+        inicio = time.perf_counter()
+        try:
+            resposta = requests.get(f"{self.url_base}/route/v1/driving/{loc}",
+                                    params={"overview": "false", "steps": "true", "geometries": "polyline"}, timeout=self.timeout)
+        finally:
+            HTTP_SAIDA.observar(time.perf_counter() - inicio, servico="osrm_route")
+        resposta.raise_for_status()
+        dados = resposta.json()
+        if dados.get('code') != 'Ok' or not dados.get('routes'):
+            raise RuntimeError(f"OSRM respondeu {dados.get('code')}: {dados.get('message', '')}")
+        legs = dados['routes'][0]['legs']
+        geometrias = iter(decodificar_lote([step['geometry'] for leg in legs for step in leg.get('steps', [])]))
+        trechos = []
+        for leg in legs:
+            caminho = []
+            for _ in leg.get('steps', []):
+                for ponto in map(tuple, next(geometrias).tolist()):
+                    if not caminho or caminho[-1] != ponto: caminho.append(ponto)
+            trechos.append(caminho)
+        return trechos
+
+    def geometria_trechos(self, coordenadas: list) -> list:
+        """Uma lista de pontos por trecho da sequência de paradas."""
+        trechos = list(zip(coordenadas, coordenadas[1:]))
+        geometrias = self.cache.buscar(trechos)
+        faltantes = [i for i in range(len(trechos)) if i not in geometrias]
+
+        # Trechos faltantes consecutivos viram uma única sequência de waypoints
+        sequencias, atual = [], []
+        for i in faltantes:
+            if atual and (i != atual[-1] + 1 or len(atual) >= self.max_waypoints - 1):
+                sequencias.append(atual); atual = []
+            atual.append(i)
+        if atual: sequencias.append(atual)
+
+        for sequencia in sequencias:
+            pontos = [coordenadas[i] for i in sequencia] + [coordenadas[sequencia[-1] + 1]]
+            try:
+                novos = self._consultar(pontos)
+                self.cache.salvar([trechos[i] for i in sequencia], novos)
+            except (requests.exceptions.RequestException, RuntimeError, KeyError, ValueError) as e:
+                print(f"⚠️  Não foi possível traçar {len(sequencia)} trecho(s) pelo OSRM, usando linha reta. ({e})")
+                self.falhas += 1
+                novos = [[tuple(trechos[i][0]), tuple(trechos[i][1])] for i in sequencia]
+            geometrias.update(zip(sequencia, novos))
+        return [geometrias[i] for i in range(len(trechos))]
+
+    def geometria_rota(self, coordenadas: list) -> list:
+        """Caminho completo da sequência de paradas, sem repetir os pontos de junção."""
+        caminho = []
+        for trecho in self.geometria_trechos(coordenadas):
+            caminho.extend(trecho[1:] if caminho and trecho and caminho[-1] == trecho[0] else trecho)
+        return caminho
+
+    def geometrias_solucao(self, solucao: dict, coordenadas: dict) -> dict:
+        """{veiculo_id: caminho} de cada rota da solução do VRP (locais sem coordenada são ignorados)."""
+        return {
+            rota['veiculo_id']: self.geometria_rota([coordenadas[p['local']] for p in rota['rota'] if coordenadas.get(p['local'])])
+            for rota in solucao['rotas_otimizadas']
+        }
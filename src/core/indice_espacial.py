@@ -0,0 +1,169 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+# (índice espacial em grade para vizinhos mais próximos entre os locais de um problema)
+
+RAIO_TERRA_M = 6371000
+
+def projetar_metros(coordenadas, lat_referencia: float = None) -> np.ndarray:
+    """Projeção equiretangular em torno do centro dos pontos (ou de `lat_referencia`): (x, y) em metros, boa na escala de uma cidade."""
+    coords = np.asarray(coordenadas, dtype=np.float64).reshape(-1, 2)
+    if not len(coords): return coords
+    lat0 = math.radians(float(coords[:, 0].mean()) if lat_referencia is None else lat_referencia)
+    y = np.radians(coords[:, 0]) * RAIO_TERRA_M
+    x = np.radians(coords[:, 1]) * RAIO_TERRA_M * math.cos(lat0)
+    return np.column_stack([x, y])
+
+
+class GradeEspacial:
+    """
+    Grade uniforme sobre os pontos projetados, com células dimensionadas
+    para ~`pontos_por_celula` pontos cada. A busca de vizinhos processa uma
+    célula por vez e expande anéis de células até que o k-ésimo candidato
+    esteja mais perto que qualquer ponto fora dos anéis visitados.
+    """
+    def __init__(self, coordenadas, pontos_por_celula: int = 8):
+        coords = np.asarray(coordenadas, dtype=np.float64).reshape(-1, 2)
+        self.lat_referencia = float(coords[:, 0].mean()) if len(coords) else 0.0
+        self.pontos = projetar_metros(coords, self.lat_referencia)
+        n = len(self.pontos)
+        self.minimo = minimo = self.pontos.min(axis=0) if n else np.zeros(2)
+        extensao = (self.pontos.max(axis=0) - minimo) if n else np.zeros(2)
+        area = max(float(extensao[0]) * float(extensao[1]), float(extensao.max()) ** 2 / max(n, 1), 1.0)
+        self.lado = max(math.sqrt(area * pontos_por_celula / max(n, 1)), 1.0)
+        self.celula_de = np.floor((self.pontos - minimo) / self.lado).astype(np.int64)
+        self.celulas = defaultdict(list)
+        for i, (cx, cy) in enumerate(self.celula_de.tolist()):
+            self.celulas[(cx, cy)].append(i)
+        self._max_anel = int(self.celula_de.max()) + 1 if n else 0
+
+    def _anel(self, cx: int, cy: int, r: int) -> list:
+        if r == 0: return list(self.celulas.get((cx, cy), ()))
+        membros = []
+        for dx in range(-r, r + 1):
+            for dy in ((-r, r) if abs(dx) != r else range(-r, r + 1)):
+                membros += self.celulas.get((cx + dx, cy + dy), ())
+        return membros
+
+    def vizinhos(self, k: int) -> np.ndarray:
+        """Matriz N x min(k, N-1) com os índices dos k vizinhos mais próximos de cada ponto, do mais perto ao mais longe."""
+        n = len(self.pontos)
+        k = min(k, n - 1)
+        resultado = np.empty((n, max(k, 0)), dtype=np.int64)
+        if k <= 0: return resultado
+        for (cx, cy), membros in self.celulas.items():
+            membros = np.array(membros)
+            candidatos, r = self._anel(cx, cy, 0), 0
+            while True:
+                # Pontos fora dos anéis 0..r estão a pelo menos r * lado de qualquer ponto da célula
+                if len(candidatos) > k:
+                    cand = np.array(candidatos)
+                    d = np.linalg.norm(self.pontos[membros, None, :] - self.pontos[None, cand, :], axis=2)
+                    d[membros[:, None] == cand[None, :]] = np.inf
+                    ordem = np.argsort(d, axis=1, kind='stable')[:, :k]
+                    if d[np.arange(len(membros)), ordem[:, -1]].max() <= r * self.lado or r > self._max_anel:
+                        resultado[membros] = cand[ordem]
+                        break
+                r += 1
+                candidatos += self._anel(cx, cy, r)
+        return resultado
+
+    def mais_proximos(self, coordenadas):
+        """Para pontos de fora do índice: (índice do ponto indexado mais próximo, distância em metros) de cada um."""
+        consultas = projetar_metros(coordenadas, self.lat_referencia)
+        indices = np.full(len(consultas), -1, dtype=np.int64)
+        distancias = np.full(len(consultas), np.inf)
+        if not len(self.pontos): return indices, distancias
+        celulas = np.floor((consultas - self.minimo) / self.lado).astype(np.int64).tolist()
+        for q, (cx, cy) in enumerate(celulas):
+            # Fora da grade, o primeiro anel com pontos pode estar longe: começa por ele
+            r = max(0, cx - self._max_anel, -cx, cy - self._max_anel, -cy)
+            candidatos = self._anel(cx, cy, r)
+            while True:
+                if candidatos:
+                    d = np.linalg.norm(self.pontos[candidatos] - consultas[q], axis=1)
+                    melhor = int(np.argmin(d))
+                    if d[melhor] <= r * self.lado or r > self._max_anel + abs(cx) + abs(cy):
+                        indices[q], distancias[q] = candidatos[melhor], d[melhor]
+                        break
+                r += 1
+                candidatos += self._anel(cx, cy, r)
+        return indices, distancias
+
+
+def vizinhos_candidatos(vizinhos: np.ndarray) -> list:
+    """
+    Fecha a relação de k vizinhos (saída de GradeEspacial.vizinhos) por
+    simetria: o conjunto de cada local tem os seus k vizinhos e os locais
+    que o têm entre os k deles.
+    """
+    candidatos = [set(linha) for linha in vizinhos.tolist()]
+    for i, linha in enumerate(vizinhos.tolist()):
+        for j in linha:
+            candidatos[j].add(i)
+    return candidatos
+
+def _componentes(candidatos: list, ignorar: set) -> tuple:
+    """Rótulo da componente conexa de cada local (-1 nos ignorados) e o número de componentes."""
+    componente = np.full(len(candidatos), -1)
+    num_componentes = 0
+    for inicio in range(len(candidatos)):
+        if inicio in ignorar or componente[inicio] >= 0: continue
+        componente[inicio], pilha = num_componentes, [inicio]
+        while pilha:
+            for j in candidatos[pilha.pop()]:
+                if j not in ignorar and componente[j] < 0:
+                    componente[j] = num_componentes
+                    pilha.append(j)
+        num_componentes += 1
+    return componente, num_componentes
+
+def _pontes(grade: GradeEspacial, componente: np.ndarray, c: int, limite) -> list:
+    """
+    Pares (local da componente c, local de outra componente) que ligam c
+    às vizinhas. A busca sai das células da grade que têm locais de c e
+    avança um anel de células por vez até o primeiro com locais de outra
+    componente; cada um deles é ligado ao local de c mais próximo na
+    célula de onde a busca chegou até ele.
+    """
+    origem = {celula: celula for celula in map(tuple, grade.celula_de[componente == c].tolist())}
+    nivel = list(origem)
+    while True:
+        estranhos = [(j, celula) for celula in nivel for j in grade.celulas.get(celula, ()) if componente[j] not in (-1, c)]
+        if estranhos or not nivel: break
+        proximo = []
+        for cx, cy in nivel:
+            for vizinha in ((cx + dx, cy + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)):
+                if vizinha not in origem and 0 <= vizinha[0] <= limite[0] and 0 <= vizinha[1] <= limite[1]:
+                    origem[vizinha] = origem[(cx, cy)]
+                    proximo.append(vizinha)
+        nivel = proximo
+    pares = []
+    for j, celula in estranhos:
+        locais = [i for i in grade.celulas[origem[celula]] if componente[i] == c]
+        pares.append((locais[int(np.argmin(np.linalg.norm(grade.pontos[locais] - grade.pontos[j], axis=1)))], j))
+    return pares
+
+def conectar_componentes(candidatos: list, grade: GradeEspacial, ignorar=()) -> int:
+    """
+    Torna conexo o grafo de candidatos (fora os locais em `ignorar`, como
+    o depósito). Sem isso um veículo não sai do grupo de paradas em que
+    entrou e, com mais grupos que veículos, paradas ficam de fora. Cada
+    componente ganha ligações (nos dois sentidos) com os locais de outra
+    componente achados primeiro pela busca em anéis da grade (_pontes),
+    ao longo da fronteira, o que deixa as rotas saltarem de grupo. Cada
+    rodada ao menos divide por dois o número de componentes. Devolve o
+    número de ligações.
+    """
+    ignorar = set(ignorar)
+    componente, num_componentes = _componentes(candidatos, ignorar)
+    limite = grade.celula_de.max(axis=0) if len(grade.pontos) else (0, 0)
+    ligacoes = 0
+    while num_componentes > 1:
+        for c in range(num_componentes):
+            for i, j in _pontes(grade, componente, c, limite):
+                if j not in candidatos[i]: ligacoes += 1
+                candidatos[i].add(j); candidatos[j].add(i)
+        componente, num_componentes = _componentes(candidatos, ignorar)
+    return ligacoes
@@ -0,0 +1,149 @@
+import math
+import threading
+import time
+# (métricas do serviço — contadores, medidores e histogramas com rótulos — no formato de texto do Prometheus)
+
+BALDES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _numero(valor: float) -> str:
+    if math.isinf(valor): return "+Inf" if valor > 0 else "-Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = ()):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, tuple(rotulos)
+        self._valores = {}
+        self._trava = threading.Lock()
+
+    def _chave(self, rotulos: dict) -> tuple:
+        desconhecidos = set(rotulos) - set(self.rotulos)
+        if desconhecidos:
+            raise ValueError(f"Rótulos {sorted(desconhecidos)} não declarados em '{self.nome}'.")
+        return tuple(str(rotulos.get(r, "")) for r in self.rotulos)
+
+    def _rotulos_texto(self, chave: tuple, extra: dict = None) -> str:
+        pares = [f'{r}="{_escapar(v)}"' for r, v in zip(self.rotulos, chave)]
+        pares += [f'{r}="{_escapar(v)}"' for r, v in (extra or {}).items()]
+        return "{" + ",".join(pares) + "}" if pares else ""
+
+    def linhas(self) -> list:
+        cabecalho = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        with self._trava:
+            valores = sorted(self._valores.items())
+        return cabecalho + [f"{self.nome}{self._rotulos_texto(chave)} {_numero(valor)}" for chave, valor in valores]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def incrementar(self, valor: float = 1, **rotulos):
+        if valor < 0: raise ValueError("Um contador só pode aumentar.")
+        chave = self._chave(rotulos)
+        with self._trava:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def valor(self, **rotulos) -> float:
+        return self._valores.get(self._chave(rotulos), 0)
+
+
+class Medidor(_Metrica):
+    tipo = "gauge"
+
+    def definir(self, valor: float, **rotulos):
+        chave = self._chave(rotulos)
+        with self._trava:
+            self._valores[chave] = valor
+
+
+class Histograma(_Metrica):
+    """Baldes cumulativos (le), soma e contagem por combinação de rótulos."""
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = (), baldes: tuple = BALDES_SEGUNDOS):
+        super().__init__(nome, ajuda, rotulos)
+        self.baldes = tuple(sorted(baldes))
+
+    def observar(self, valor: float, **rotulos):
+        chave = self._chave(rotulos)
+        with self._trava:
+            contagens, soma, total = self._valores.get(chave, ([0] * len(self.baldes), 0.0, 0))
+            contagens = [c + (valor <= limite) for c, limite in zip(contagens, self.baldes)]
+            self._valores[chave] = (contagens, soma + valor, total + 1)
+
+    def contagem(self, **rotulos) -> int:
+        return self._valores.get(self._chave(rotulos), (None, 0.0, 0))[2]
+
+    def linhas(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        with self._trava:
+            valores = sorted(self._valores.items())
+        for chave, (contagens, soma, total) in valores:
+            for limite, contagem in zip(self.baldes, contagens):
+                linhas.append(f"{self.nome}_bucket{self._rotulos_texto(chave, {'le': _numero(limite)})} {contagem}")
+            linhas.append(f"{self.nome}_bucket{self._rotulos_texto(chave, {'le': '+Inf'})} {total}")
+            linhas.append(f"{self.nome}_sum{self._rotulos_texto(chave)} {_numero(soma)}")
+            linhas.append(f"{self.nome}_count{self._rotulos_texto(chave)} {total}")
+        return linhas
+
+
+class RegistroMetricas:
+    """Conjunto de métricas de um processo; pedir de novo um nome já registrado devolve a mesma métrica."""
+    def __init__(self):
+        self._metricas = {}
+        self._trava = threading.Lock()
+
+    def _obter(self, classe, nome: str, *args, **kwargs):
+        with self._trava:
+            if nome not in self._metricas:
+                self._metricas[nome] = classe(nome, *args, **kwargs)
+            metrica = self._metricas[nome]
+        if not isinstance(metrica, classe):
+            raise ValueError(f"Métrica '{nome}' já registrada como {metrica.tipo}.")
+        return metrica
+
+    def contador(self, nome: str, ajuda: str, rotulos: tuple = ()) -> Contador:
+        return self._obter(Contador, nome, ajuda, rotulos)
+
+    def medidor(self, nome: str, ajuda: str, rotulos: tuple = ()) -> Medidor:
+        return self._obter(Medidor, nome, ajuda, rotulos)
+
+    def histograma(self, nome: str, ajuda: str, rotulos: tuple = (), baldes: tuple = BALDES_SEGUNDOS) -> Histograma:
+        return self._obter(Histograma, nome, ajuda, rotulos, baldes=baldes)
+
+    def exportar(self) -> str:
+        """Todas as métricas no formato de texto do Prometheus (versão 0.0.4)."""
+        with self._trava:
+            metricas = sorted(self._metricas.values(), key=lambda m: m.nome)
+        return "\n".join(linha for m in metricas for linha in m.linhas()) + "\n"
+
+
+REGISTRO = RegistroMetricas()
+# Requisições de saída (as do provedor de matriz nos workers, via bloco `timings`, rotuladas com o nome do provedor;
+# osrm_route direto no processo que traça a geometria)
+HTTP_SAIDA = REGISTRO.histograma("vrp_http_saida_segundos", "Duração das requisições HTTP de saída.", ("servico",))
+
+
+class Cronometro:
+    """
+    Tempos por fase de uma execução: `marcar(fase)` soma à fase o tempo
+    desde a marca anterior. `timings()` devolve o bloco que vai na resposta.
+    """
+    def __init__(self):
+        self.inicio = self._ultima = time.perf_counter()
+        self.fases = {}
+
+    def marcar(self, fase: str) -> float:
+        agora = time.perf_counter()
+        duracao, self._ultima = agora - self._ultima, agora
+        self.fases[fase] = self.fases.get(fase, 0.0) + duracao
+        return duracao
+
+    def timings(self, **extras) -> dict:
+        return {**{f"{fase}_s": round(t, 4) for fase, t in self.fases.items()},
+                "total_s": round(time.perf_counter() - self.inicio, 4), **extras}
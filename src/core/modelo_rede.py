@@ -1,121 +1,426 @@
-import json
-import networkx as nx 
+import os
+from array import array
+from operator import itemgetter
+
+import numpy as np
+
+from src.core.formato_rede import ErroCarregamentoRede, gravar_snapshot, iterar_json_rede, ler_snapshot
 # (dev 1 modelagem de dados)
 
 class NoRede:
     """Classe base para qualquer nó na rede (depósito, hub, etc.)."""
+    __slots__ = ('id', 'nome', 'coordenadas', 'indice')
+
     def __init__(self, id: str, nome: str, lat: float, lon: float):
         self.id = id
         self.nome = nome
         self.coordenadas = (lat, lon)
+        self.indice = None  # posição inteira na rede, definida por RedeLogistica.adicionar_no
 
     def __repr__(self):
         return f"{self.__class__.__name__}(nome='{self.nome}')"
 
 class Deposito(NoRede):
     """Representa um centro de distribuição, de onde os pacotes saem."""
-    pass
+    __slots__ = ()
 
 class Hub(NoRede):
     """Representa um hub logístico intermediário."""
-    pass
+    __slots__ = ()
 
 class ZonaEntrega(NoRede):
     """Representa um cliente final ou uma zona de entrega."""
-    pass
+    __slots__ = ()
 
 class Rota:
     """Representa uma aresta do grafo, conectando dois nós com uma capacidade."""
+    __slots__ = ('origem', 'destino', 'capacidade')
+
     def __init__(self, origem: NoRede, destino: NoRede, capacidade: int):
         if capacidade < 0:
             raise ValueError("A capacidade da rota não pode ser negativa.")
         self.origem = origem
         self.destino = destino
         self.capacidade = capacidade
-    
+
     def __repr__(self):
         return f"Rota(de='{self.origem.nome}', para='{self.destino.nome}', cap={self.capacidade})"
 
+class VisaoRotas:
+    """
+    Sequência somente leitura das rotas da rede. As rotas ficam guardadas
+    em colunas (origem, destino, capacidade); os objetos Rota são criados
+    só quando acessados.
+    """
+    __slots__ = ('_rede',)
+
+    def __init__(self, rede: 'RedeLogistica'):
+        self._rede = rede
+
+    def __len__(self):
+        return len(self._rede._capacidades)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        rede = self._rede
+        return Rota(rede._lista_nos[rede._origens[i]], rede._lista_nos[rede._destinos[i]], int(rede._capacidades[i]))
+
+    def __iter__(self):
+        lista_nos = self._rede._lista_nos
+        for o, d, c in self._rede._iterar_colunas():
+            yield Rota(lista_nos[o], lista_nos[d], c)
+
+    def __bool__(self):
+        return len(self) > 0
+
+
+TIPOS_NO = {"deposito": Deposito, "hub": Hub, "zona": ZonaEntrega}
+NOMES_TIPO = {classe: tipo for tipo, classe in TIPOS_NO.items()}
+_CLASSES_SNAPSHOT = (NoRede, Deposito, Hub, ZonaEntrega)  # código do tipo no snapshot = posição na tupla
+_COLUNAS_NOS = ('ids_bytes', 'ids_offsets', 'nomes_bytes', 'nomes_offsets', 'tipos', 'lat', 'lon')
+
+def _textos_para_colunas(textos):
+    """Lista de textos -> (bytes UTF-8 concatenados, offsets de início/fim de cada um)."""
+    codificados = [t.encode('utf-8') for t in textos]
+    offsets = np.zeros(len(codificados) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in codificados], out=offsets[1:])
+    return np.frombuffer(b''.join(codificados), dtype=np.uint8), offsets
+
+def _colunas_para_textos(blob, offsets) -> list:
+    dados, o = bytes(blob), offsets.tolist()
+    return [dados[o[i]:o[i + 1]].decode('utf-8') for i in range(len(o) - 1)]
+
+def _no_do_registro(v, linha: int, caminho: str) -> NoRede:
+    if not isinstance(v, dict):
+        raise ErroCarregamentoRede("vértice deve ser um objeto", linha, caminho)
+    faltando = [c for c in ('id', 'tipo', 'nome', 'lat', 'lon') if c not in v]
+    if faltando:
+        raise ErroCarregamentoRede(f"vértice sem o(s) campo(s) {', '.join(faltando)}", linha, caminho)
+    classe_no = TIPOS_NO.get(str(v['tipo']).lower())
+    if not classe_no:
+        raise ErroCarregamentoRede(f"Tipo de vértice desconhecido: {v['tipo']}", linha, caminho)
+    if not isinstance(v['id'], str) or not isinstance(v['nome'], str) or not v['nome']:
+        raise ErroCarregamentoRede(f"vértice com id/nome inválido: id={v['id']!r}, nome={v['nome']!r}", linha, caminho)
+    for campo, limite in (('lat', 90), ('lon', 180)):
+        valor = v[campo]
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not -limite <= valor <= limite:
+            raise ErroCarregamentoRede(f"vértice '{v['nome']}' com {campo} inválida: {valor!r}", linha, caminho)
+    return classe_no(id=v['id'], nome=v['nome'], lat=v['lat'], lon=v['lon'])
+
+def _rota_do_registro(r, linha: int, caminho: str) -> tuple:
+    if not isinstance(r, dict):
+        raise ErroCarregamentoRede("rota deve ser um objeto", linha, caminho)
+    faltando = [c for c in ('origem', 'destino', 'capacidade') if c not in r]
+    if faltando:
+        raise ErroCarregamentoRede(f"rota sem o(s) campo(s) {', '.join(faltando)}", linha, caminho)
+    capacidade = r['capacidade']
+    if isinstance(capacidade, bool) or not isinstance(capacidade, int) or capacidade < 0:
+        raise ErroCarregamentoRede(f"capacidade inválida na rota '{r['origem']}' -> '{r['destino']}': {capacidade!r} (inteiro >= 0)", linha, caminho)
+    return r['origem'], r['destino'], capacidade
+
+def _rotas_dos_registros(registros: list, linhas: list, caminho: str) -> list:
+    """Rotas de um lote inteiro; se alguma for inválida, valida uma a uma para apontar a linha."""
+    try:
+        rotas = [(r['origem'], r['destino'], r['capacidade']) for r in registros]
+        if all(type(c) is int and c >= 0 for _, _, c in rotas): return rotas
+    except (KeyError, TypeError):
+        pass
+    return [_rota_do_registro(r, linha, caminho) for r, linha in zip(registros, linhas)]
+
+
 class RedeLogistica:
     """
     Classe principal que constrói e gerencia o grafo da rede logística.
+
+    Os nós recebem índices inteiros na ordem em que são adicionados e as
+    rotas são guardadas em arrays compactos. A adjacência é mantida como
+    forward-star (cabeça por nó, próxima rota por rota) e um union-find
+    acompanha os componentes fracamente conexos a cada rota adicionada.
     """
     def __init__(self):
-        self.nos = {} 
-        self.rotas = []
+        self._nos = {}           # nome -> nó
+        self._por_id = {}        # id -> nó
+        self._lista = []         # índice -> nó
+        self._colunas_nos = None # nós de um snapshot ainda não convertidos em objetos
+        self._origens = array('i')
+        self._destinos = array('i')
+        self._capacidades = array('q')
+        self._proxima = array('i')  # próxima rota com a mesma origem
+        # Por nó (listas, mais rápidas de indexar no laço de adicionar_rotas)
+        self._cabeca = []           # primeira rota saindo de cada nó (-1 se nenhuma)
+        self._pai = []              # union-find
+        self._tamanho = []
+        self.num_componentes = 0
+        self._csr = None
+
+    @property
+    def rotas(self) -> VisaoRotas:
+        return VisaoRotas(self)
+
+    # Vinda de um snapshot, a rede só cria os objetos NoRede no primeiro acesso
+    @property
+    def nos(self) -> dict:
+        if self._colunas_nos is not None: self._materializar_nos()
+        return self._nos
+
+    @property
+    def _nos_por_id(self) -> dict:
+        if self._colunas_nos is not None: self._materializar_nos()
+        return self._por_id
+
+    @property
+    def _lista_nos(self) -> list:
+        if self._colunas_nos is not None: self._materializar_nos()
+        return self._lista
+
+    def _materializar_nos(self):
+        colunas, self._colunas_nos = self._colunas_nos, None
+        ids = _colunas_para_textos(colunas['ids_bytes'], colunas['ids_offsets'])
+        nomes = _colunas_para_textos(colunas['nomes_bytes'], colunas['nomes_offsets'])
+        for indice, (id_, nome, tipo, lat, lon) in enumerate(zip(ids, nomes, colunas['tipos'].tolist(), colunas['lat'].tolist(), colunas['lon'].tolist())):
+            no = _CLASSES_SNAPSHOT[tipo](id_, nome, lat, lon)
+            no.indice = indice
+            self._lista.append(no)
+            self._nos[nome] = no
+            self._por_id[id_] = no
+
+    def _nomes(self) -> list:
+        """Nome de cada nó por índice, sem criar os objetos se a rede veio de um snapshot."""
+        if self._colunas_nos is not None:
+            return _colunas_para_textos(self._colunas_nos['nomes_bytes'], self._colunas_nos['nomes_offsets'])
+        return [no.nome for no in self._lista]
+
+    def _tornar_mutavel(self):
+        """Copia as colunas de rotas mapeadas de um snapshot para arrays do Python (na primeira alteração)."""
+        if isinstance(self._origens, array): return
+        self._origens, self._destinos, self._proxima = (array('i', bytes(c)) for c in (self._origens, self._destinos, self._proxima))
+        self._capacidades = array('q', bytes(self._capacidades))
 
     def adicionar_no(self, no: NoRede):
+        self._tornar_mutavel()
+        existente = self.nos.get(no.nome)
+        if existente is not None:
+            # Mesmo nome: substitui o nó, mantendo o índice e as rotas
+            no.indice = existente.indice
+            self._lista_nos[no.indice] = no
+            self._nos_por_id.pop(existente.id, None)
+        else:
+            no.indice = len(self._lista_nos)
+            self._lista_nos.append(no)
+            self._cabeca.append(-1)
+            self._pai.append(no.indice)
+            self._tamanho.append(1)
+            self.num_componentes += 1
+            self._csr = None
         self.nos[no.nome] = no
+        self._nos_por_id[no.id] = no
+
+    def no_por_id(self, id: str) -> NoRede:
+        return self._nos_por_id[id]
+
+    def no_por_indice(self, indice: int) -> NoRede:
+        return self._lista_nos[indice]
+
+    def _raiz(self, i: int) -> int:
+        pai = self._pai
+        while pai[i] != i:
+            pai[i] = pai[pai[i]]
+            i = pai[i]
+        return i
+
+    def adicionar_rotas(self, rotas):
+        """
+        Adiciona rotas (nome_origem, nome_destino, capacidade) em lote:
+        mesmo efeito de chamar adicionar_rota para cada uma, com o laço
+        (forward-star e union-find) sem chamadas de método por rota.
+        """
+        self._tornar_mutavel()
+        nos, pai, tamanho, cabeca = self.nos, self._pai, self._tamanho, self._cabeca
+        adicionar_origem, adicionar_destino = self._origens.append, self._destinos.append
+        adicionar_capacidade, adicionar_proxima = self._capacidades.append, self._proxima.append
+        rota = len(self._capacidades)
+        self._csr = None
+        try:
+            for nome_origem, nome_destino, capacidade in rotas:
+                no_origem, no_destino = nos.get(nome_origem), nos.get(nome_destino)
+                if no_origem is None or no_destino is None:
+                    raise KeyError("Nó de origem ou destino não encontrado na rede.")
+                if capacidade < 0:
+                    raise ValueError("A capacidade da rota não pode ser negativa.")
+                a, b = no_origem.indice, no_destino.indice
+                adicionar_proxima(cabeca[a])
+                cabeca[a] = rota
+                rota += 1
+                adicionar_origem(a); adicionar_destino(b); adicionar_capacidade(capacidade)
+                # União por tamanho, com compressão de caminho pela metade
+                while pai[a] != a:
+                    pai[a] = pai[pai[a]]
+                    a = pai[a]
+                while pai[b] != b:
+                    pai[b] = pai[pai[b]]
+                    b = pai[b]
+                if a != b:
+                    if tamanho[a] < tamanho[b]: a, b = b, a
+                    pai[b] = a
+                    tamanho[a] += tamanho[b]
+                    self.num_componentes -= 1
+        finally:
+            self._csr = None
 
     def adicionar_rota(self, nome_origem: str, nome_destino: str, capacidade: int):
-        if nome_origem not in self.nos or nome_destino not in self.nos:
-            raise KeyError("Nó de origem ou destino não encontrado na rede.")
-        
-        origem_no = self.nos[nome_origem]
-        destino_no = self.nos[nome_destino]
-        rota = Rota(origem_no, destino_no, capacidade)
-        self.rotas.append(rota)
+        self.adicionar_rotas(((nome_origem, nome_destino, capacidade),))
+
+    def rotas_saindo(self, nome: str):
+        """Rotas (destino, capacidade) que saem do nó, percorrendo o forward-star."""
+        rota = self._cabeca[self.nos[nome].indice]
+        while rota != -1:
+            yield self._lista_nos[self._destinos[rota]].nome, int(self._capacidades[rota])
+            rota = int(self._proxima[rota])
+
+    def adjacencia_csr(self):
+        """
+        Adjacência de saída em CSR: (indptr, destinos, capacidades), arrays
+        NumPy com as rotas ordenadas por origem. Montada na primeira chamada
+        depois de uma alteração e reaproveitada até a próxima.
+        """
+        if self._csr is None:
+            origens = np.array(memoryview(self._origens), dtype=np.int32)
+            destinos = np.array(memoryview(self._destinos), dtype=np.int32)
+            capacidades = np.array(memoryview(self._capacidades), dtype=np.int64)
+            ordem = np.argsort(origens, kind='stable')
+            indptr = np.zeros(len(self._cabeca) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(origens, minlength=len(self._cabeca)), out=indptr[1:])
+            self._csr = (indptr, destinos[ordem], capacidades[ordem])
+        return self._csr
+
+    def iterar_arestas(self):
+        """(nome_origem, nome_destino, capacidade) de cada rota, sem criar objetos Rota."""
+        nomes = self._nomes()
+        for o, d, c in self._iterar_colunas():
+            yield nomes[o], nomes[d], c
+
+    def _iterar_colunas(self, bloco: int = 1 << 16):
+        """(origem, destino, capacidade) como int do Python, lidos em blocos (arrays ou memmap)."""
+        for inicio in range(0, len(self._capacidades), bloco):
+            fim = inicio + bloco
+            yield from zip(self._origens[inicio:fim].tolist(), self._destinos[inicio:fim].tolist(), self._capacidades[inicio:fim].tolist())
+
+    def conectados(self, nome_a: str, nome_b: str) -> bool:
+        return self._raiz(self.nos[nome_a].indice) == self._raiz(self.nos[nome_b].indice)
 
     @classmethod
-    def carregar_de_json(cls, caminho_arquivo: str) -> 'RedeLogistica':
-        """Cria uma instância da RedeLogistica a partir de um arquivo JSON."""
+    def carregar_de_json(cls, caminho_arquivo: str, tamanho_lote: int = 50_000) -> 'RedeLogistica':
+        """
+        Cria uma instância da RedeLogistica a partir de um arquivo JSON.
+        `vertices` e `rotas` são lidos e validados em lotes, sem carregar o
+        arquivo inteiro; as rotas entram na rede em lotes de `tamanho_lote`.
+        Um registro inválido lança ErroCarregamentoRede com a linha onde ele
+        começa.
+        """
         print(f" Carregando dados da rede do arquivo: {caminho_arquivo}")
-        
+
         rede = cls()
-        with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-            dados = json.load(f)
-
-        # Mapeamento de tipo para classe
-        mapeamento_classes = {
-            "deposito": Deposito,
-            "hub": Hub,
-            "zona": ZonaEntrega
-        }
+        rotas, linhas_rotas, vertices_lidos = [], [], False
+
+        def adicionar_lote():
+            nos = rede.nos
+            if (set(map(itemgetter(0), rotas)) | set(map(itemgetter(1), rotas))) - nos.keys():
+                for (origem, destino, _), linha in zip(rotas, linhas_rotas):
+                    for nome in (origem, destino):
+                        if nome not in nos:
+                            raise ErroCarregamentoRede(f"rota usa o nó '{nome}', que não está em 'vertices'", linha, caminho_arquivo)
+            rede.adicionar_rotas(rotas)
+            rotas.clear(); linhas_rotas.clear()
+
+        for secao, registros, linhas in iterar_json_rede(caminho_arquivo):
+            if secao == 'vertices':
+                for registro, linha in zip(registros, linhas):
+                    rede.adicionar_no(_no_do_registro(registro, linha, caminho_arquivo))
+                vertices_lidos = True
+            elif secao == 'rotas':
+                rotas.extend(_rotas_dos_registros(registros, linhas, caminho_arquivo))
+                linhas_rotas.extend(linhas)
+                # Rotas antes dos vértices no arquivo esperam até o fim da leitura
+                if vertices_lidos and len(rotas) >= tamanho_lote: adicionar_lote()
+        adicionar_lote()
 
-        # Criar e adicionar os nós
-        for v in dados['vertices']:
-            classe_no = mapeamento_classes.get(v['tipo'].lower())
-            if not classe_no:
-                raise ValueError(f"Tipo de vértice desconhecido: {v['tipo']}")
-            
-            no = classe_no(id=v['id'], nome=v['nome'], lat=v['lat'], lon=v['lon'])
-            rede.adicionar_no(no)
-
-        # Criar e adicionar as rotas
-        for r in dados['rotas']:
-            rede.adicionar_rota(r['origem'], r['destino'], r['capacidade'])
-        
-        print("✅ Rede carregada com sucesso.")
+        print(f"✅ Rede carregada com sucesso ({len(rede._cabeca)} nós, {len(rede.rotas)} rotas).")
+        return rede
+
+    @classmethod
+    def abrir(cls, caminho_json: str) -> 'RedeLogistica':
+        """
+        Abre a rede de `caminho_json` pelo snapshot ao lado dele (mesmo nome
+        com .snapshot, gerado por converter_rede.py) quando existe e não é
+        mais antigo que o JSON; senão lê o JSON com carregar_de_json.
+        """
+        caminho_snapshot = os.path.splitext(caminho_json)[0] + ".snapshot"
+        if os.path.exists(caminho_snapshot) and (not os.path.exists(caminho_json) or os.path.getmtime(caminho_snapshot) >= os.path.getmtime(caminho_json)):
+            return cls.carregar_snapshot(caminho_snapshot)
+        return cls.carregar_de_json(caminho_json)
+
+    def salvar_snapshot(self, caminho: str):
+        """Grava a rede no snapshot binário (colunas de nós e rotas), lido de volta por carregar_snapshot."""
+        codigos = {classe: i for i, classe in enumerate(_CLASSES_SNAPSHOT)}
+        lista = self._lista_nos
+        try:
+            tipos = np.array([codigos[type(no)] for no in lista], dtype=np.uint8)
+        except KeyError as e:
+            raise ValueError(f"Tipo de nó sem código no snapshot: {e.args[0].__name__}") from None
+        ids_bytes, ids_offsets = _textos_para_colunas([no.id for no in lista])
+        nomes_bytes, nomes_offsets = _textos_para_colunas([no.nome for no in lista])
+        gravar_snapshot(caminho, {
+            "origens": np.array(memoryview(self._origens), dtype=np.int32),
+            "destinos": np.array(memoryview(self._destinos), dtype=np.int32),
+            "capacidades": np.array(memoryview(self._capacidades), dtype=np.int64),
+            "proxima": np.array(memoryview(self._proxima), dtype=np.int32),
+            "cabeca": np.array(self._cabeca, dtype=np.int32),
+            "pai": np.array(self._pai, dtype=np.int32),
+            "tamanho": np.array(self._tamanho, dtype=np.int32),
+            "tipos": tipos,
+            "lat": np.array([no.coordenadas[0] for no in lista], dtype=np.float64),
+            "lon": np.array([no.coordenadas[1] for no in lista], dtype=np.float64),
+            "ids_bytes": ids_bytes, "ids_offsets": ids_offsets,
+            "nomes_bytes": nomes_bytes, "nomes_offsets": nomes_offsets,
+        }, {"num_nos": len(lista), "num_rotas": len(self._capacidades), "num_componentes": self.num_componentes})
+
+    @classmethod
+    def carregar_snapshot(cls, caminho: str) -> 'RedeLogistica':
+        """
+        Abre um snapshot gravado por salvar_snapshot. As colunas de rotas
+        ficam mapeadas em memória (só são copiadas se a rede for alterada)
+        e os objetos dos nós são criados no primeiro acesso.
+        """
+        metadados, arrays = ler_snapshot(caminho)
+        rede = cls()
+        rede._origens, rede._destinos = arrays['origens'], arrays['destinos']
+        rede._capacidades, rede._proxima = arrays['capacidades'], arrays['proxima']
+        rede._cabeca, rede._pai, rede._tamanho = (arrays[c].tolist() for c in ('cabeca', 'pai', 'tamanho'))
+        rede._colunas_nos = {c: arrays[c] for c in _COLUNAS_NOS}
+        rede.num_componentes = metadados['num_componentes']
         return rede
 
     def validar_integridade(self) -> bool:
         """
         Valida a integridade da rede, verificando a conectividade.
         Retorna True se a rede for válida, senão lança uma exceção.
+        A conectividade vem do union-find, atualizado a cada rota: O(1).
         """
         print("\n Executando validação de integridade da rede...")
-        G = nx.DiGraph() 
-
-        # Adiciona nós e arestas ao grafo networkx
-        for nome in self.nos:
-            G.add_node(nome)
-        for rota in self.rotas:
-            G.add_edge(rota.origem.nome, rota.destino.nome)
 
         # Verifica se existem nós
-        if not self.nos:
+        if not self._cabeca:
             raise ValueError("Erro de integridade: A rede não possui nós.")
-        
+
         # 2. Verifica se existem rotas
         if not self.rotas:
             print("Aviso: A rede não possui rotas.")
             return True
 
-        
-        if not nx.is_weakly_connected(G):
-            componentes = list(nx.weakly_connected_components(G))
-            raise ConnectionError(f"Erro de integridade: A rede não é conectada. Existem {len(componentes)} grupos de nós isolados.")
-            
+        if self.num_componentes > 1:
+            raise ConnectionError(f"Erro de integridade: A rede não é conectada. Existem {self.num_componentes} grupos de nós isolados.")
+
         print("✅ Integridade da rede validada com sucesso! A rede é conectada.")
         return True
 
@@ -123,14 +428,14 @@ class RedeLogistica:
         """Converte a rede para o formato de dicionário esperado pela API do Dev 5."""
         fontes = [no.nome for no in self.nos.values() if isinstance(no, Deposito)]
         sumidouros = [no.nome for no in self.nos.values() if isinstance(no, ZonaEntrega)]
-        
+
         rotas_dict = [
-            {"origem": rota.origem.nome, "destino": rota.destino.nome, "capacidade": rota.capacidade}
-            for rota in self.rotas
+            {"origem": origem, "destino": destino, "capacidade": capacidade}
+            for origem, destino, capacidade in self.iterar_arestas()
         ]
 
         return {
             "fontes": fontes,
             "sumidouros": sumidouros,
             "rotas": rotas_dict
-        }
\ No newline at end of file
+        }
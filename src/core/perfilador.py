@@ -0,0 +1,86 @@
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import uuid
+# (perfil opcional de uma roteirização: cProfile, log da busca do OR-Tools e chamadas dos callbacks)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DIR_PERFIS = os.environ.get("VRP_DIR_PERFIS", os.path.join(ROOT_DIR, 'data', 'perfis'))
+ARQUIVOS_PERFIL = ("perfil.prof", "perfil.txt", "log_busca.txt", "resumo.json")
+
+def caminho_artefato(id_perfil: str, arquivo: str, diretorio: str = None) -> str:
+    """Caminho de um artefato de perfil; só aceita ids gerados aqui e os nomes de ARQUIVOS_PERFIL."""
+    if not re.fullmatch(r"[0-9a-f]{32}", id_perfil) or arquivo not in ARQUIVOS_PERFIL:
+        raise KeyError(f"Artefato de perfil inválido: {id_perfil}/{arquivo}")
+    caminho = os.path.join(diretorio or DIR_PERFIS, id_perfil, arquivo)
+    if not os.path.exists(caminho):
+        raise KeyError(f"Artefato de perfil não encontrado: {id_perfil}/{arquivo}")
+    return caminho
+
+
+class PerfilExecucao:
+    """
+    Perfil de uma execução do solver, ligado por `profile` no problema.
+    `capturar()` liga o cProfile e desvia o stderr do processo (onde o
+    OR-Tools escreve o log_search) para log_busca.txt; `contar()` embrulha
+    um callback contando as chamadas. `finalizar()` grava os artefatos em
+    DIR_PERFIS/<id>/ e devolve o resumo que vai na solução. Sem perfil, o
+    solver não cria esta classe.
+    """
+    def __init__(self, diretorio: str = None):
+        self.id = uuid.uuid4().hex
+        self.diretorio = os.path.join(diretorio or DIR_PERFIS, self.id)
+        os.makedirs(self.diretorio, exist_ok=True)
+        self.chamadas = {}
+        self._perfil = cProfile.Profile()
+
+    def contar(self, nome: str, funcao):
+        chamadas = self.chamadas
+        chamadas.setdefault(nome, 0)
+        def contada(*args):
+            chamadas[nome] += 1
+            return funcao(*args)
+        return contada
+
+    @contextlib.contextmanager
+    def capturar(self):
+        sys.stderr.flush()
+        stderr_original = os.dup(2)
+        with open(os.path.join(self.diretorio, "log_busca.txt"), 'ab') as log:
+            os.dup2(log.fileno(), 2)
+            self._perfil.enable()
+            try:
+                yield self
+            finally:
+                self._perfil.disable()
+                sys.stderr.flush()
+                os.dup2(stderr_original, 2)
+                os.close(stderr_original)
+
+    def finalizar(self, limite_funcoes: int = 25) -> dict:
+        self._perfil.dump_stats(os.path.join(self.diretorio, "perfil.prof"))
+        texto = io.StringIO()
+        estatisticas = pstats.Stats(self._perfil, stream=texto).sort_stats("cumulative")
+        estatisticas.print_stats(limite_funcoes * 4)
+        with open(os.path.join(self.diretorio, "perfil.txt"), 'w', encoding='utf-8') as f:
+            f.write(texto.getvalue())
+
+        funcoes = sorted(estatisticas.stats.items(), key=lambda item: item[1][3], reverse=True)[:limite_funcoes]
+        with open(os.path.join(self.diretorio, "log_busca.txt"), 'rb') as f:
+            linhas_log = f.read().decode('utf-8', errors='replace').splitlines()
+        resumo = {
+            "id": self.id,
+            "chamadas_callbacks": dict(self.chamadas),
+            "funcoes": [{"funcao": f"{os.path.basename(arquivo)}:{linha}({nome})", "chamadas": chamadas, "proprio_s": round(proprio, 4), "acumulado_s": round(acumulado, 4)}
+                        for (arquivo, linha, nome), (_, chamadas, proprio, acumulado, _) in funcoes],
+            "log_busca": {"linhas": len(linhas_log), "ultimas": linhas_log[-10:]},
+            "arquivos": list(ARQUIVOS_PERFIL),
+        }
+        with open(os.path.join(self.diretorio, "resumo.json"), 'w', encoding='utf-8') as f:
+            json.dump(resumo, f, indent=2, ensure_ascii=False)
+        return resumo
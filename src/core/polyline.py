@@ -0,0 +1,131 @@
+import math
+
+import numpy as np
+# (codec de polylines do Google/OSRM e simplificação de geometria para os mapas)
+
+def decodificar(polyline_str: str, precisao: int = 5) -> list:
+    """Decodifica uma polyline em [(lat, lon), ...], caractere a caractere (implementação de referência)."""
+    index, lat, lng, fator = 0, 0, 0, 10 ** precisao
+    coordinates = []
+    while index < len(polyline_str):
+        deltas = []
+        for _ in range(2):
+            shift, result = 0, 0
+            while True:
+                if index >= len(polyline_str): return coordinates
+                byte = ord(polyline_str[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20: break
+            deltas.append(~(result >> 1) if result & 1 else (result >> 1))
+        lat += deltas[0]
+        lng += deltas[1]
+        coordinates.append((lat / fator, lng / fator))
+    return coordinates
+
+def codificar(pontos, precisao: int = 5) -> str:
+    """Codifica [(lat, lon), ...] numa polyline (implementação de referência)."""
+    fator, anterior, saida = 10 ** precisao, (0, 0), []
+    for ponto in pontos:
+        atual = (round(ponto[0] * fator), round(ponto[1] * fator))
+        for delta in (atual[0] - anterior[0], atual[1] - anterior[1]):
+            valor = ~(delta << 1) if delta < 0 else delta << 1
+            while valor >= 0x20:
+                saida.append(chr((0x20 | (valor & 0x1f)) + 63))
+                valor >>= 5
+            saida.append(chr(valor + 63))
+        anterior = atual
+    return "".join(saida)
+
+
+def decodificar_lote(polylines: list, precisao: int = 5) -> list:
+    """
+    Decodifica várias polylines de uma vez com NumPy: todos os caracteres
+    viram um único array, os inteiros de tamanho variável são somados com
+    reduceat e as coordenadas saem de um cumsum por polyline. Devolve um
+    array (n, 2) de float64 por polyline; as polylines precisam estar
+    completas (sem truncamento no meio de um valor).
+    """
+    if not polylines: return []
+    tamanhos = np.array([len(p) for p in polylines])
+    bytes_ = np.frombuffer("".join(polylines).encode('ascii'), dtype=np.uint8).astype(np.int64) - 63
+    if not len(bytes_): return [np.empty((0, 2)) for _ in polylines]
+
+    fim = (bytes_ & 0x20) == 0
+    inicios = np.flatnonzero(np.concatenate(([True], fim[:-1])))
+    grupo = np.cumsum(np.concatenate(([0], fim[:-1].astype(np.int64))))
+    deslocamento = 5 * (np.arange(len(bytes_)) - inicios[grupo])
+    valores = np.add.reduceat((bytes_ & 0x1f) << deslocamento, inicios)
+    deltas = np.where(valores & 1, ~(valores >> 1), valores >> 1).reshape(-1, 2)
+
+    # Número de coordenadas de cada polyline = valores terminados dentro dela / 2
+    terminados = np.concatenate(([0], np.cumsum(fim)))[np.cumsum(tamanhos)]
+    pontos_por_polyline = np.diff(np.concatenate(([0], terminados))) // 2
+    acumulado = np.cumsum(deltas, axis=0)
+    inicio_pontos = np.concatenate(([0], np.cumsum(pontos_por_polyline)[:-1]))
+    base = np.where(inicio_pontos[:, None] > 0, acumulado[np.maximum(inicio_pontos - 1, 0)], 0)
+    coordenadas = (acumulado - np.repeat(base, pontos_por_polyline, axis=0)) / 10 ** precisao
+    return np.split(coordenadas, np.cumsum(pontos_por_polyline)[:-1])
+
+def codificar_lote(lista_pontos: list, precisao: int = 5) -> list:
+    """Codifica várias geometrias (arrays/listas de (lat, lon)) de uma vez com NumPy."""
+    if not lista_pontos: return []
+    arrays = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in lista_pontos]
+    tamanhos = np.array([len(a) for a in arrays])
+    inteiros = np.rint(np.concatenate(arrays) * 10 ** precisao).astype(np.int64)
+    deltas = np.diff(inteiros, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    inicios = np.cumsum(tamanhos)[:-1]
+    inicios = inicios[inicios < len(inteiros)]
+    deltas[inicios] = inteiros[inicios]
+    valores = deltas.ravel()
+    valores = np.where(valores < 0, ~(valores << 1), valores << 1)
+
+    # Até 7 blocos de 5 bits por valor; os blocos além do último são descartados
+    indice = np.arange(7)
+    num_blocos = 1 + (valores[:, None] >= 32 ** indice[1:]).sum(axis=1)
+    blocos = (valores[:, None] >> (5 * indice)) & 0x1f
+    blocos = blocos | np.where(indice < (num_blocos[:, None] - 1), 0x20, 0)
+    texto = (blocos + 63)[indice < num_blocos[:, None]].astype(np.uint8).tobytes().decode('ascii')
+
+    caracteres_acumulados = np.concatenate(([0], np.cumsum(num_blocos.reshape(-1, 2).sum(axis=1))))
+    limites = caracteres_acumulados[np.concatenate(([0], np.cumsum(tamanhos)))]
+    return [texto[limites[i]:limites[i + 1]] for i in range(len(arrays))]
+
+
+def tolerancia_para_zoom(zoom: int, latitude: float, pixels: float = 1.0) -> float:
+    """Tolerância (em graus) equivalente a `pixels` na tela no nível de zoom do mapa (tiles Web Mercator de 256 px)."""
+    metros_por_pixel = 156543.03392 * math.cos(math.radians(latitude)) / 2 ** zoom
+    return pixels * metros_por_pixel / 111320.0
+
+def simplificar(pontos, tolerancia: float) -> np.ndarray:
+    """
+    Douglas-Peucker iterativo: mantém os pontos que se afastam mais que
+    `tolerancia` (em graus de latitude) do segmento entre os pontos já
+    mantidos. A longitude é escalada por cos(lat) para a distância não
+    distorcer. As distâncias de cada segmento são calculadas em bloco.
+    """
+    pontos = np.asarray(pontos, dtype=np.float64).reshape(-1, 2)
+    if len(pontos) < 3 or tolerancia <= 0: return pontos
+    plano = pontos * [1.0, math.cos(math.radians(float(pontos[:, 0].mean())))]
+    manter = np.zeros(len(pontos), dtype=bool)
+    manter[[0, -1]] = True
+    pilha = [(0, len(pontos) - 1)]
+    while pilha:
+        inicio, fim = pilha.pop()
+        if fim - inicio < 2: continue
+        a, b = plano[inicio], plano[fim]
+        meio = plano[inicio + 1:fim]
+        segmento = b - a
+        comprimento2 = segmento @ segmento
+        if comprimento2 == 0:
+            distancias = np.hypot(*(meio - a).T)
+        else:
+            t = np.clip(((meio - a) @ segmento) / comprimento2, 0, 1)
+            distancias = np.hypot(*(meio - (a + t[:, None] * segmento)).T)
+        i = int(np.argmax(distancias))
+        if distancias[i] > tolerancia:
+            k = inicio + 1 + i
+            manter[k] = True
+            pilha.extend(((inicio, k), (k, fim)))
+    return pontos[manter]
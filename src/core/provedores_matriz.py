@@ -0,0 +1,247 @@
+import json
+import os
+import time
+import numpy as np
+import requests
+
+from src.core.roteador_local import carregar_roteador
+# (camada de provedores das matrizes de tempo/distância usadas pelo SolucionadorVRP)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+OSRM_URL = os.environ.get("OSRM_URL", "http://router.project-osrm.org")
+CAMINHO_CALIBRACAO = os.environ.get("ESTIMADOR_CALIBRACAO", os.path.join(ROOT_DIR, 'data', 'estimador_matriz.json'))
+VALOR_INALCANCAVEL = 9999999
+RAIO_TERRA_M = 6371000
+
+class ProvedorMatriz:
+    """
+    Interface dos provedores de matriz. Recebe coordenadas (lat, lon) de
+    origens e destinos e devolve as matrizes (tempo em segundos, distância
+    em metros) como arrays int32 com len(origens) linhas e len(destinos)
+    colunas. Pares sem resposta recebem VALOR_INALCANCAVEL.
+    """
+    nome = "base"
+
+    def obter_matrizes(self, origens: list, destinos: list):
+        raise NotImplementedError
+
+
+class ProvedorOSRMTable(ProvedorMatriz):
+    """
+    Usa o serviço /table do OSRM, que devolve tempo e distância numa única
+    chamada muitos-para-muitos. Problemas maiores que o limite de coordenadas
+    do servidor são divididos em blocos (tiles) de origens x destinos.
+    Depois de `max_falhas_seguidas` blocos seguidos sem resposta, esta
+    instância para de consultar (o servidor está fora do ar e cada bloco
+    esperaria o timeout); os pares ficam inalcançáveis.
+    """
+    nome = "osrm"
+
+    def __init__(self, url_base: str = None, max_locais: int = 100, timeout: float = 30, max_falhas_seguidas: int = 3):
+        self.url_base = (url_base or OSRM_URL).rstrip('/')
+        self.max_locais = max_locais
+        self.timeout = timeout
+        self.max_falhas_seguidas = max_falhas_seguidas
+        self.requisicoes = 0
+        self.falhas_seguidas = 0
+        self.duracoes_http = []  # segundos de cada requisição /table (vão para o bloco `timings` da solução)
+
+    def _consultar_bloco(self, origens, destinos):
+        coordenadas = origens + destinos
+        loc = ";".join(f"{c[1]},{c[0]}" for c in coordenadas)
+        params = {
+            "sources": ";".join(str(i) for i in range(len(origens))),
+            "destinations": ";".join(str(len(origens) + j) for j in range(len(destinos))),
+            "annotations": "duration,distance",
+        }
+        self.requisicoes += 1
+        inicio = time.perf_counter()
+        try:
+            r = requests.get(f"{self.url_base}/table/v1/driving/{loc}", params=params, timeout=self.timeout)
+            r.raise_for_status()
+            data = r.json()
+            if data.get('code') == 'Ok':
+                return data['durations'], data['distances']
+            print(f"  [AVISO] OSRM /table respondeu '{data.get('code')}'.")
+        except requests.exceptions.RequestException as e:
+            print(f"  [AVISO] Falha ao consultar OSRM /table: {e}.")
+        finally:
+            self.duracoes_http.append(time.perf_counter() - inicio)
+        return None, None
+
+    def obter_matrizes(self, origens: list, destinos: list):
+        tempo = np.full((len(origens), len(destinos)), VALOR_INALCANCAVEL, dtype=np.int32)
+        distancia = np.full((len(origens), len(destinos)), VALOR_INALCANCAVEL, dtype=np.int32)
+        lado = max(1, self.max_locais // 2)
+        blocos = [(i0, j0) for i0 in range(0, len(origens), lado) for j0 in range(0, len(destinos), lado)]
+        for num_bloco, (i0, j0) in enumerate(blocos):
+            if self.falhas_seguidas >= self.max_falhas_seguidas:
+                print(f"  [AVISO] OSRM fora do ar ({self.falhas_seguidas} falhas seguidas); {len(blocos) - num_bloco} blocos sem consulta.")
+                break
+            bloco_origens, bloco_destinos = origens[i0:i0 + lado], destinos[j0:j0 + lado]
+            duracoes, distancias = self._consultar_bloco(bloco_origens, bloco_destinos)
+            if duracoes is None:
+                self.falhas_seguidas += 1
+                continue
+            self.falhas_seguidas = 0
+            # null (par sem rota) vira NaN e mantém o valor de inalcançável; o resto é arredondado (não truncado)
+            for matriz, valores in ((tempo, duracoes), (distancia, distancias)):
+                bloco = np.array(valores, dtype=np.float64)
+                alvo = matriz[i0:i0 + len(bloco_origens), j0:j0 + len(bloco_destinos)]
+                validos = ~np.isnan(bloco)
+                alvo[validos] = np.rint(bloco[validos]).astype(np.int32)
+        return tempo, distancia
+
+
+def _haversine_m(lat1, lon1, lat2, lon2):
+    """Distância em linha reta (m) entre arrays de coordenadas em radianos, com broadcasting."""
+    a = np.sin((lat2 - lat1) * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2
+    return (2 * RAIO_TERRA_M) * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class ProvedorHaversine(ProvedorMatriz):
+    """
+    Estimativa sem rede: distância = haversine x fator de sinuosidade +
+    desvio (acesso à malha viária) e tempo = tempo fixo + distância a uma
+    velocidade média. Os parâmetros vêm de calibrar_estimador (gravados em
+    CAMINHO_CALIBRACAO) ou, sem calibração, de valores típicos urbanos.
+    Um mesmo ponto tem tempo e distância 0.
+    """
+    nome = "haversine"
+
+    def __init__(self, fator_sinuosidade: float = 1.3, velocidade_kmh: float = 30.0, desvio_m: float = 0.0, tempo_fixo_s: float = 0.0):
+        self.fator_sinuosidade = fator_sinuosidade
+        self.velocidade_kmh = velocidade_kmh
+        self.desvio_m = desvio_m
+        self.tempo_fixo_s = tempo_fixo_s
+
+    @property
+    def parametros(self) -> dict:
+        return {"fator_sinuosidade": self.fator_sinuosidade, "velocidade_kmh": self.velocidade_kmh,
+                "desvio_m": self.desvio_m, "tempo_fixo_s": self.tempo_fixo_s}
+
+    @classmethod
+    def carregar(cls, caminho: str = None) -> "ProvedorHaversine":
+        """Estimador com os parâmetros calibrados, se o arquivo existir; senão, com os padrões."""
+        caminho = caminho or CAMINHO_CALIBRACAO
+        if not os.path.exists(caminho): return cls()
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return cls(**json.load(f)['parametros'])
+
+    def estimar(self, haversine: np.ndarray):
+        """(tempo, distancia) em float a partir das distâncias em linha reta."""
+        distancia = np.where(haversine > 0, haversine * self.fator_sinuosidade + self.desvio_m, 0.0)
+        tempo = np.where(haversine > 0, self.tempo_fixo_s + distancia * (3.6 / self.velocidade_kmh), 0.0)
+        return tempo, distancia
+
+    def obter_matrizes(self, origens: list, destinos: list):
+        # Haversine pela corda entre vetores unitários: sin²(θ/2) = (1 - p·q) / 2,
+        # então o trabalho por par é um produto de matrizes (BLAS) e um arcsin
+        po, pd = _vetores_unitarios(origens), _vetores_unitarios(destinos)
+        tempo = np.empty((len(po), len(pd)), dtype=np.int32)
+        distancia = np.empty((len(po), len(pd)), dtype=np.int32)
+        faixa = max(1, (1 << 18) // max(len(pd), 1))
+        for i0 in range(0, len(po), faixa):
+            i1 = min(len(po), i0 + faixa)
+            h = po[i0:i1] @ pd.T
+            np.subtract(1.0, h, out=h)
+            np.maximum(h, 0.0, out=h)
+            np.multiply(h, 0.5, out=h)
+            np.sqrt(h, out=h)
+            np.minimum(h, 1.0, out=h)
+            np.arcsin(h, out=h)
+            # O produto escalar de um ponto com ele mesmo deixa um resto de arredondamento (~1e-8 rad): abaixo de ~1 m é o mesmo ponto
+            mesmo_ponto = h < 1e-7
+            # distância = 2R·θ/2 · fator + desvio; tempo = fixo + distância / velocidade
+            np.multiply(h, 2 * RAIO_TERRA_M * self.fator_sinuosidade, out=h)
+            np.add(h, self.desvio_m, out=h)
+            h[mesmo_ponto] = 0
+            distancia[i0:i1] = np.rint(h)
+            np.multiply(h, 3.6 / self.velocidade_kmh, out=h)
+            np.add(h, self.tempo_fixo_s, out=h)
+            h[mesmo_ponto] = 0
+            tempo[i0:i1] = np.rint(h)
+        return tempo, distancia
+
+
+def _vetores_unitarios(coordenadas) -> np.ndarray:
+    c = np.radians(np.asarray(coordenadas, dtype=np.float64).reshape(-1, 2))
+    cos_lat = np.cos(c[:, 0])
+    return np.column_stack([cos_lat * np.cos(c[:, 1]), cos_lat * np.sin(c[:, 1]), np.sin(c[:, 0])])
+
+
+def _erros(previsto: np.ndarray, real: np.ndarray) -> dict:
+    absoluto = np.abs(previsto - real)
+    percentual = absoluto / np.maximum(real, 1) * 100
+    return {"erro_medio_abs": round(float(absoluto.mean()), 1), "erro_medio_pct": round(float(percentual.mean()), 2),
+            "erro_p90_pct": round(float(np.percentile(percentual, 90)), 2), "vies_pct": round(float(((previsto - real) / np.maximum(real, 1)).mean() * 100), 2)}
+
+def calibrar_estimador(cache, amostra: int = 200_000, fracao_teste: float = 0.2, semente: int = 0):
+    """
+    Ajusta os parâmetros do ProvedorHaversine por mínimos quadrados nos
+    pares do cache (CacheParesMatriz): distância real ~ haversine e tempo
+    real ~ distância estimada. Devolve (estimador, relatório), com o erro
+    medido nos pares separados para teste.
+    """
+    origens, destinos, tempo, distancia = cache.amostrar(amostra)
+    validos = (tempo < VALOR_INALCANCAVEL) & (distancia < VALOR_INALCANCAVEL) & (distancia > 0)
+    o, d = np.radians(origens[validos]), np.radians(destinos[validos])
+    haversine = _haversine_m(o[:, 0], o[:, 1], d[:, 0], d[:, 1])
+    tempo, distancia = tempo[validos].astype(np.float64), distancia[validos].astype(np.float64)
+    positivos = haversine > 0
+    haversine, tempo, distancia = haversine[positivos], tempo[positivos], distancia[positivos]
+    if len(haversine) < 30:
+        raise ValueError(f"Poucos pares no cache para calibrar o estimador ({len(haversine)}; mínimo 30).")
+
+    ordem = np.random.default_rng(semente).permutation(len(haversine))
+    num_teste = int(len(ordem) * fracao_teste)
+    teste, treino = ordem[:num_teste], ordem[num_teste:]
+    (fator, desvio), *_ = np.linalg.lstsq(np.column_stack([haversine[treino], np.ones(len(treino))]), distancia[treino], rcond=None)
+    distancia_estimada = haversine[treino] * fator + desvio
+    (segundos_por_metro, tempo_fixo), *_ = np.linalg.lstsq(np.column_stack([distancia_estimada, np.ones(len(treino))]), tempo[treino], rcond=None)
+    estimador = ProvedorHaversine(round(float(fator), 4), round(3.6 / float(segundos_por_metro), 3), round(float(desvio), 1), round(float(tempo_fixo), 1))
+
+    avaliados = teste if len(teste) else treino
+    t_est, d_est = estimador.estimar(haversine[avaliados])
+    relatorio = {
+        "parametros": estimador.parametros, "pares_treino": len(treino), "pares_teste": len(avaliados),
+        "tempo": _erros(t_est, tempo[avaliados]), "distancia": _erros(d_est, distancia[avaliados]),
+    }
+    return estimador, relatorio
+
+def salvar_calibracao(relatorio: dict, caminho: str = None):
+    caminho = caminho or CAMINHO_CALIBRACAO
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+
+
+class ProvedorRoteadorLocal(ProvedorMatriz):
+    """
+    Matrizes calculadas no próprio processo pelo RoteadorLocal, sobre o
+    grafo viário em ROTEADOR_GRAFO: nenhuma chamada de rede. Pares sem
+    caminho na malha ficam inalcançáveis.
+    """
+    nome = "local"
+
+    def __init__(self, caminho_grafo: str = None, roteador=None):
+        self.roteador = roteador or carregar_roteador(caminho_grafo)
+
+    def obter_matrizes(self, origens: list, destinos: list):
+        tempo, distancia = self.roteador.matrizes(origens, destinos)
+        return (np.rint(np.where(np.isfinite(tempo), tempo, VALOR_INALCANCAVEL)).astype(np.int32),
+                np.rint(np.where(np.isfinite(distancia), distancia, VALOR_INALCANCAVEL)).astype(np.int32))
+
+
+PROVEDORES = {
+    "osrm": ProvedorOSRMTable,
+    "haversine": ProvedorHaversine.carregar,
+    "local": ProvedorRoteadorLocal,
+}
+
+def criar_provedor(nome: str = None, **kwargs) -> ProvedorMatriz:
+    """Cria o provedor pelo nome (padrão: variável de ambiente MATRIZ_BACKEND ou 'osrm')."""
+    nome = nome or os.environ.get("MATRIZ_BACKEND", "osrm")
+    if nome not in PROVEDORES:
+        raise ValueError(f"Provedor de matriz desconhecido: '{nome}'. Opções: {', '.join(PROVEDORES)}.")
+    return PROVEDORES[nome](**kwargs)
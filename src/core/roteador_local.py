@@ -0,0 +1,412 @@
+import heapq
+import math
+import os
+import threading
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from src.core.indice_espacial import GradeEspacial, RAIO_TERRA_M
+# (roteamento local sobre um grafo viário pré-processado: matrizes e geometria sem chamadas de rede)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CAMINHO_GRAFO = os.environ.get("ROTEADOR_GRAFO", os.path.join(ROOT_DIR, 'data', 'grafo_viario.npz'))
+VELOCIDADE_ACESSO_KMH = 15   # trecho em linha reta entre o ponto pedido e o nó mais próximo da malha
+NUM_MARCOS = 8
+
+# Velocidade (km/h) por tipo de via do OSM, quando a via não tem maxspeed
+VELOCIDADES_VIA = {
+    "motorway": 90, "motorway_link": 50, "trunk": 70, "trunk_link": 40, "primary": 50, "primary_link": 35,
+    "secondary": 40, "secondary_link": 30, "tertiary": 35, "tertiary_link": 25, "unclassified": 30,
+    "residential": 25, "living_street": 10, "service": 15, "road": 25,
+}
+
+
+class GrafoViario:
+    """
+    Grafo dirigido da malha viária em CSR: as arestas que saem do nó u são
+    as posições inicio[u]:inicio[u+1] de destinos/tempo/distancia (tempo em
+    segundos, distância em metros). Os marcos (landmarks) do ALT e a
+    hierarquia de contração, se já calculados, vão junto no .npz.
+    """
+    def __init__(self, lat, lon, inicio, destinos, tempo, distancia, marcos=None, tempo_de_marcos=None, tempo_para_marcos=None, **hierarquia):
+        self.lat, self.lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        self.inicio, self.destinos = np.asarray(inicio, dtype=np.int64), np.asarray(destinos, dtype=np.int64)
+        self.tempo, self.distancia = np.asarray(tempo, dtype=np.float64), np.asarray(distancia, dtype=np.float64)
+        self.marcos = marcos
+        self.tempo_de_marcos, self.tempo_para_marcos = tempo_de_marcos, tempo_para_marcos
+        # Arestas "para cima" da hierarquia (ver construir_hierarquia): ch_subida_* no
+        # grafo e ch_descida_* no reverso, ambas em CSR
+        self.hierarquia = {chave: np.asarray(valor) for chave, valor in hierarquia.items() if chave.startswith("ch_")} or None
+
+    @property
+    def num_nos(self) -> int:
+        return len(self.lat)
+
+    @classmethod
+    def de_arestas(cls, lat, lon, origens, destinos, tempo, distancia) -> "GrafoViario":
+        return cls(lat, lon, *cls._csr(len(lat), origens, destinos, tempo, distancia))
+
+    def reverso(self) -> "GrafoViario":
+        return GrafoViario.de_arestas(self.lat, self.lon, self.destinos, self.origens, self.tempo, self.distancia)
+
+    @staticmethod
+    def _csr(num_nos: int, origens, destinos, *valores) -> tuple:
+        origens = np.asarray(origens, dtype=np.int64)
+        ordem = np.argsort(origens, kind='stable')
+        inicio = np.zeros(num_nos + 1, dtype=np.int64)
+        np.cumsum(np.bincount(origens, minlength=num_nos), out=inicio[1:])
+        return (inicio, np.asarray(destinos, dtype=np.int64)[ordem]) + tuple(np.asarray(v, dtype=np.float64)[ordem] for v in valores)
+
+    @property
+    def origens(self) -> np.ndarray:
+        return np.repeat(np.arange(self.num_nos), np.diff(self.inicio))
+
+    def salvar(self, caminho: str):
+        extras = dict(self.hierarquia or {})
+        if self.marcos is not None:
+            extras.update({"marcos": self.marcos, "tempo_de_marcos": self.tempo_de_marcos, "tempo_para_marcos": self.tempo_para_marcos})
+        temporario = f"{caminho}.{os.getpid()}.tmp.npz"
+        np.savez(temporario, lat=self.lat, lon=self.lon, inicio=self.inicio, destinos=self.destinos,
+                 tempo=self.tempo, distancia=self.distancia, **extras)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho: str) -> "GrafoViario":
+        with np.load(caminho) as dados:
+            return cls(**{chave: dados[chave] for chave in dados.files})
+
+
+def _distancia_m(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def _maior_componente(num_nos: int, origens: np.ndarray, destinos: np.ndarray) -> np.ndarray:
+    """Máscara dos nós da maior componente (fracamente) conexa, por união e busca."""
+    pai = list(range(num_nos))
+    def raiz(x):
+        while pai[x] != x:
+            pai[x] = pai[pai[x]]
+            x = pai[x]
+        return x
+    for u, v in zip(origens.tolist(), destinos.tolist()):
+        ru, rv = raiz(u), raiz(v)
+        if ru != rv: pai[ru] = rv
+    raizes = np.array([raiz(x) for x in range(num_nos)])
+    return raizes == np.bincount(raizes).argmax()
+
+def ler_osm(caminho: str, velocidades: dict = None) -> GrafoViario:
+    """
+    Monta o grafo a partir de um extrato OSM em XML (.osm): vias com tag
+    highway de VELOCIDADES_VIA (ou maxspeed numérico), respeitando oneway,
+    e só a maior componente conexa, para nenhum ponto ficar preso numa ilha.
+    """
+    velocidades = velocidades or VELOCIDADES_VIA
+    coordenadas, vias = {}, []
+    for _, elemento in ET.iterparse(caminho, events=("end",)):
+        if elemento.tag == "node":
+            coordenadas[elemento.get("id")] = (float(elemento.get("lat")), float(elemento.get("lon")))
+            elemento.clear()
+        elif elemento.tag == "way":
+            tags = {t.get("k"): t.get("v") for t in elemento.iter("tag")}
+            if tags.get("highway") in velocidades:
+                maxspeed = (tags.get("maxspeed") or "").split()[0] if tags.get("maxspeed") else ""
+                velocidade = float(maxspeed) if maxspeed.replace('.', '', 1).isdigit() else velocidades[tags["highway"]]
+                sentido = tags.get("oneway", "yes" if tags.get("junction") == "roundabout" else "no")
+                vias.append(([nd.get("ref") for nd in elemento.iter("nd")], velocidade, sentido))
+            elemento.clear()
+        elif elemento.tag == "relation":
+            elemento.clear()
+
+    indice, origens, destinos, velocidades_aresta = {}, [], [], []
+    for refs, velocidade, sentido in vias:
+        refs = [r for r in refs if r in coordenadas]
+        if sentido == "-1": refs = refs[::-1]
+        for a, b in zip(refs, refs[1:]):
+            u, v = indice.setdefault(a, len(indice)), indice.setdefault(b, len(indice))
+            origens.append(u); destinos.append(v); velocidades_aresta.append(velocidade)
+            if sentido not in ("yes", "true", "1", "-1"):
+                origens.append(v); destinos.append(u); velocidades_aresta.append(velocidade)
+    if not indice:
+        raise ValueError(f"Nenhuma via transitável em '{caminho}'.")
+    nos = sorted(indice, key=indice.get)
+    lat = np.array([coordenadas[r][0] for r in nos]); lon = np.array([coordenadas[r][1] for r in nos])
+    origens, destinos = np.array(origens), np.array(destinos)
+    distancia = _distancia_m(lat[origens], lon[origens], lat[destinos], lon[destinos])
+    tempo = distancia / (np.array(velocidades_aresta) / 3.6)
+
+    manter = _maior_componente(len(nos), origens, destinos)
+    novo_id = np.cumsum(manter) - 1
+    arestas = manter[origens] & manter[destinos]
+    return GrafoViario.de_arestas(lat[manter], lon[manter], novo_id[origens[arestas]], novo_id[destinos[arestas]], tempo[arestas], distancia[arestas])
+
+
+def _buscar_testemunhas(saida, contraido, origem: int, excluido: int, limite: float, alvos: set, max_assentados: int) -> dict:
+    """Dijkstra limitado a partir de `origem` sem passar por `excluido`: tempos (provisórios) até onde chegou."""
+    melhor, fila, assentados = {origem: 0.0}, [(0.0, origem)], 0
+    pendentes = set(alvos)
+    while fila and pendentes and assentados < max_assentados:
+        t, u = heapq.heappop(fila)
+        if t > melhor[u]: continue
+        if t > limite: break
+        pendentes.discard(u)
+        assentados += 1
+        for v, (tv, _) in saida[u].items():
+            if v == excluido or contraido[v]: continue
+            if t + tv < melhor.get(v, math.inf):
+                melhor[v] = t + tv
+                heapq.heappush(fila, (t + tv, v))
+    return melhor
+
+def _atalhos(saida, entrada, contraido, v: int, max_assentados: int) -> list:
+    """Atalhos (u, w, tempo, distancia) necessários ao contrair v: caminhos u->v->w sem testemunha mais curta."""
+    atalhos = []
+    saidas = [(w, td) for w, td in saida[v].items() if not contraido[w]]
+    for u, (t_uv, d_uv) in entrada[v].items():
+        if contraido[u] or not saidas: continue
+        alvos = {w for w, _ in saidas if w != u}
+        if not alvos: continue
+        limite = t_uv + max(t_vw for w, (t_vw, _) in saidas if w != u)
+        melhor = _buscar_testemunhas(saida, contraido, u, v, limite, alvos, max_assentados)
+        for w, (t_vw, d_vw) in saidas:
+            if w != u and melhor.get(w, math.inf) > t_uv + t_vw:
+                atalhos.append((u, w, t_uv + t_vw, d_uv + d_vw))
+    return atalhos
+
+def construir_hierarquia(grafo: GrafoViario, max_assentados: int = 200) -> dict:
+    """
+    Hierarquia de contração: os nós são contraídos do menos ao mais
+    importante (diferença de arestas + vizinhos já contraídos, com
+    atualização preguiçosa), e cada caminho u->v->w sem testemunha mais
+    curta vira um atalho u->w. Guarda, em CSR, as arestas que sobem na
+    ordem (busca a partir da origem) e as que sobem no grafo reverso
+    (busca a partir do destino). Com a busca de testemunhas limitada, um
+    atalho a mais pode sobrar, mas nunca falta.
+    """
+    n = grafo.num_nos
+    saida, entrada = [dict() for _ in range(n)], [dict() for _ in range(n)]
+    arestas = []
+    for u, v, t, d in zip(grafo.origens.tolist(), grafo.destinos.tolist(), grafo.tempo.tolist(), grafo.distancia.tolist()):
+        if u != v and t < saida[u].get(v, (math.inf,))[0]:
+            saida[u][v] = entrada[v][u] = (t, d)
+    contraido, posto, vizinhos_contraidos = bytearray(n), [0] * n, [0] * n
+    prioridade = lambda v: len(_atalhos(saida, entrada, contraido, v, 20)) - len(saida[v]) - len(entrada[v]) + vizinhos_contraidos[v]
+    fila = [(prioridade(v), v) for v in range(n)]
+    heapq.heapify(fila)
+    ordem = 0
+    while fila:
+        _, v = heapq.heappop(fila)
+        if contraido[v]: continue
+        atual = prioridade(v)
+        if fila and atual > fila[0][0]:
+            heapq.heappush(fila, (atual, v))
+            continue
+        for u, w, t, d in _atalhos(saida, entrada, contraido, v, max_assentados):
+            if t < saida[u].get(w, (math.inf,))[0]:
+                saida[u][w] = entrada[w][u] = (t, d)
+        # As arestas de v com vizinhos ainda não contraídos sobem na hierarquia
+        for w, (t, d) in saida[v].items():
+            arestas.append((v, w, t, d))
+            del entrada[w][v]
+            vizinhos_contraidos[w] += 1
+        for u, (t, d) in entrada[v].items():
+            arestas.append((u, v, t, d))
+            del saida[u][v]
+            vizinhos_contraidos[u] += 1
+        contraido[v], posto[v] = 1, ordem
+        ordem += 1
+
+    origens, destinos, tempos, distancias = (np.array(coluna) for coluna in zip(*arestas)) if arestas else ([],) * 4
+    posto = np.array(posto)
+    sobe = posto[origens] < posto[destinos] if len(arestas) else np.zeros(0, dtype=bool)
+    hierarquia = {"ch_posto": posto}
+    for nome, filtro, de, para in (("subida", sobe, origens, destinos), ("descida", ~sobe, destinos, origens)):
+        csr = GrafoViario._csr(n, np.asarray(de)[filtro], np.asarray(para)[filtro], np.asarray(tempos)[filtro], np.asarray(distancias)[filtro])
+        hierarquia.update({f"ch_{nome}_{campo}": valor for campo, valor in zip(("inicio", "destinos", "tempo", "distancia"), csr)})
+    return hierarquia
+
+
+class RoteadorLocal:
+    """
+    Consultas de menor tempo sobre um GrafoViario, dentro do processo.
+    Cada ponto pedido é ancorado no nó mais próximo (o trecho em linha
+    reta entra a VELOCIDADE_ACESSO_KMH). Matrizes: com a hierarquia de
+    contração, buscas só para cima a partir de cada destino (deixando
+    "baldes" nos nós alcançados) e de cada origem; sem ela, um Dijkstra por
+    origem que para quando todos os destinos foram fixados. Caminho ponto a
+    ponto (geometria): A* com limites inferiores ALT dos marcos.
+    """
+    def __init__(self, grafo: GrafoViario, num_marcos: int = NUM_MARCOS):
+        self.grafo = grafo
+        self.num_marcos = num_marcos
+        self._adjacencias = self._listas(grafo)
+        if grafo.hierarquia is not None:
+            h = grafo.hierarquia
+            self._subida = tuple(h[f"ch_subida_{campo}"].tolist() for campo in ("inicio", "destinos", "tempo", "distancia"))
+            self._descida = tuple(h[f"ch_descida_{campo}"].tolist() for campo in ("inicio", "destinos", "tempo", "distancia"))
+        self._adjacencias_reversas = None
+        self._grade = GradeEspacial(np.column_stack([grafo.lat, grafo.lon]), pontos_por_celula=4)
+        self._trava_marcos = threading.Lock()
+
+    @staticmethod
+    def _listas(grafo: GrafoViario):
+        # Listas Python: no laço do Dijkstra, indexar listas é bem mais rápido que arrays NumPy
+        return grafo.inicio.tolist(), grafo.destinos.tolist(), grafo.tempo.tolist(), grafo.distancia.tolist()
+
+    def ancorar(self, coordenadas):
+        """(nó mais próximo, distância em metros até ele) de cada coordenada."""
+        return self._grade.mais_proximos(coordenadas)
+
+    def _dijkstra(self, fonte: int, alvos=None, adjacencias=None):
+        """Tempo e distância (pelo caminho mais rápido) da fonte até cada nó fixado; para quando fixar todos os `alvos`."""
+        inicio, destinos, tempos, distancias = adjacencias or self._adjacencias
+        melhor, acumulada = [math.inf] * self.grafo.num_nos, [0.0] * self.grafo.num_nos
+        fixado = bytearray(self.grafo.num_nos)
+        resultado = {}
+        pendentes = set(alvos) if alvos is not None else None
+        melhor[fonte] = 0.0
+        fila = [(0.0, fonte)]
+        heappop, heappush = heapq.heappop, heapq.heappush
+        while fila:
+            t, u = heappop(fila)
+            if fixado[u]: continue
+            fixado[u] = 1
+            resultado[u] = (t, acumulada[u])
+            if pendentes is not None:
+                pendentes.discard(u)
+                if not pendentes: break
+            d = acumulada[u]
+            for e in range(inicio[u], inicio[u + 1]):
+                v = destinos[e]
+                tv = t + tempos[e]
+                if tv < melhor[v]:
+                    melhor[v] = tv
+                    acumulada[v] = d + distancias[e]
+                    heappush(fila, (tv, v))
+        return resultado
+
+    @staticmethod
+    def _ascender(fonte: int, adjacencias) -> dict:
+        """Busca completa no grafo só de arestas para cima (o espaço de busca é pequeno)."""
+        inicio, destinos, tempos, distancias = adjacencias
+        melhor, resultado, fila = {fonte: 0.0}, {}, [(0.0, 0.0, fonte)]
+        while fila:
+            t, d, u = heapq.heappop(fila)
+            if u in resultado: continue
+            resultado[u] = (t, d)
+            for e in range(inicio[u], inicio[u + 1]):
+                v, tv = destinos[e], t + tempos[e]
+                if tv < melhor.get(v, math.inf):
+                    melhor[v] = tv
+                    heapq.heappush(fila, (tv, d + distancias[e], v))
+        return resultado
+
+    def _matrizes_nos(self, nos_o: list, nos_d: list):
+        """Tempo e distância entre nós do grafo (listas sem repetição)."""
+        tempo = np.full((len(nos_o), len(nos_d)), np.inf)
+        distancia = np.full((len(nos_o), len(nos_d)), np.inf)
+        if self.grafo.hierarquia is None:
+            alvos = set(nos_d)
+            for i, u in enumerate(nos_o):
+                fixados = self._dijkstra(u, alvos)
+                for j, v in enumerate(nos_d):
+                    if v in fixados: tempo[i, j], distancia[i, j] = fixados[v]
+            return tempo, distancia
+        baldes = {}
+        for j, v in enumerate(nos_d):
+            for x, (t, d) in self._ascender(v, self._descida).items():
+                baldes.setdefault(x, []).append((j, t, d))
+        for i, u in enumerate(nos_o):
+            linha_t, linha_d = [math.inf] * len(nos_d), [math.inf] * len(nos_d)
+            for x, (t, d) in self._ascender(u, self._subida).items():
+                for j, tb, db in baldes.get(x, ()):
+                    if t + tb < linha_t[j]:
+                        linha_t[j], linha_d[j] = t + tb, d + db
+            tempo[i], distancia[i] = linha_t, linha_d
+        return tempo, distancia
+
+    def matrizes(self, origens: list, destinos: list):
+        """(tempo em s, distância em m) como arrays float len(origens) x len(destinos); inf onde não há caminho."""
+        nos_o, acesso_o = self.ancorar(origens)
+        nos_d, acesso_d = self.ancorar(destinos)
+        unicos_o, volta_o = np.unique(nos_o, return_inverse=True)
+        unicos_d, volta_d = np.unique(nos_d, return_inverse=True)
+        tempo_nos, distancia_nos = self._matrizes_nos(unicos_o.tolist(), unicos_d.tolist())
+        tempo, distancia = tempo_nos[np.ix_(volta_o, volta_d)], distancia_nos[np.ix_(volta_o, volta_d)]
+        acesso = acesso_o[:, None] + acesso_d[None, :]
+        tempo += acesso / (VELOCIDADE_ACESSO_KMH / 3.6)
+        distancia += acesso
+        iguais = np.all(np.asarray(origens, dtype=np.float64).reshape(-1, 1, 2) == np.asarray(destinos, dtype=np.float64).reshape(1, -1, 2), axis=2)
+        tempo[iguais] = 0
+        distancia[iguais] = 0
+        return tempo, distancia
+
+    def _preparar_marcos(self):
+        """Marcos pelo critério do mais distante, com tempos de e para cada um (Dijkstra no grafo e no reverso)."""
+        with self._trava_marcos:
+            if self.grafo.marcos is not None: return
+            self._adjacencias_reversas = self._adjacencias_reversas or self._listas(self.grafo.reverso())
+            n = self.grafo.num_nos
+            marcos, de_marcos, para_marcos = [], [], []
+            mais_perto = np.full(n, np.inf)
+            proximo = int(np.argmax(self.grafo.lat + self.grafo.lon))
+            for _ in range(min(self.num_marcos, n)):
+                marcos.append(proximo)
+                for adjacencias, destino in ((self._adjacencias, de_marcos), (self._adjacencias_reversas, para_marcos)):
+                    tempos = np.full(n, np.inf)
+                    for no, (t, _) in self._dijkstra(proximo, adjacencias=adjacencias).items(): tempos[no] = t
+                    destino.append(tempos)
+                mais_perto = np.minimum(mais_perto, np.where(np.isfinite(de_marcos[-1]), de_marcos[-1], 0))
+                proximo = int(np.argmax(mais_perto))
+            self.grafo.marcos = np.array(marcos)
+            self.grafo.tempo_de_marcos, self.grafo.tempo_para_marcos = np.array(de_marcos), np.array(para_marcos)
+
+    def caminho_nos(self, origem: int, destino: int) -> list:
+        """Nós do caminho mais rápido (A* com ALT); lista vazia se não houver caminho."""
+        if self.grafo.marcos is None: self._preparar_marcos()
+        # Limite inferior de cada nó até o destino, de uma vez para todos os nós:
+        # d(v,t) >= d(L,t) - d(L,v) e d(v,t) >= d(v,L) - d(t,L), só com tempos finitos
+        de, para = self.grafo.tempo_de_marcos, self.grafo.tempo_para_marcos
+        with np.errstate(invalid='ignore'):
+            limites = np.maximum(de[:, destino, None] - de, para - para[:, destino, None])
+        limites = np.where(np.isfinite(limites), limites, 0).max(axis=0).clip(min=0).tolist()
+
+        inicio, destinos, tempos, _ = self._adjacencias
+        melhor, anterior, fechados = {origem: 0.0}, {origem: None}, set()
+        fila = [(limites[origem], origem)]
+        while fila:
+            _, u = heapq.heappop(fila)
+            if u in fechados: continue
+            if u == destino:
+                caminho = []
+                while u is not None:
+                    caminho.append(u); u = anterior[u]
+                return caminho[::-1]
+            fechados.add(u)
+            for e in range(inicio[u], inicio[u + 1]):
+                v, tv = destinos[e], melhor[u] + tempos[e]
+                if tv < melhor.get(v, math.inf):
+                    melhor[v], anterior[v] = tv, u
+                    heapq.heappush(fila, (tv + limites[v], v))
+        return []
+
+    def geometria(self, origem, destino) -> list:
+        """Pontos (lat, lon) do trecho pelas ruas: o ponto pedido, os nós do caminho e o ponto de chegada."""
+        (no_o, no_d), _ = self.ancorar([origem, destino])
+        nos = self.caminho_nos(int(no_o), int(no_d))
+        if not nos: return [tuple(origem), tuple(destino)]
+        return [tuple(origem)] + [(float(self.grafo.lat[u]), float(self.grafo.lon[u])) for u in nos] + [tuple(destino)]
+
+
+_roteadores, _trava_roteadores = {}, threading.Lock()
+
+def carregar_roteador(caminho: str = None) -> RoteadorLocal:
+    """Roteador do grafo em `caminho` (padrão: ROTEADOR_GRAFO), carregado uma vez por processo."""
+    caminho = caminho or CAMINHO_GRAFO
+    with _trava_roteadores:
+        if caminho not in _roteadores:
+            if not os.path.exists(caminho):
+                raise FileNotFoundError(f"Grafo viário '{caminho}' não encontrado. Gere-o com src/scripts/converter_osm.py.")
+            _roteadores[caminho] = RoteadorLocal(GrafoViario.carregar(caminho))
+        return _roteadores[caminho]
@@ -1,111 +1,415 @@
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
-import requests, time, os, json, hashlib
+import time, os, hashlib
+import multiprocessing
+import numpy as np
+
+from src.core.provedores_matriz import criar_provedor, ProvedorHaversine, VALOR_INALCANCAVEL
+from src.core.cache_matriz import CacheParesMatriz, DESCONHECIDO
+from src.core.indice_espacial import GradeEspacial, conectar_componentes, vizinhos_candidatos
+from src.core.metricas import Cronometro
+from src.core.perfilador import PerfilExecucao
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DIR_DADOS = os.path.join(ROOT_DIR, 'data')
+DIR_SNAPSHOTS = os.path.join(DIR_DADOS, 'matrizes')
+
+# Perfis de busca: o limite de tempo cresce com o número de paradas
+# (tempo_base_s + tempo_por_parada_s * n, até tempo_max_s) e a busca para
+# antes se o objetivo não melhorar durante janela_plato_s segundos.
+PERFIS_SOLVER = {
+    "rapido": {
+        "estrategia_inicial": "PATH_CHEAPEST_ARC", "metaheuristica": "GUIDED_LOCAL_SEARCH",
+        "tempo_base_s": 1, "tempo_por_parada_s": 0.02, "tempo_max_s": 10, "janela_plato_s": 1,
+    },
+    "equilibrado": {
+        "estrategia_inicial": "PATH_CHEAPEST_ARC", "metaheuristica": "GUIDED_LOCAL_SEARCH",
+        "tempo_base_s": 2, "tempo_por_parada_s": 0.1, "tempo_max_s": 60, "janela_plato_s": 5,
+    },
+    "completo": {
+        "estrategia_inicial": "PARALLEL_CHEAPEST_INSERTION", "metaheuristica": "GUIDED_LOCAL_SEARCH",
+        "tempo_base_s": 10, "tempo_por_parada_s": 0.5, "tempo_max_s": 600, "janela_plato_s": 30,
+    },
+}
+PERFIL_PADRAO = "equilibrado"
+ESTRATEGIAS_DE_CAMINHO = ("PATH_CHEAPEST_ARC", "PATH_MOST_CONSTRAINED_ARC", "EVALUATOR_STRATEGY", "FIRST_UNBOUND_MIN_VALUE", "GLOBAL_CHEAPEST_ARC", "LOCAL_CHEAPEST_ARC")
+
+# Uso do estimador offline (ProvedorHaversine calibrado) na montagem das
+# matrizes: "exato" só provedor; "fallback" estima os pares em que o
+# provedor falhou; "estimado" dispensa o provedor
+MODOS_MATRIZ = ("exato", "fallback", "estimado")
+MODO_MATRIZ_PADRAO = os.environ.get("MATRIZ_MODO", "fallback")
+
+# Configurações do modo portfólio, na ordem em que são distribuídas aos
+# processos: com N workers, as N primeiras disputam o mesmo problema.
+PORTFOLIO_PADRAO = [
+    {"estrategia_inicial": "PATH_CHEAPEST_ARC", "metaheuristica": "GUIDED_LOCAL_SEARCH"},
+    {"estrategia_inicial": "PARALLEL_CHEAPEST_INSERTION", "metaheuristica": "GUIDED_LOCAL_SEARCH"},
+    {"estrategia_inicial": "SAVINGS", "metaheuristica": "GUIDED_LOCAL_SEARCH"},
+    {"estrategia_inicial": "PATH_CHEAPEST_ARC", "metaheuristica": "SIMULATED_ANNEALING"},
+    {"estrategia_inicial": "LOCAL_CHEAPEST_INSERTION", "metaheuristica": "TABU_SEARCH"},
+    {"estrategia_inicial": "CHRISTOFIDES", "metaheuristica": "GUIDED_LOCAL_SEARCH"},
+    {"estrategia_inicial": "SAVINGS", "metaheuristica": "TABU_SEARCH"},
+    {"estrategia_inicial": "PATH_MOST_CONSTRAINED_ARC", "metaheuristica": "SIMULATED_ANNEALING"},
+]
+
+def _salvar_npy(caminho: str, matriz: np.ndarray):
+    """Grava de forma atômica, para outro processo nunca abrir um .npy pela metade."""
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'wb') as f:
+        np.save(f, matriz)
+    os.replace(temporario, caminho)
 
 class SolucionadorVRP:
-    def __init__(self, dados_problema: dict):
+    FATOR_CUSTO = 100  # custos em centavos: o OR-Tools só trabalha com inteiros
+
+    def __init__(self, dados_problema: dict, provedor=None, cache=None, dir_snapshots: str = None, config_busca: dict = None, matrizes: tuple = None, estimador=None):
         self.dados = dados_problema
+        self.config_busca = config_busca or {}
+        self.matrizes = matrizes
         self._nomes_locais = list(dados_problema['coordenadas'].keys())
         self._coordenadas = list(dados_problema['coordenadas'].values())
         self._deposito_idx = self._nomes_locais.index(dados_problema['nome_deposito'])
         
-        nomes_locais_ordenados = sorted(self._nomes_locais)
-        assinatura_problema = "".join(nomes_locais_ordenados)
-        hash_problema = hashlib.md5(assinatura_problema.encode()).hexdigest()
-        
-        ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        self.cache_path_tempo = os.path.join(ROOT_DIR, 'data', f'matriz_tempo_{hash_problema}.json')
-        self.cache_path_dist = os.path.join(ROOT_DIR, 'data', f'matriz_distancia_{hash_problema}.json')
+        # Snapshot denso deste problema, chaveado pelas coordenadas na ordem recebida
+        assinatura_coords = ";".join(f"{lat:.5f},{lon:.5f}" for lat, lon in self._coordenadas)
+        hash_coords = hashlib.md5(assinatura_coords.encode()).hexdigest()
+        self.dir_snapshots = dir_snapshots or DIR_SNAPSHOTS
+        self.snapshot_path_tempo = os.path.join(self.dir_snapshots, f'tempo_{hash_coords}.npy')
+        self.snapshot_path_dist = os.path.join(self.dir_snapshots, f'distancia_{hash_coords}.npy')
         
         self.manager = None
         self.routing = None
         self.solution = None
-        self.FATOR_CUSTO = 100 
+        # Provedor, cache de pares e estimador só são criados se as matrizes
+        # precisarem ser montadas aqui (com `matrizes` recebidas, nunca)
+        self._provedor, self._cache, self._estimador = provedor, cache, estimador
+        self._cache_proprio = cache is None
+        self.metricas = {}
+        self._grade = None
+        self._candidatos = None
+        self.perfil = None
 
-    def _get_osrm_route_info(self, coord1, coord2):
-        loc = f"{coord1[1]},{coord1[0]};{coord2[1]},{coord2[0]}"
-        url = f"http://router.project-osrm.org/route/v1/driving/{loc}"
-        try:
-            r = requests.get(url, timeout=10)
-            r.raise_for_status()
-            data = r.json()
-            if data.get('code') == 'Ok':
-                return {"distancia": data['routes'][0]['distance'], "tempo": data['routes'][0]['duration']}
-        except requests.exceptions.RequestException as e:
-            print(f"  [AVISO] Falha ao consultar OSRM: {e}.")
-        return None
+    @property
+    def provedor(self):
+        if self._provedor is None: self._provedor = criar_provedor()
+        return self._provedor
+
+    @property
+    def cache(self) -> CacheParesMatriz:
+        if self._cache is None: self._cache = CacheParesMatriz()
+        return self._cache
+
+    @property
+    def estimador(self) -> ProvedorHaversine:
+        if self._estimador is None: self._estimador = ProvedorHaversine.carregar()
+        return self._estimador
+
+    def fechar(self):
+        """Fecha a conexão do cache de pares, se foi aberta por este solucionador (um cache recebido é de quem o passou)."""
+        if self._cache_proprio and self._cache is not None:
+            self._cache.fechar()
+            self._cache = None
+
+    def _locais_faltantes(self, tempo: np.ndarray) -> list:
+        """Menor conjunto (guloso) de locais cujas linhas e colunas cobrem todos os pares desconhecidos."""
+        n = len(tempo)
+        desconhecidos = tempo == DESCONHECIDO
+        pendentes = desconhecidos | desconhecidos.T
+        escolhidos = np.zeros(n, dtype=bool)
+        for i in np.argsort(-pendentes.sum(axis=1), kind='stable'):
+            if np.any(pendentes[i] & ~escolhidos):
+                escolhidos[i] = True
+        # Cache frio: uma única consulta NxN em vez de (N-1)xN + 1x(N-1)
+        return list(range(n)) if escolhidos.sum() >= n - 1 else np.flatnonzero(escolhidos).tolist()
 
     def _criar_matrizes(self):
-        matrizes = {'tempo': {}, 'distancia': {}}
-        for tipo in ['tempo', 'distancia']:
-            cache_path = self.cache_path_tempo if tipo == 'tempo' else self.cache_path_dist
-            if os.path.exists(cache_path):
-                print(f"✅ Cache de {tipo} encontrado! Carregando...")
-                with open(cache_path, 'r') as f:
-                    matriz_str_keys = json.load(f)
-                    matrizes[tipo] = {int(k): {int(i):j for i,j in v.items()} for k, v in matriz_str_keys.items()}
+        """
+        Devolve as matrizes (tempo, distancia) como arrays int32 NxN.
+        Ordem de busca: matrizes recebidas no construtor (ex.: carregadas uma
+        vez para vários cenários), snapshot .npy do problema (memory-mapped),
+        cache de pares e, só para os pares que faltarem, o provedor. Com
+        `vizinhos_k` no problema, o provedor só cobre a vizinhança de cada
+        local e o resto vem do estimador (ver _completar_vizinhanca).
+        `modo_matriz` (MODOS_MATRIZ) decide se o estimador cobre as falhas do
+        provedor ou o substitui. O cache de pares aberto para isso é fechado
+        ao final.
+        """
+        if self.matrizes is not None:
+            return self.matrizes
+        try:
+            return self._montar_matrizes()
+        finally:
+            self.fechar()
+
+    def _montar_matrizes(self):
+        inicio = time.perf_counter()
+        coords = self._coordenadas
+        n = len(coords)
+        pares_total = n * (n - 1)
+        modo = self.dados.get('modo_matriz') or MODO_MATRIZ_PADRAO
+        if modo not in MODOS_MATRIZ:
+            raise ValueError(f"Modo de matriz desconhecido: '{modo}'. Opções: {', '.join(MODOS_MATRIZ)}.")
+        self.metricas['modo_matriz'] = modo
+        if os.path.exists(self.snapshot_path_tempo) and os.path.exists(self.snapshot_path_dist):
+            print("✅ Snapshot das matrizes encontrado! Mapeando em memória...")
+            tempo = np.load(self.snapshot_path_tempo, mmap_mode='r')
+            distancia = np.load(self.snapshot_path_dist, mmap_mode='r')
+            pares_cache = pares_total
+        elif modo == "estimado":
+            print("📐 Matrizes estimadas offline (sem provedor)...")
+            tempo, distancia = self.estimador.obter_matrizes(coords, coords)
+            pares_cache = 0
+            self.metricas['pares_estimados'] = pares_total
+        else:
+            tempo, distancia = self.cache.buscar(coords)
+            faltantes = self._locais_faltantes(tempo)
+
+            pares_cache = int(np.count_nonzero(tempo != DESCONHECIDO)) - n
+            if self.dados.get('vizinhos_k'):
+                self._completar_vizinhanca(tempo, distancia, modo)
             else:
-                print(f"🛠️  Cache de {tipo} não encontrado. Construindo com OSRM...")
-                num_locais = len(self._coordenadas)
-                matriz_temp = {}
-                for i in range(num_locais):
-                    matriz_temp[i] = {}
-                    for j in range(num_locais):
-                        if i == j: matriz_temp[i][j] = 0; continue
-                        info = self._get_osrm_route_info(self._coordenadas[i], self._coordenadas[j])
-                        matriz_temp[i][j] = int(info[tipo]) if info else 9999999
-                        time.sleep(0.05)
-                matrizes[tipo] = matriz_temp
-                print(f"💾 Salvando cache de {tipo}...")
-                with open(cache_path, 'w') as f:
-                    json.dump(matrizes[tipo], f)
-        return matrizes['tempo'], matrizes['distancia']
+                if faltantes:
+                    # Só as linhas e colunas dos locais novos vão ao provedor
+                    print(f"🛠️  {len(faltantes)} de {n} locais sem dados no cache. Consultando o provedor '{self.provedor.nome}'...")
+                    conjunto_faltantes = set(faltantes)
+                    conhecidos = [i for i in range(n) if i not in conjunto_faltantes]
+                    consultas = [(faltantes, list(range(n)))]
+                    if conhecidos: consultas.append((conhecidos, faltantes))
+                    self._consultar_provedor(tempo, distancia, consultas)
+
+                # Com pares que falharam no provedor o snapshot ficaria congelado; nesse caso não grava
+                if not np.any(tempo == VALOR_INALCANCAVEL) and not np.any(distancia == VALOR_INALCANCAVEL):
+                    os.makedirs(self.dir_snapshots, exist_ok=True)
+                    _salvar_npy(self.snapshot_path_tempo, tempo)
+                    _salvar_npy(self.snapshot_path_dist, distancia)
+                elif modo == "fallback":
+                    self.metricas['pares_estimados'] = self._preencher_estimativas(tempo, distancia, VALOR_INALCANCAVEL)
+                    print(f"📐 {self.metricas['pares_estimados']} pares sem resposta do provedor foram estimados.")
+
+        self.metricas['pares_total'] = pares_total
+        self.metricas['pares_cache'] = pares_cache
+        self.metricas['taxa_acerto_cache'] = round(pares_cache / pares_total, 4) if pares_total else 1.0
+        self.metricas['tempo_matrizes_s'] = round(time.perf_counter() - inicio, 3)
+        print(f"⏱️  Matrizes prontas em {self.metricas['tempo_matrizes_s']:.2f}s (acerto de cache: {self.metricas['taxa_acerto_cache']:.1%}).")
+        return tempo, distancia
+
+    def _consultar_provedor(self, tempo, distancia, consultas: list) -> int:
+        """Preenche, a partir do provedor, os pares desconhecidos de cada bloco (linhas, colunas) e grava os novos no cache."""
+        coords = self._coordenadas
+        novos_pares = []
+        for linhas, colunas in consultas:
+            t_bloco, d_bloco = self.provedor.obter_matrizes([coords[i] for i in linhas], [coords[j] for j in colunas])
+            bloco = np.ix_(linhas, colunas)
+            vazios = tempo[bloco] == DESCONHECIDO
+            tempo[bloco] = np.where(vazios, t_bloco, tempo[bloco])
+            distancia[bloco] = np.where(vazios, d_bloco, distancia[bloco])
+            for a, b in zip(*np.nonzero(vazios & (t_bloco != VALOR_INALCANCAVEL) & (d_bloco != VALOR_INALCANCAVEL))):
+                novos_pares.append((coords[linhas[a]], coords[colunas[b]], t_bloco[a, b], d_bloco[a, b]))
+        print(f"💾 Salvando {len(novos_pares)} pares novos no cache...")
+        self.cache.salvar(novos_pares)
+        return len(novos_pares)
+
+    def _vizinhancas(self) -> list:
+        """Conjuntos de vizinhos candidatos de cada local (k = vizinhos_k), sem o depósito e formando um grafo conexo."""
+        if self._candidatos is None:
+            self._grade = GradeEspacial(self._coordenadas)
+            self._candidatos = vizinhos_candidatos(self._grade.vizinhos(self.dados['vizinhos_k']))
+            for i, vizinhos in enumerate(self._candidatos):
+                if i != self._deposito_idx: vizinhos.discard(self._deposito_idx)
+            self.metricas['ligacoes_componentes'] = conectar_componentes(self._candidatos, self._grade, ignorar={self._deposito_idx})
+        return self._candidatos
+
+    def _completar_vizinhanca(self, tempo, distancia, modo: str):
+        """
+        Modo esparso (vizinhos_k): só os pares entre vizinhos e os que saem
+        ou chegam no depósito vão ao provedor, numa consulta por célula da
+        grade espacial; os pares restantes sem cache (e, no modo fallback, os
+        que falharam) recebem a estimativa do estimador. O snapshot denso não
+        é gravado, porque teria estimativas.
+        """
+        n, d = len(tempo), self._deposito_idx
+        candidatos = self._vizinhancas()
+        consultas = []
+        for membros in self._grade.celulas.values():
+            linhas = [i for i in membros if i != d]
+            colunas = sorted(set().union(*(candidatos[i] for i in linhas)) - {d}) if linhas else []
+            if not colunas: continue
+            vazios = tempo[np.ix_(linhas, colunas)] == DESCONHECIDO
+            linhas_vazias = [linhas[a] for a in np.flatnonzero(vazios.any(axis=1))]
+            colunas_vazias = [colunas[b] for b in np.flatnonzero(vazios.any(axis=0))]
+            if linhas_vazias: consultas.append((linhas_vazias, colunas_vazias))
+        outros = [i for i in range(n) if i != d]
+        if np.any(tempo[d, outros] == DESCONHECIDO): consultas.append(([d], outros))
+        if np.any(tempo[outros, d] == DESCONHECIDO): consultas.append((outros, [d]))
+        if consultas:
+            print(f"🛠️  Matriz esparsa (k={self.dados['vizinhos_k']}): {len(consultas)} consultas ao provedor '{self.provedor.nome}'...")
+            self._consultar_provedor(tempo, distancia, consultas)
+
+        exatos = int(np.count_nonzero((tempo != DESCONHECIDO) & (tempo != VALOR_INALCANCAVEL))) - n
+        estimados = self._preencher_estimativas(tempo, distancia, DESCONHECIDO)
+        if modo == "fallback": estimados += self._preencher_estimativas(tempo, distancia, VALOR_INALCANCAVEL)
+        self.metricas['vizinhos_k'] = self.dados['vizinhos_k']
+        self.metricas['pares_exatos'] = exatos
+        self.metricas['pares_estimados'] = estimados
+
+    def _preencher_estimativas(self, tempo, distancia, marcador: int) -> int:
+        """Troca pelo estimador os pares marcados com `marcador`, em faixas de linhas. Devolve quantos foram trocados."""
+        n, trocados = len(tempo), 0
+        for i0 in range(0, n, 512):
+            faixa = slice(i0, min(n, i0 + 512))
+            vazios = (tempo[faixa] == marcador) | (distancia[faixa] == marcador)
+            if not vazios.any(): continue
+            t_est, d_est = self.estimador.obter_matrizes(self._coordenadas[faixa], self._coordenadas)
+            tempo[faixa] = np.where(vazios, t_est, tempo[faixa])
+            distancia[faixa] = np.where(vazios, d_est, distancia[faixa])
+            trocados += int(vazios.sum())
+        return trocados
+
+    def _matrizes_de_transito(self, matriz_tempo, matriz_distancia):
+        """
+        Calcula uma única vez, com NumPy, as matrizes inteiras por nó de custo
+        financeiro, tempo (viagem + serviço) e distância. Elas são registradas
+        direto no OR-Tools, então a busca não chama código Python por arco.
+        """
+        distancia = np.asarray(matriz_distancia, dtype=np.int64)
+        tempo_transito = np.asarray(matriz_tempo, dtype=np.int64) + (self.dados.get('tempo_servico') or 0)
+        custo_distancia = (self.dados.get('custo_km') or 0) * (distancia / 1000.0)
+        custo_tempo = (self.dados.get('custo_hora') or 0) * (tempo_transito / 3600.0)
+        # astype trunca em direção a zero, como o int() aplicado arco a arco
+        custo = ((custo_distancia + custo_tempo) * self.FATOR_CUSTO).astype(np.int64)
+        return custo, tempo_transito, distancia
+
+    def _rotas_iniciais(self, plano_anterior: list, custo_arcos: np.ndarray):
+        """
+        Reconcilia o plano anterior (lista 'rotas_otimizadas') com o problema
+        atual: descarta paradas que saíram, tira paradas de rotas que passaram
+        da capacidade e insere as novas na posição de menor custo.
+        Devolve as rotas por veículo (índices de nó, sem o depósito).
+        """
+        indice = {nome: i for i, nome in enumerate(self._nomes_locais)}
+        demanda = lambda i: self.dados['demandas'].get(self._nomes_locais[i], 0)
+        num_veiculos, capacidade = self.dados['num_veiculos'], self.dados['capacidade_veiculo']
+        rotas = [[] for _ in range(num_veiculos)]
+        vistos, pendentes, removidas = set(), [], 0
+        for k, rota in enumerate(plano_anterior):
+            veiculo = rota.get('veiculo_id', k + 1) - 1
+            for parada in rota.get('rota', []):
+                nome = parada['local'] if isinstance(parada, dict) else parada
+                i = indice.get(nome)
+                if i is None: removidas += 1; continue
+                if i == self._deposito_idx or i in vistos: continue
+                vistos.add(i)
+                if 0 <= veiculo < num_veiculos: rotas[veiculo].append(i)
+                else: pendentes.append(i)
+
+        cargas = []
+        for rota in rotas:
+            while sum(demanda(i) for i in rota) > capacidade:
+                pendentes.append(rota.pop())
+            cargas.append(sum(demanda(i) for i in rota))
+
+        novas = [i for i in range(len(self._nomes_locais)) if i != self._deposito_idx and i not in vistos]
+        for i in novas + pendentes:
+            melhor = None
+            for v, rota in enumerate(rotas):
+                if cargas[v] + demanda(i) > capacidade: continue
+                sequencia = [self._deposito_idx] + rota + [self._deposito_idx]
+                for pos in range(len(sequencia) - 1):
+                    a, b = sequencia[pos], sequencia[pos + 1]
+                    delta = custo_arcos[a, i] + custo_arcos[i, b] - custo_arcos[a, b]
+                    if melhor is None or delta < melhor[0]: melhor = (delta, v, pos)
+            if melhor is not None:
+                _, v, pos = melhor
+                rotas[v].insert(pos, i)
+                cargas[v] += demanda(i)
+
+        self.metricas['paradas_removidas'] = removidas
+        self.metricas['paradas_novas'] = len(novas)
+        return rotas
+
+    def _configuracao_busca(self) -> dict:
+        """
+        Perfil escolhido, com os ajustes do problema (tempo_limite_s,
+        janela_plato_s) e depois os de config_busca (ex.: a estratégia de um
+        worker do portfólio) aplicados por cima. No modo esparso, estratégias
+        que estendem um caminho arco a arco viram inserção: presas aos
+        vizinhos candidatos, fecham a rota ao fim do primeiro grupo de paradas.
+        """
+        perfil = self.dados.get('perfil_solver') or PERFIL_PADRAO
+        if perfil not in PERFIS_SOLVER:
+            raise ValueError(f"Perfil de solver desconhecido: '{perfil}'. Opções: {', '.join(PERFIS_SOLVER)}.")
+        config = {"perfil": perfil, **PERFIS_SOLVER[perfil]}
+        num_paradas = len(self._nomes_locais) - 1
+        config['tempo_limite_s'] = min(config['tempo_max_s'], config['tempo_base_s'] + config['tempo_por_parada_s'] * num_paradas)
+        for chave in ('tempo_limite_s', 'janela_plato_s'):
+            if self.dados.get(chave): config[chave] = self.dados[chave]
+        config.update(self.config_busca)
+        if self.dados.get('vizinhos_k') and config['estrategia_inicial'] in ESTRATEGIAS_DE_CAMINHO:
+            config['estrategia_inicial'] = "PARALLEL_CHEAPEST_INSERTION"
+        return config
+
+    def _registrar_transito(self, nome: str, matriz: np.ndarray) -> int:
+        """Matriz registrada no OR-Tools; com perfil, callback Python equivalente que conta as chamadas."""
+        if self.perfil is None:
+            return self.routing.RegisterTransitMatrix(matriz.tolist())
+        no, linhas = self.manager.IndexToNode, matriz.tolist()
+        return self.routing.RegisterTransitCallback(self.perfil.contar(nome, lambda i, j: linhas[no(i)][no(j)]))
+
+    def _registrar_unario(self, nome: str, valores: list) -> int:
+        if self.perfil is None:
+            return self.routing.RegisterUnaryTransitVector(valores)
+        no = self.manager.IndexToNode
+        return self.routing.RegisterUnaryTransitCallback(self.perfil.contar(nome, lambda i: valores[no(i)]))
 
     def resolver(self):
+        """
+        Com `profile` no problema, a execução roda sob o PerfilExecucao
+        (cProfile, log_search e callbacks contados) e a solução ganha o
+        bloco `perfil`, com o id dos artefatos gravados.
+        """
+        if not self.dados.get('profile'):
+            return self._resolver()
+        self.perfil = PerfilExecucao()
+        with self.perfil.capturar():
+            solucao = self._resolver()
+        resumo = self.perfil.finalizar()
+        print(f"🔬 Perfil da execução gravado em {self.perfil.diretorio}")
+        if solucao: solucao['perfil'] = resumo
+        return solucao
+
+    def _resolver(self):
+        cronometro = Cronometro()
+        chamadas_anteriores = len(getattr(self._provedor, 'duracoes_http', []))
         matriz_tempo, matriz_distancia = self._criar_matrizes()
+        # O provedor só existe se as matrizes foram montadas aqui
+        duracoes_http = getattr(self._provedor, 'duracoes_http', [])
+        cronometro.marcar("matrizes")
         self.manager = pywrapcp.RoutingIndexManager(len(matriz_tempo), self.dados['num_veiculos'], self._deposito_idx)
         self.routing = pywrapcp.RoutingModel(self.manager)
+        custo_arcos, tempo_arcos, distancia_arcos = self._matrizes_de_transito(matriz_tempo, matriz_distancia)
 
-        def custo_financeiro_callback(from_index, to_index):
-            from_node = self.manager.IndexToNode(from_index)
-            to_node = self.manager.IndexToNode(to_index)
-            distancia_km = matriz_distancia.get(from_node, {}).get(to_node, 0) / 1000.0
-            custo_distancia = self.dados.get('custo_km', 0) * distancia_km
-            tempo_servico_seg = self.dados.get('tempo_servico', 0)
-            tempo_viagem_seg = matriz_tempo.get(from_node, {}).get(to_node, 0)
-            tempo_total_horas = (tempo_viagem_seg + tempo_servico_seg) / 3600.0
-            custo_tempo = self.dados.get('custo_hora', 0) * tempo_total_horas
-            custo_total = custo_distancia + custo_tempo
-            return int(custo_total * self.FATOR_CUSTO)
-
-        custo_callback_index = self.routing.RegisterTransitCallback(custo_financeiro_callback)
+        custo_callback_index = self._registrar_transito("custo", custo_arcos)
         self.routing.SetArcCostEvaluatorOfAllVehicles(custo_callback_index)
 
         penalidade_nao_prioritario = 10000 * self.FATOR_CUSTO
-        prioridades = self.dados.get('prioridades', {})
+        prioridades = self.dados.get('prioridades') or {}
         for i, nome_local in enumerate(self._nomes_locais):
             if i == self._deposito_idx: continue
             if prioridades.get(nome_local) != 1:
                 self.routing.AddDisjunction([self.manager.NodeToIndex(i)], penalidade_nao_prioritario)
         
-        def tempo_callback(from_index, to_index):
-            from_node = self.manager.IndexToNode(from_index)
-            to_node = self.manager.IndexToNode(to_index)
-            return matriz_tempo.get(from_node, {}).get(to_node, 999999) + self.dados.get('tempo_servico', 0)
-        
-        transit_callback_index_tempo = self.routing.RegisterTransitCallback(tempo_callback)
+        transit_callback_index_tempo = self._registrar_transito("tempo", tempo_arcos)
         self.routing.AddDimension(transit_callback_index_tempo, 0, 24 * 3600, False, 'Tempo')
         time_dimension = self.routing.GetDimensionOrDie('Tempo')
         
-        for nome_local, janela in self.dados.get('janelas_de_tempo', {}).items():
+        for nome_local, janela in (self.dados.get('janelas_de_tempo') or {}).items():
             if nome_local in self._nomes_locais:
                 index = self.manager.NodeToIndex(self._nomes_locais.index(nome_local))
                 time_dimension.CumulVar(index).SetRange(janela[0], janela[1])
 
-        def demanda_callback(from_index):
-            from_node = self.manager.IndexToNode(from_index)
-            return self.dados['demandas'].get(self._nomes_locais[from_node], 0)
-        demand_callback_index = self.routing.RegisterUnaryTransitCallback(demanda_callback)
+        demandas = [self.dados['demandas'].get(nome_local, 0) for nome_local in self._nomes_locais]
+        demand_callback_index = self._registrar_unario("demanda", demandas)
         self.routing.AddDimensionWithVehicleCapacity(demand_callback_index, 0, [self.dados['capacidade_veiculo']] * self.dados['num_veiculos'], True, 'Capacidade')
 
         balancear_por = self.dados.get('balancear_carga_por')
@@ -114,29 +418,81 @@ class SolucionadorVRP:
             time_dimension.SetGlobalSpanCostCoefficient(100)
         elif balancear_por == 'distancia':
             print("⚖️ Aplicando balanceamento por DISTÂNCIA...")
-            def distancia_callback(from_index, to_index):
-                from_node = self.manager.IndexToNode(from_index)
-                to_node = self.manager.IndexToNode(to_index)
-                return matriz_distancia.get(from_node, {}).get(to_node, 0)
-            
-            dist_callback_index = self.routing.RegisterTransitCallback(distancia_callback)
+            dist_callback_index = self._registrar_transito("distancia", distancia_arcos)
             self.routing.AddDimension(dist_callback_index, 0, 1000000, True, 'Distancia')
             distancia_dimension = self.routing.GetDimensionOrDie('Distancia')
             distancia_dimension.SetGlobalSpanCostCoefficient(30)
 
+        if self.dados.get('vizinhos_k'):
+            # Arcos candidatos: de cada parada só para os seus vizinhos ou de volta ao depósito
+            fins = [self.routing.End(v) for v in range(self.dados['num_veiculos'])]
+            for i, vizinhos in enumerate(self._vizinhancas()):
+                if i == self._deposito_idx: continue
+                indice = self.manager.NodeToIndex(i)
+                self.routing.NextVar(indice).SetValues([indice] + fins + [self.manager.NodeToIndex(j) for j in vizinhos])
+
+        config = self._configuracao_busca()
         search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-        search_parameters.first_solution_strategy = (routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC)
-        search_parameters.local_search_metaheuristic = (routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH)
-        search_parameters.time_limit.FromSeconds(30)
-        
-        self.solution = self.routing.SolveWithParameters(search_parameters)
+        search_parameters.first_solution_strategy = getattr(routing_enums_pb2.FirstSolutionStrategy, config['estrategia_inicial'])
+        search_parameters.local_search_metaheuristic = getattr(routing_enums_pb2.LocalSearchMetaheuristic, config['metaheuristica'])
+        search_parameters.time_limit.FromMilliseconds(int(config['tempo_limite_s'] * 1000))
+        if self.perfil is not None: search_parameters.log_search = True
+
+        # Trajetória do objetivo (só melhorias) e parada por platô: a cada
+        # solução aceita, encerra a busca se a melhor não mudou há janela_plato_s
+        trajetoria, tempos_solucoes, estado = [], [], {"parada_antecipada": False}
+        def ao_encontrar_solucao():
+            agora = time.perf_counter()
+            tempos_solucoes.append(agora)
+            objetivo = self.routing.CostVar().Value()
+            if not trajetoria or objetivo < trajetoria[-1][1]:
+                trajetoria.append((agora, objetivo))
+            elif agora - trajetoria[-1][0] > config['janela_plato_s']:
+                estado['parada_antecipada'] = True
+                self.routing.solver().FinishCurrentSearch()
+        self.routing.AddAtSolutionCallback(ao_encontrar_solucao)
+        self.routing.CloseModelWithParameters(search_parameters)
+        cronometro.marcar("modelo")
+
+        inicio_busca = time.perf_counter()
+        atribuicao_inicial = None
+        plano_anterior = self.dados.get('plano_anterior')
+        if plano_anterior:
+            rotas = self._rotas_iniciais(plano_anterior, custo_arcos)
+            rotas_indices = [[self.manager.NodeToIndex(i) for i in rota] for rota in rotas]
+            atribuicao_inicial = self.routing.ReadAssignmentFromRoutes(rotas_indices, True)
+            if atribuicao_inicial is None:
+                print("⚠️  Plano anterior inviável para o problema atual. Partindo do zero...")
+
+        if atribuicao_inicial is not None:
+            print("♻️  Partida a quente a partir do plano anterior...")
+            self.metricas['partida'] = 'quente'
+            self.solution = self.routing.SolveFromAssignmentWithParameters(atribuicao_inicial, search_parameters)
+        else:
+            self.metricas['partida'] = 'fria'
+            self.solution = self.routing.SolveWithParameters(search_parameters)
+        cronometro.marcar("busca")
+        self.metricas['status_solver'] = routing_enums_pb2.RoutingSearchStatus.Value.Name(self.routing.status())
+        self.metricas['tempo_busca_s'] = round(time.perf_counter() - inicio_busca, 3)
+        if tempos_solucoes:
+            self.metricas['tempo_primeira_solucao_s'] = round(tempos_solucoes[0] - inicio_busca, 3)
+        self.metricas['perfil_solver'] = config['perfil']
+        self.metricas['estrategia_inicial'] = config['estrategia_inicial']
+        self.metricas['metaheuristica'] = config['metaheuristica']
+        self.metricas['tempo_limite_s'] = config['tempo_limite_s']
+        self.metricas['parada_antecipada'] = estado['parada_antecipada']
+        self.metricas['trajetoria_objetivo'] = [[round(t - inicio_busca, 3), objetivo] for t, objetivo in trajetoria]
 
         if self.solution:
-            return self._formatar_solucao(matriz_distancia, matriz_tempo, time_dimension)
+            self.metricas['objetivo'] = self.solution.ObjectiveValue()
+            solucao = self._formatar_solucao(matriz_distancia, matriz_tempo, time_dimension)
+            cronometro.marcar("formatacao")
+            solucao['timings'] = cronometro.timings(http_s=[round(d, 4) for d in duracoes_http[chamadas_anteriores:]], provedor_matriz=getattr(self._provedor, 'nome', None))
+            return solucao
         return None
 
     def _formatar_solucao(self, matriz_distancia, matriz_tempo, time_dimension):
-        rotas_otimizadas, distancia_total, custo_total_operacional = [], 0, 0.0
+        rotas_otimizadas, distancia_total, custo_total_operacional, atendidas = [], 0, 0.0, 0
         for id_veiculo in range(self.dados['num_veiculos']):
             index = self.routing.Start(id_veiculo)
             rota_veiculo_pontos, carga_rota, distancia_rota, custo_rota = [], 0, 0, 0.0
@@ -155,15 +511,16 @@ class SolucionadorVRP:
                     from_node = self.manager.IndexToNode(previous_index)
                     to_node = self.manager.IndexToNode(index)
                     
-                    dist_arco = matriz_distancia.get(from_node, {}).get(to_node, 0)
+                    dist_arco = int(matriz_distancia[from_node, to_node])
                     distancia_rota += dist_arco
                     
-                    tempo_arco = matriz_tempo.get(from_node, {}).get(to_node, 0) + self.dados.get('tempo_servico', 0)
+                    tempo_arco = int(matriz_tempo[from_node, to_node]) + self.dados.get('tempo_servico', 0)
                     custo_arco = (dist_arco / 1000.0 * self.dados.get('custo_km', 0)) + \
                                  (tempo_arco / 3600.0 * self.dados.get('custo_hora', 0))
                     custo_rota += custo_arco
             
             if len(rota_veiculo_pontos) > 1:
+                atendidas += len(rota_veiculo_pontos) - 1
                 distancia_total += distancia_rota
                 custo_total_operacional += custo_rota
                 rotas_otimizadas.append({
@@ -171,10 +528,86 @@ class SolucionadorVRP:
                     'distancia_metros': int(distancia_rota), 'carga_total': carga_rota,
                     'custo_rota': custo_rota
                 })
-        
-       
+
+        self.metricas['paradas_nao_atendidas'] = len(self._nomes_locais) - 1 - atendidas
         return {
             'rotas_otimizadas': rotas_otimizadas,
             'distancia_total_metros': int(distancia_total),
-            'custo_total': custo_total_operacional 
+            'custo_total': custo_total_operacional,
+            'metricas': self.metricas
         }
+
+
+def resolver_problema(dados_problema: dict, config_busca: dict = None):
+    """Ponto de entrada usado pelos processos do pool de jobs (precisa ser picklável)."""
+    return SolucionadorVRP(dados_problema, config_busca=config_busca).resolver()
+
+def processos_por_job(variavel: str) -> int:
+    """
+    Processos que um job pode abrir para si (portfólio, cenários, clusters):
+    o valor de `variavel` no ambiente ou, sem ele, a fatia de CPUs de cada
+    processo do pool de jobs (VRP_MAX_WORKERS), para não passar de uma CPU
+    por processo com o pool cheio.
+    """
+    cpus = os.cpu_count() or 2
+    return int(os.environ.get(variavel) or max(1, cpus // int(os.environ.get("VRP_MAX_WORKERS", cpus))))
+
+# Matrizes do processo worker, recebidas uma vez na criação do processo
+_MATRIZES_WORKER = None
+
+def _iniciar_worker(matriz_tempo, matriz_distancia):
+    global _MATRIZES_WORKER
+    _MATRIZES_WORKER = (matriz_tempo, matriz_distancia)
+
+def _resolver_configuracao(dados_problema: dict, config_busca: dict):
+    return SolucionadorVRP(dados_problema, config_busca=config_busca, matrizes=_MATRIZES_WORKER).resolver()
+
+def resolver_portfolio(dados_problema: dict, num_configuracoes: int = None, configuracoes: list = None, max_workers: int = None):
+    """
+    Resolve o mesmo problema em paralelo, um processo por configuração de
+    busca, e devolve a solução de menor objetivo. As matrizes são montadas
+    uma vez aqui e entregues a cada worker na criação do processo; todos
+    recebem o mesmo limite de tempo e quem não terminar até o prazo (mais
+    uma folga) fica de fora da disputa e tem o processo encerrado. Sem
+    `max_workers`, o pool usa processos_por_job("VRP_PORTFOLIO_WORKERS").
+    """
+    configuracoes = list(configuracoes or PORTFOLIO_PADRAO)[:num_configuracoes or None]
+    max_workers = min(max_workers or processos_por_job("VRP_PORTFOLIO_WORKERS"), len(configuracoes))
+    cronometro = Cronometro()
+    solver = SolucionadorVRP(dados_problema)
+    prazo_s = solver._configuracao_busca()['tempo_limite_s'] + 5
+    matrizes = solver._criar_matrizes()
+    cronometro.marcar("matrizes")
+
+    print(f"🏁 Portfólio: {len(configuracoes)} configurações em até {max_workers} processos...")
+    # Ao sair do bloco o pool é terminado: workers ainda buscando depois do prazo não ficam órfãos
+    with multiprocessing.Pool(max_workers, initializer=_iniciar_worker, initargs=matrizes) as pool:
+        tarefas = [pool.apply_async(_resolver_configuracao, (dados_problema, config)) for config in configuracoes]
+        fim = time.monotonic() + prazo_s * -(-len(configuracoes) // max_workers)
+        for tarefa in tarefas:
+            tarefa.wait(max(0, fim - time.monotonic()))
+        concluidas = [tarefa.ready() for tarefa in tarefas]
+    cronometro.marcar("configuracoes")
+
+    participantes, melhor = [], None
+    for i, tarefa in enumerate(tarefas):
+        participante = {**configuracoes[i], "status": "sem_solucao", "objetivo": None}
+        solucao = None
+        if not concluidas[i]: participante['status'] = "prazo_esgotado"
+        else:
+            try: solucao = tarefa.get(0)
+            except Exception as e: participante.update(status="erro", erro=str(e))
+        if solucao:
+            participante.update(status="ok", objetivo=solucao['metricas']['objetivo'], tempo_busca_s=solucao['metricas']['tempo_busca_s'])
+            if melhor is None or participante['objetivo'] < melhor[1]['metricas']['objetivo']:
+                melhor = (i, solucao)
+        participantes.append(participante)
+
+    if melhor is None: return None
+    vencedora, solucao = melhor
+    solucao['metricas'] = {**solver.metricas, **solucao['metricas'], 'portfolio': {"vencedora": configuracoes[vencedora], "participantes": participantes}}
+    # As matrizes foram montadas aqui, antes dos workers: as requisições delas entram no bloco da vencedora
+    timings = solucao.get('timings', {})
+    solucao['timings'] = {**timings, 'http_s': [round(d, 4) for d in getattr(solver._provedor, 'duracoes_http', [])] + timings.get('http_s', []),
+                          'provedor_matriz': getattr(solver._provedor, 'nome', None), 'portfolio': cronometro.timings()}
+    return solucao
@@ -1,66 +1,34 @@
 import folium
-import json
 import os
+import sys
 import requests
 from branca.element import Template, MacroElement
 import random
 
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-API_BASE_URL = "http://127.0.0.1:8000"
+sys.path.insert(0, ROOT_DIR)
 
-NOME_ARQUIVO_MAPA = os.path.join(ROOT_DIR, "outputs", "mapa_roteirizado.html") 
+from src.core.geometria_rotas import ServicoGeometria
+from src.core.modelo_rede import NOMES_TIPO, Deposito, RedeLogistica, ZonaEntrega
+from src.core.polyline import simplificar, tolerancia_para_zoom
 
+API_BASE_URL = "http://127.0.0.1:8000"
 
-def decode_polyline(polyline_str):
-    index, lat, lng = 0, 0, 0
-    coordinates = []
-    while index < len(polyline_str):
-        b, shift, result = 0, 0, 0
-        while True:
-            b = ord(polyline_str[index]) - 63
-            index += 1
-            result |= (b & 0x1f) << shift
-            shift += 5
-            if b < 0x20: break
-        dlat = ~(result >> 1) if result & 1 else (result >> 1)
-        lat += dlat
-        b, shift, result = 0, 0, 0
-        while True:
-            b = ord(polyline_str[index]) - 63
-            index += 1
-            result |= (b & 0x1f) << shift
-            shift += 5
-            if b < 0x20: break
-        dlng = ~(result >> 1) if result & 1 else (result >> 1)
-        lng += dlng
-        coordinates.append((lat / 100000.0, lng / 100000.0))
-    return coordinates
-
-def get_route_from_osrm(start_coords, end_coords):
-    url = f"http://router.project-osrm.org/route/v1/driving/{start_coords[1]},{start_coords[0]};{end_coords[1]},{end_coords[0]}?overview=full&geometries=polyline"
-    try:
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        if data['code'] == 'Ok':
-            return decode_polyline(data['routes'][0]['geometry'])
-    except requests.exceptions.RequestException as e:
-        print(f"Aviso: Não foi possível conectar ao OSRM para traçar rota. {e}")
-    return [start_coords, end_coords] 
+NOME_ARQUIVO_MAPA = os.path.join(ROOT_DIR, "outputs", "mapa_roteirizado.html") 
 
 
 caminho_json_base = os.path.join(ROOT_DIR, 'data', 'rede_base.json')
 
-with open(caminho_json_base, encoding='utf-8') as f:
-    rede_base = json.load(f)
+# Usa data/rede_base.snapshot (converter_rede.py) quando estiver atualizado
+rede_base = RedeLogistica.abrir(caminho_json_base)
 
 # Montar o problema de roteirização (VRP)
 print("🛠️  Montando o problema de roteirização (VRP)...")
-coordenadas = {v['nome']: (v['lat'], v['lon']) for v in rede_base['vertices']}
-deposito_nome = rede_base['fontes'][0]
+coordenadas = {nome: no.coordenadas for nome, no in rede_base.nos.items()}
+deposito_nome = next(nome for nome, no in rede_base.nos.items() if isinstance(no, Deposito))
 
-demandas = {v['nome']: random.randint(5, 25) for v in rede_base['vertices'] if v['tipo'] == 'zona'}
+demandas = {nome: random.randint(5, 25) for nome, no in rede_base.nos.items() if isinstance(no, ZonaEntrega)}
 demandas[deposito_nome] = 0
 
 problema_vrp = {
@@ -91,27 +59,23 @@ mapa = folium.Map(location=map_center, zoom_start=13, tiles="CartoDB positron")
 # Adicionar marcadores dos locais
 icones = {'deposito': 'truck', 'hub': 'warehouse', 'zona': 'home'}
 cores_icones = {'deposito': 'blue', 'hub': 'green', 'zona': 'orange'}
-for v in rede_base['vertices']:
+for nome, no in rede_base.nos.items():
+    tipo = NOMES_TIPO[type(no)]
     folium.Marker(
-        location=[v['lat'], v['lon']],
-        popup=f"<b>{v['nome']}</b><br>Tipo: {v['tipo']}<br>Demanda: {demandas.get(v['nome'], 0)} pacotes",
-        icon=folium.Icon(icon=icones[v['tipo']], prefix='fa', color=cores_icones[v['tipo']])
+        location=list(no.coordenadas),
+        popup=f"<b>{nome}</b><br>Tipo: {tipo}<br>Demanda: {demandas.get(nome, 0)} pacotes",
+        icon=folium.Icon(icon=icones[tipo], prefix='fa', color=cores_icones[tipo])
     ).add_to(mapa)
 
-# Desenhar as rotas otimizadas dos veículos
+# Desenhar as rotas otimizadas dos veículos (uma requisição /route por veículo, trechos em cache)
 cores_rotas = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b']
+caminhos = ServicoGeometria().geometrias_solucao(solucao_vrp, coordenadas)
+tolerancia = tolerancia_para_zoom(13 + 2, map_center[0])
 for i, rota_info in enumerate(solucao_vrp['rotas_otimizadas']):
     cor = cores_rotas[i % len(cores_rotas)]
-    pontos_da_rota = rota_info['rota']
-    caminho_completo = []
-
-    for j in range(len(pontos_da_rota) - 1):
-        origem = coordenadas[pontos_da_rota[j]]
-        destino = coordenadas[pontos_da_rota[j+1]]
-        segmento = get_route_from_osrm(origem, destino)
-        caminho_completo.extend(segmento)
+    pontos_da_rota = [p['local'] for p in rota_info['rota']]
+    caminho_completo = simplificar(caminhos[rota_info['veiculo_id']], tolerancia).tolist()
 
-    
     tooltip_content = (f"<b>Veículo {rota_info['veiculo_id']}</b><br>"
                        f"Carga: {rota_info['carga_total']}<br>"
                        f"Distância: {rota_info['distancia_metros']/1000:.2f} km<br>"
@@ -0,0 +1,110 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from ortools.constraint_solver import routing_enums_pb2
+from ortools.constraint_solver import pywrapcp
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+from src.core.solucionador_vrp import SolucionadorVRP
+from src.scripts.servidor_stub_osrm import tempo_stub, distancia_stub
+
+# Compara, com o mesmo orçamento de tempo, o modelo com callbacks Python por
+# arco (versão antiga do SolucionadorVRP) e o modelo com matrizes registradas
+# no OR-Tools. Mede quantos vizinhos a busca local conseguiu avaliar.
+
+def gerar_instancia(num_paradas: int, semente: int):
+    rng = random.Random(semente)
+    coords = [(-9.60 + rng.uniform(-0.08, 0.08), -35.73 + rng.uniform(-0.08, 0.08)) for _ in range(num_paradas + 1)]
+    tempo = np.array([[int(tempo_stub(a, b)) for b in coords] for a in coords], dtype=np.int32)
+    distancia = np.array([[int(distancia_stub(a, b)) for b in coords] for a in coords], dtype=np.int32)
+    demandas = [0] + [rng.randint(1, 10) for _ in range(num_paradas)]
+    num_veiculos = max(2, sum(demandas) // 80 + 1)
+    dados = {
+        "coordenadas": {f"P{i}": c for i, c in enumerate(coords)},
+        "demandas": {f"P{i}": d for i, d in enumerate(demandas)},
+        "num_veiculos": num_veiculos, "capacidade_veiculo": 100, "nome_deposito": "P0",
+        "tempo_servico": 300, "custo_km": 0.6, "custo_hora": 20.0,
+    }
+    return dados, tempo, distancia
+
+
+def montar_modelo(dados, matriz_tempo, matriz_distancia, modo: str):
+    """Modelo de roteamento com custo, tempo e capacidade: callbacks Python ("python") ou matrizes ("matriz")."""
+    nomes = list(dados['coordenadas'])
+    manager = pywrapcp.RoutingIndexManager(len(nomes), dados['num_veiculos'], 0)
+    routing = pywrapcp.RoutingModel(manager)
+
+    if modo == "python":
+        def custo_financeiro_callback(from_index, to_index):
+            from_node = manager.IndexToNode(from_index)
+            to_node = manager.IndexToNode(to_index)
+            distancia_km = int(matriz_distancia[from_node, to_node]) / 1000.0
+            tempo_total_horas = (int(matriz_tempo[from_node, to_node]) + dados.get('tempo_servico', 0)) / 3600.0
+            return int((dados.get('custo_km', 0) * distancia_km + dados.get('custo_hora', 0) * tempo_total_horas) * 100)
+
+        def tempo_callback(from_index, to_index):
+            return int(matriz_tempo[manager.IndexToNode(from_index), manager.IndexToNode(to_index)]) + dados.get('tempo_servico', 0)
+
+        def demanda_callback(from_index):
+            return dados['demandas'].get(nomes[manager.IndexToNode(from_index)], 0)
+
+        custo_idx = routing.RegisterTransitCallback(custo_financeiro_callback)
+        tempo_idx = routing.RegisterTransitCallback(tempo_callback)
+        demanda_idx = routing.RegisterUnaryTransitCallback(demanda_callback)
+    else:
+        solver_vrp = SolucionadorVRP(dados, matrizes=(matriz_tempo, matriz_distancia))
+        custo, tempo_transito, _ = solver_vrp._matrizes_de_transito(matriz_tempo, matriz_distancia)
+        custo_idx = routing.RegisterTransitMatrix(custo.tolist())
+        tempo_idx = routing.RegisterTransitMatrix(tempo_transito.tolist())
+        demanda_idx = routing.RegisterUnaryTransitVector([dados['demandas'][n] for n in nomes])
+
+    routing.SetArcCostEvaluatorOfAllVehicles(custo_idx)
+    routing.AddDimension(tempo_idx, 0, 24 * 3600, False, 'Tempo')
+    routing.AddDimensionWithVehicleCapacity(demanda_idx, 0, [dados['capacidade_veiculo']] * dados['num_veiculos'], True, 'Capacidade')
+    return manager, routing
+
+
+def montar_e_resolver(dados, matriz_tempo, matriz_distancia, modo: str, segundos: int):
+    _, routing = montar_modelo(dados, matriz_tempo, matriz_distancia, modo)
+    parametros = pywrapcp.DefaultRoutingSearchParameters()
+    parametros.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+    parametros.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+    parametros.time_limit.FromSeconds(segundos)
+
+    inicio = time.perf_counter()
+    solucao = routing.SolveWithParameters(parametros)
+    return {
+        "modo": modo,
+        "tempo_s": time.perf_counter() - inicio,
+        "vizinhos_aceitos": routing.solver().AcceptedNeighbors(),
+        "ramificacoes": routing.solver().Branches(),
+        "objetivo": solucao.ObjectiveValue() if solucao else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Callbacks Python x matrizes nativas no OR-Tools.")
+    parser.add_argument("--paradas", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--segundos", type=int, default=30)
+    parser.add_argument("--semente", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'paradas':>8} {'modo':>8} {'vizinhos aceitos':>17} {'ramificações':>13} {'objetivo':>10}")
+    for num_paradas in args.paradas:
+        dados, tempo, distancia = gerar_instancia(num_paradas, args.semente)
+        resultados = [montar_e_resolver(dados, tempo, distancia, modo, args.segundos) for modo in ("python", "matriz")]
+        for r in resultados:
+            print(f"{num_paradas:>8} {r['modo']:>8} {r['vizinhos_aceitos']:>17} {r['ramificacoes']:>13} {r['objetivo']:>10}")
+        antes, depois = resultados
+        if antes['ramificacoes']:
+            print(f"{'':>8} {'ganho':>8} {depois['vizinhos_aceitos'] / max(1, antes['vizinhos_aceitos']):>16.1f}x {depois['ramificacoes'] / antes['ramificacoes']:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
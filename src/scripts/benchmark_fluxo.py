@@ -0,0 +1,106 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+from src.core.fluxo_maximo import RedeFluxo
+
+
+def gerar_rede_fluxo(num_arestas: int, semente: int = 42, num_fontes: int = 4, num_sumidouros: int = 16) -> RedeFluxo:
+    """
+    Gera uma rede em camadas (depósitos -> hubs -> ... -> zonas), com grau
+    médio 8, parecida com a rede logística real mas em escala nacional.
+    """
+    rng = random.Random(semente)
+    num_nos = max(num_fontes + num_sumidouros + 2, num_arestas // 8)
+    num_camadas = max(3, int(num_nos ** 0.5) // 4)
+    camada = [0] * num_fontes + [rng.randint(1, num_camadas - 2) for _ in range(num_nos - num_fontes - num_sumidouros)] + [num_camadas - 1] * num_sumidouros
+    nos_por_camada = [[] for _ in range(num_camadas)]
+    for no, c in enumerate(camada):
+        nos_por_camada[c].append(no)
+    camadas_vazias = [c for c in range(num_camadas) if not nos_por_camada[c]]
+    for c in camadas_vazias:
+        nos_por_camada[c].append(nos_por_camada[c - 1][-1])
+
+    arestas = []
+    while len(arestas) < num_arestas:
+        u = rng.randrange(num_nos)
+        c = camada[u]
+        if c == num_camadas - 1: continue
+        # Maioria das arestas avança uma camada; algumas voltam ou pulam
+        salto = rng.choice((1, 1, 1, 1, 2, 0))
+        destino_camada = min(num_camadas - 1, c + salto)
+        v = rng.choice(nos_por_camada[destino_camada])
+        if u != v:
+            arestas.append((f"n{u}", f"n{v}", rng.randint(1, 1000)))
+
+    fontes = [f"n{i}" for i in range(num_fontes)]
+    sumidouros = [f"n{i}" for i in range(num_nos - num_sumidouros, num_nos)]
+    return RedeFluxo(fontes, sumidouros, arestas)
+
+
+def medir_consultas(rede: RedeFluxo, algoritmo: str, num_consultas: int, semente: int):
+    """Consultas "e se" (corte de 30% numa rota ou fechamento de um hub): incremental x recálculo do zero."""
+    rng = random.Random(semente)
+    rotas_com_fluxo = [(o, d) for (o, d, _), arco in zip(rede.arestas, rede.arcos) if rede.grafo.fluxo_do_arco(arco) > 0]
+    hubs = [nome for nome in rede.indice_no if nome not in rede.fontes and nome not in rede.sumidouros]
+    consultas = []
+    for _ in range(num_consultas):
+        if rng.random() < 0.7:
+            o, d = rng.choice(rotas_com_fluxo)
+            consultas.append([{"tipo": "capacidade", "origem": o, "destino": d, "fator": 0.7}])
+        else:
+            consultas.append([{"tipo": "fechar_no", "no": rng.choice(hubs)}])
+
+    inicio = time.perf_counter()
+    for consulta in consultas:
+        rede.simular(consulta, algoritmo)
+    incremental = (time.perf_counter() - inicio) / num_consultas
+
+    inicio = time.perf_counter()
+    for consulta in consultas:
+        copia = RedeFluxo(rede.fontes, rede.sumidouros, rede.arestas)
+        copia.simular(consulta, algoritmo, persistir=True)
+    do_zero = (time.perf_counter() - inicio) / num_consultas
+    return incremental, do_zero
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do motor de fluxo máximo em redes geradas.")
+    parser.add_argument("--arestas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--algoritmos", nargs="+", default=["edmonds_karp", "dinic"])
+    parser.add_argument("--max-arestas-ek", type=int, default=50_000, help="Edmonds-Karp é pulado acima deste tamanho.")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--consultas", type=int, default=0, help="Mede também N consultas \"e se\" por rede (incremental x do zero).")
+    args = parser.parse_args()
+
+    print(f"{'arestas':>10} {'algoritmo':>14} {'montagem (s)':>13} {'solução (s)':>12} {'fluxo máximo':>13} {'gargalos (s)':>13}")
+    for num_arestas in args.arestas:
+        for algoritmo in args.algoritmos:
+            if algoritmo == "edmonds_karp" and num_arestas > args.max_arestas_ek:
+                continue
+            inicio = time.perf_counter()
+            rede = gerar_rede_fluxo(num_arestas, args.semente)
+            montagem = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            fluxo = rede.resolver(algoritmo)
+            solucao = time.perf_counter() - inicio
+
+            # Corte mínimo e sensibilidade numa passada sobre o residual
+            inicio = time.perf_counter()
+            gargalos = rede.analisar_gargalos()
+            analise = time.perf_counter() - inicio
+            assert gargalos['capacidade_corte_minimo'] == fluxo
+            print(f"{num_arestas:>10} {algoritmo:>14} {montagem:>13.2f} {solucao:>12.2f} {fluxo:>13} {analise:>13.2f}")
+            if args.consultas:
+                incremental, do_zero = medir_consultas(rede, algoritmo, args.consultas, args.semente)
+                print(f"{'':>10} {'e se':>14} incremental {incremental * 1000:.1f} ms | do zero {do_zero * 1000:.1f} ms | ganho {do_zero / incremental:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
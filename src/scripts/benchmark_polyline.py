@@ -0,0 +1,64 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+from src.core.polyline import codificar, decodificar, decodificar_lote, simplificar, tolerancia_para_zoom
+
+# Mede o custo de desenhar um mapa com muitas rotas: decodificação das
+# polylines (referência x lote com NumPy) e o tamanho das coordenadas
+# embutidas no HTML do Folium, com e sem simplificação por zoom.
+
+def gerar_geometrias(num_veiculos: int, pontos_por_rota: int, semente: int) -> list:
+    """Traçados densos (um ponto a cada ~1-3 m), como os devolvidos pelo OSRM com overview=full."""
+    rng = np.random.default_rng(semente)
+    geometrias = []
+    for _ in range(num_veiculos):
+        direcoes = np.cumsum(rng.normal(0, 0.05, pontos_por_rota))
+        passos = np.column_stack([np.sin(direcoes), np.cos(direcoes)]) * rng.uniform(1e-5, 3e-5, (pontos_por_rota, 1))
+        geometrias.append(np.round(np.cumsum(passos, axis=0) + [-9.62, -35.73], 5))
+    return geometrias
+
+
+def _cronometrar(funcao, repeticoes: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes): funcao()
+    return (time.perf_counter() - inicio) / repeticoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decodificação e simplificação das geometrias dos mapas.")
+    parser.add_argument("--veiculos", type=int, default=50)
+    parser.add_argument("--pontos", type=int, default=3000, help="Pontos por rota.")
+    parser.add_argument("--zoom", type=int, default=14, help="Zoom inicial do mapa (a simplificação usa zoom + 2).")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--semente", type=int, default=7)
+    args = parser.parse_args()
+
+    geometrias = gerar_geometrias(args.veiculos, args.pontos, args.semente)
+    polylines = [codificar(g) for g in geometrias]
+    print(f"🗺️  {args.veiculos} rotas x {args.pontos} pontos ({sum(map(len, polylines)) / 1e6:.1f} MB de polylines)")
+
+    t_referencia = _cronometrar(lambda: [decodificar(p) for p in polylines], args.repeticoes)
+    t_lote = _cronometrar(lambda: decodificar_lote(polylines), args.repeticoes)
+    print(f"{'decodificação':<22} referência {t_referencia * 1000:>8.1f} ms | lote {t_lote * 1000:>8.1f} ms | ganho {t_referencia / t_lote:.1f}x")
+
+    tolerancia = tolerancia_para_zoom(args.zoom + 2, -9.62)
+    t_simplificar = _cronometrar(lambda: [simplificar(g, tolerancia) for g in geometrias], args.repeticoes)
+    simplificadas = [simplificar(g, tolerancia) for g in geometrias]
+    # O Folium embute cada PolyLine como uma lista JSON de [lat, lon]
+    tamanho_completo = sum(len(json.dumps(g.tolist())) for g in geometrias)
+    tamanho_simplificado = sum(len(json.dumps(g.tolist())) for g in simplificadas)
+    pontos_simplificados = sum(len(g) for g in simplificadas)
+    print(f"{'simplificação':<22} {t_simplificar * 1000:.1f} ms | pontos {args.veiculos * args.pontos} -> {pontos_simplificados}")
+    print(f"{'coordenadas no HTML':<22} {tamanho_completo / 1e6:.2f} MB -> {tamanho_simplificado / 1e6:.2f} MB ({tamanho_completo / tamanho_simplificado:.1f}x menor)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import networkx as nx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+from src.core.modelo_rede import Deposito, Hub, RedeLogistica, ZonaEntrega
+
+# Monta e valida redes logísticas sintéticas (de milhares a 1 milhão de
+# rotas) com o núcleo compacto da RedeLogistica e, opcionalmente, com o
+# modelo antigo (objetos sem __slots__ + networkx a cada validação). Com
+# --carregamento, compara também a abertura da rede a partir do arquivo:
+# json.load inteiro, leitura incremental do JSON e snapshot binário.
+
+def gerar_registros(num_rotas: int, semente: int):
+    """Vértices e rotas de uma rede conexa: uma árvore geradora e rotas aleatórias extras."""
+    rng = random.Random(semente)
+    num_nos = max(2, num_rotas // 10)
+    tipos = ["deposito"] + [rng.choice(("hub", "zona", "zona")) for _ in range(num_nos - 1)]
+    vertices = [(f"v{i}", tipos[i], f"No {i}", -9.6 + rng.random(), -35.7 + rng.random()) for i in range(num_nos)]
+    rotas = [(f"No {rng.randrange(i)}", f"No {i}", rng.randint(1, 100)) for i in range(1, num_nos)]
+    rotas += [(f"No {rng.randrange(num_nos)}", f"No {rng.randrange(num_nos)}", rng.randint(1, 100)) for _ in range(num_rotas - len(rotas))]
+    return vertices, rotas
+
+
+CLASSES = {"deposito": Deposito, "hub": Hub, "zona": ZonaEntrega}
+
+def montar_compacta(vertices, rotas):
+    rede = RedeLogistica()
+    for id_, tipo, nome, lat, lon in vertices:
+        rede.adicionar_no(CLASSES[tipo](id_, nome, lat, lon))
+    rede.adicionar_rotas(rotas)
+    return rede
+
+def validar_compacta(rede):
+    return rede.num_componentes == 1
+
+
+class _NoLegado:
+    def __init__(self, id, nome, lat, lon):
+        self.id, self.nome, self.coordenadas = id, nome, (lat, lon)
+
+class _RotaLegado:
+    def __init__(self, origem, destino, capacidade):
+        self.origem, self.destino, self.capacidade = origem, destino, capacidade
+
+def montar_legado(vertices, rotas):
+    nos = {nome: _NoLegado(id_, nome, lat, lon) for id_, _, nome, lat, lon in vertices}
+    return nos, [_RotaLegado(nos[o], nos[d], c) for o, d, c in rotas]
+
+def validar_legado(rede):
+    nos, rotas = rede
+    G = nx.DiGraph()
+    G.add_nodes_from(nos)
+    G.add_edges_from((r.origem.nome, r.destino.nome) for r in rotas)
+    return nx.is_weakly_connected(G)
+
+
+def medir(montar, validar, vertices, rotas):
+    """Tempos sem tracemalloc (que deixa o Python bem mais lento); memória numa segunda montagem."""
+    inicio = time.perf_counter()
+    rede = montar(vertices, rotas)
+    t_montar = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    conexa = validar(rede)
+    t_validar = time.perf_counter() - inicio
+    del rede
+
+    tracemalloc.start()
+    rede = montar(vertices, rotas)
+    memoria = tracemalloc.get_traced_memory()[0]
+    validar(rede)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"montar_s": t_montar, "validar_s": t_validar, "memoria_mb": memoria / 1e6, "pico_mb": pico / 1e6, "conexa": conexa}
+
+
+def _carregar_json_inteiro(caminho):
+    with open(caminho, encoding='utf-8') as f:
+        dados = json.load(f)
+    return montar_compacta([(v['id'], v['tipo'], v['nome'], v['lat'], v['lon']) for v in dados['vertices']],
+                           [(r['origem'], r['destino'], r['capacidade']) for r in dados['rotas']])
+
+def medir_carregamento(vertices, rotas):
+    """Tempo e pico de memória para abrir a mesma rede de cada formato de arquivo."""
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_json, caminho_snapshot = os.path.join(pasta, "rede.json"), os.path.join(pasta, "rede.snapshot")
+        with open(caminho_json, 'w', encoding='utf-8') as f:
+            json.dump({"vertices": [{"id": i, "tipo": t, "nome": n, "lat": la, "lon": lo} for i, t, n, la, lo in vertices],
+                       "rotas": [{"origem": o, "destino": d, "capacidade": c} for o, d, c in rotas]}, f, indent=1)
+        montar_compacta(vertices, rotas).salvar_snapshot(caminho_snapshot)
+        formas = [("json.load", _carregar_json_inteiro), ("incremental", RedeLogistica.carregar_de_json),
+                  ("snapshot", RedeLogistica.carregar_snapshot)]
+        resultados = {}
+        for nome, carregar in formas:
+            caminho = caminho_snapshot if nome == "snapshot" else caminho_json
+            with contextlib.redirect_stdout(io.StringIO()):
+                inicio = time.perf_counter()
+                rede = carregar(caminho)
+                tempo = time.perf_counter() - inicio
+                assert rede.num_componentes == 1
+                del rede
+                tracemalloc.start()
+                rede = carregar(caminho)
+                pico = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                del rede
+            resultados[nome] = (tempo, pico / 1e6)
+        return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Montagem e validação da RedeLogistica.")
+    parser.add_argument("--rotas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legado-ate", type=int, default=100_000, help="Maior rede medida também com o modelo antigo.")
+    parser.add_argument("--semente", type=int, default=7)
+    parser.add_argument("--carregamento", action="store_true", help="Mede também a abertura da rede a partir de JSON e de snapshot.")
+    args = parser.parse_args()
+
+    print(f"{'rotas':>10} {'modelo':>9} {'montar (s)':>11} {'validar (s)':>12} {'memória (MB)':>13} {'pico (MB)':>10}")
+    for num_rotas in args.rotas:
+        vertices, rotas = gerar_registros(num_rotas, args.semente)
+        modelos = [("compacto", montar_compacta, validar_compacta)]
+        if num_rotas <= args.legado_ate: modelos.append(("legado", montar_legado, validar_legado))
+        for nome, montar, validar in modelos:
+            r = medir(montar, validar, vertices, rotas)
+            assert r['conexa']
+            print(f"{num_rotas:>10} {nome:>9} {r['montar_s']:>11.2f} {r['validar_s']:>12.4f} {r['memoria_mb']:>13.1f} {r['pico_mb']:>10.1f}")
+
+    if args.carregamento:
+        print(f"\n{'rotas':>10} {'arquivo':>12} {'abrir (s)':>10} {'pico (MB)':>10}")
+        for num_rotas in args.rotas:
+            for nome, (tempo, pico) in medir_carregamento(*gerar_registros(num_rotas, args.semente)).items():
+                print(f"{num_rotas:>10} {nome:>12} {tempo:>10.3f} {pico:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import copy
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+import numpy as np
+
+from src.core.roteador_local import GrafoViario, RoteadorLocal
+
+# Mede o RoteadorLocal num grafo gerado por converter_osm.py: matriz NxN pela
+# hierarquia de contração x Dijkstra com parada antecipada, e caminho ponto a
+# ponto (geometria) pelo A* com ALT x Dijkstra.
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do roteador local.")
+    parser.add_argument("grafo", help="Arquivo .npz gerado por src/scripts/converter_osm.py.")
+    parser.add_argument("--pontos", type=int, default=100)
+    parser.add_argument("--caminhos", type=int, default=50)
+    args = parser.parse_args()
+
+    grafo = GrafoViario.carregar(args.grafo)
+    print(f"🗺️  {grafo.num_nos} nós, {len(grafo.destinos)} arestas, hierarquia: {'sim' if grafo.hierarquia else 'não'}")
+    roteador = RoteadorLocal(grafo)
+    sem_hierarquia = copy.copy(grafo); sem_hierarquia.hierarquia = None
+    dijkstra = RoteadorLocal(sem_hierarquia)
+
+    rng = np.random.default_rng(0)
+    pontos = np.column_stack([rng.uniform(grafo.lat.min(), grafo.lat.max(), args.pontos), rng.uniform(grafo.lon.min(), grafo.lon.max(), args.pontos)])
+    print(f"\n{'consulta':<28}{'tempo (s)':>12}")
+    inicio = time.perf_counter()
+    tempo, _ = roteador.matrizes(pontos, pontos)
+    t_ch = time.perf_counter() - inicio
+    print(f"{f'matriz {args.pontos}x{args.pontos} (CH)':<28}{t_ch:>12.3f}")
+    amostra = max(1, args.pontos // 10)
+    inicio = time.perf_counter()
+    referencia, _ = dijkstra.matrizes(pontos[:amostra], pontos)
+    t_dij = (time.perf_counter() - inicio) * args.pontos / amostra
+    print(f"{f'matriz {args.pontos}x{args.pontos} (Dijkstra)':<28}{t_dij:>12.3f}  (estimado por {amostra} origens)")
+    assert np.allclose(tempo[:amostra], referencia)
+
+    nos, _ = roteador.ancorar(pontos)
+    pares = [(int(nos[i % len(nos)]), int(nos[(i * 7 + 1) % len(nos)])) for i in range(args.caminhos)]
+    roteador.caminho_nos(*pares[0])
+    inicio = time.perf_counter()
+    for a, b in pares: roteador.caminho_nos(a, b)
+    t_alt = (time.perf_counter() - inicio) / len(pares)
+    inicio = time.perf_counter()
+    for a, b in pares: dijkstra._dijkstra(a, {b})
+    t_p2p = (time.perf_counter() - inicio) / len(pares)
+    print(f"{'caminho (A* + ALT)':<28}{t_alt:>12.4f}")
+    print(f"{'caminho (Dijkstra)':<28}{t_p2p:>12.4f}")
+    print(f"\n⚡ Matriz {t_dij / t_ch:.1f}x mais rápida com a hierarquia; caminho {t_p2p / t_alt:.1f}x com ALT.")
+
+
+if __name__ == "__main__":
+    main()
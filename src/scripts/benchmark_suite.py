@@ -0,0 +1,176 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+import ortools
+
+from src.core.cache_matriz import CacheParesMatriz
+from src.core.fluxo_maximo import RedeFluxo
+from src.core.provedores_matriz import ProvedorOSRMTable
+from src.core.solucionador_vrp import SolucionadorVRP
+from src.scripts.gerador_instancias import gerar_problema_vrp, gerar_rede_logistica
+from src.scripts.servidor_stub_osrm import iniciar_servidor_stub
+
+# Suíte de benchmarks em instâncias sintéticas (gerador_instancias.py), com
+# as matrizes vindas do servidor stub do OSRM, local e determinístico. Mede,
+# por caso de VRP, a montagem das matrizes (cache frio e snapshot), a
+# construção do modelo, a busca e o objetivo com orçamentos de tempo fixos;
+# e, por tamanho de rede, a montagem e a vazão do fluxo máximo. Grava os
+# resultados em JSON e os compara com uma baseline para achar regressões.
+
+CAMINHO_BASELINE = os.path.join(ROOT_DIR, 'data', 'benchmark_baseline.json')
+
+CASOS_VRP = [
+    {"caso": "vrp_50", "num_paradas": 50},
+    {"caso": "vrp_50_janelas", "num_paradas": 50, "janelas_de_tempo": True},
+    {"caso": "vrp_50_prioridades", "num_paradas": 50, "prioridades": True},
+    {"caso": "vrp_100_tempo", "num_paradas": 100, "balancear_carga_por": "tempo"},
+    {"caso": "vrp_100_distancia", "num_paradas": 100, "balancear_carga_por": "distancia"},
+    {"caso": "vrp_200", "num_paradas": 200},
+]
+ROTAS_FLUXO = [10_000, 100_000]
+ORCAMENTOS_S = [1, 5]
+
+
+def medir_vrp(caso: dict, url: str, orcamentos: list, semente: int) -> dict:
+    """
+    Uma entrada por orçamento ("caso@Ns"). A busca roda sem parada por platô,
+    para o objetivo refletir o orçamento inteiro.
+    """
+    parametros = {chave: valor for chave, valor in caso.items() if chave != "caso"}
+    dados = gerar_problema_vrp(semente=semente, **parametros)
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta, contextlib.redirect_stdout(io.StringIO()):
+        novo_solver = lambda extras: SolucionadorVRP({**dados, "modo_matriz": "exato", **extras}, provedor=ProvedorOSRMTable(url),
+                                                     cache=CacheParesMatriz(os.path.join(pasta, "pares.sqlite")), dir_snapshots=pasta)
+        frio = novo_solver({})
+        frio._criar_matrizes()
+        quente = novo_solver({})
+        quente._criar_matrizes()
+        for orcamento in orcamentos:
+            solucao = novo_solver({"tempo_limite_s": orcamento, "janela_plato_s": orcamento}).resolver()
+            linha = {"paradas": parametros["num_paradas"], "orcamento_s": orcamento,
+                     "matrizes_frio_s": frio.metricas['tempo_matrizes_s'], "matrizes_snapshot_s": quente.metricas['tempo_matrizes_s'],
+                     "requisicoes_matriz": frio.provedor.requisicoes, "status": "sem_solucao"}
+            if solucao:
+                timings, metricas = solucao['timings'], solucao['metricas']
+                linha.update(modelo_s=timings['modelo_s'], busca_s=timings['busca_s'], formatacao_s=timings['formatacao_s'],
+                             objetivo=metricas['objetivo'], paradas_nao_atendidas=metricas['paradas_nao_atendidas'],
+                             status=metricas['status_solver'])
+            resultados[f"{caso['caso']}@{orcamento:g}s"] = linha
+    return resultados
+
+
+def medir_fluxo(num_rotas: int, algoritmo: str, semente: int) -> dict:
+    inicio = time.perf_counter()
+    rede = gerar_rede_logistica(num_rotas, semente)
+    montagem = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    fluxo = RedeFluxo.de_rede_logistica(rede)
+    conversao = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    fluxo_maximo = fluxo.resolver(algoritmo)
+    solucao = time.perf_counter() - inicio
+    return {f"fluxo_{num_rotas}_{algoritmo}": {
+        "rotas": num_rotas, "montagem_s": round(montagem, 4), "conversao_s": round(conversao, 4), "solucao_s": round(solucao, 4),
+        "rotas_por_segundo": round(num_rotas / solucao), "fluxo_maximo": fluxo_maximo,
+    }}
+
+
+def comparar(resultados: dict, baseline: dict, tolerancia: float = 0.25, folga_s: float = 0.05, tolerancia_objetivo: float = 0.05) -> list:
+    """
+    Regressões em relação à baseline (mesmas chaves de caso): tempos (`*_s`)
+    acima de `tolerancia` e de `folga_s` absolutos, vazão abaixo de
+    `tolerancia`, objetivo acima de `tolerancia_objetivo`, mais paradas não
+    atendidas, caso que deixou de ter solução e qualquer mudança no fluxo máximo.
+    """
+    regressoes = []
+    for chave, atual in resultados.items():
+        anterior = baseline.get(chave)
+        if anterior is None: continue
+        for metrica, valor in atual.items():
+            base = anterior.get(metrica)
+            if base is None or metrica in ("paradas", "rotas", "orcamento_s"): continue
+            if metrica.endswith("_s"): piorou = valor > base * (1 + tolerancia) and valor - base > folga_s
+            elif metrica == "rotas_por_segundo": piorou = valor < base * (1 - tolerancia)
+            elif metrica == "objetivo": piorou = valor > base * (1 + tolerancia_objetivo)
+            elif metrica in ("paradas_nao_atendidas", "requisicoes_matriz"): piorou = valor > base
+            elif metrica == "status": piorou = valor == "sem_solucao" != base
+            else: piorou = valor != base
+            if piorou: regressoes.append(f"{chave}: {metrica} {base} -> {valor}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks do VRP e do fluxo máximo em instâncias sintéticas.")
+    parser.add_argument("--casos", nargs="+", help="Só estes casos de VRP (padrão: todos).")
+    parser.add_argument("--orcamentos", type=float, nargs="+", default=ORCAMENTOS_S, help="Limites de tempo da busca (s).")
+    parser.add_argument("--rotas-fluxo", type=int, nargs="+", default=ROTAS_FLUXO)
+    parser.add_argument("--algoritmo", default="dinic")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", help="Grava os resultados neste arquivo JSON.")
+    parser.add_argument("--baseline", default=CAMINHO_BASELINE)
+    parser.add_argument("--gravar-baseline", action="store_true", help="Substitui a baseline pelos resultados desta execução.")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Piora relativa aceita nos tempos.")
+    parser.add_argument("--tolerancia-objetivo", type=float, default=0.05, help="Piora relativa aceita no objetivo (a busca com limite de tempo não é determinística).")
+    args = parser.parse_args()
+
+    casos = [c for c in CASOS_VRP if not args.casos or c['caso'] in args.casos]
+    servidor, url = iniciar_servidor_stub()
+    resultados = {}
+    try:
+        print(f"{'caso':<28}{'matrizes (s)':>13}{'snapshot (s)':>13}{'modelo (s)':>11}{'busca (s)':>10}{'objetivo':>12}{'fora':>6}")
+        for caso in casos:
+            for chave, r in medir_vrp(caso, url, args.orcamentos, args.semente).items():
+                resultados[chave] = r
+                print(f"{chave:<28}{r['matrizes_frio_s']:>13.3f}{r['matrizes_snapshot_s']:>13.3f}{r.get('modelo_s', 0):>11.3f}"
+                      f"{r.get('busca_s', 0):>10.2f}{r.get('objetivo', '-'):>12}{r.get('paradas_nao_atendidas', '-'):>6}")
+    finally:
+        servidor.shutdown()
+
+    print(f"\n{'caso':<28}{'montagem (s)':>13}{'conversão (s)':>14}{'solução (s)':>12}{'rotas/s':>11}{'fluxo máximo':>14}")
+    for num_rotas in args.rotas_fluxo:
+        for chave, r in medir_fluxo(num_rotas, args.algoritmo, args.semente).items():
+            resultados[chave] = r
+            print(f"{chave:<28}{r['montagem_s']:>13.3f}{r['conversao_s']:>14.3f}{r['solucao_s']:>12.3f}{r['rotas_por_segundo']:>11}{r['fluxo_maximo']:>14}")
+
+    relatorio = {
+        "ambiente": {"python": platform.python_version(), "ortools": ortools.__version__, "plataforma": platform.platform(), "cpus": os.cpu_count()},
+        "semente": args.semente, "resultados": resultados,
+    }
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados gravados em {args.saida}")
+    if args.gravar_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"📌 Baseline atualizada em {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\n⚠️  Sem baseline em {args.baseline}; use --gravar-baseline para criar uma.")
+        return
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get("semente") != args.semente:
+        print(f"\n⚠️  A baseline usa a semente {baseline.get('semente')}; as instâncias não são as mesmas.")
+    regressoes = comparar(resultados, baseline['resultados'], args.tolerancia, tolerancia_objetivo=args.tolerancia_objetivo)
+    if regressoes:
+        print(f"\n❌ {len(regressoes)} regressões em relação à baseline:")
+        for regressao in regressoes: print(f"   {regressao}")
+        sys.exit(1)
+    print(f"\n✅ Sem regressões em relação à baseline ({len(set(resultados) & set(baseline['resultados']))} casos comparados).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+import numpy as np
+
+from src.core.cache_matriz import CacheParesMatriz
+from src.core.provedores_matriz import CAMINHO_CALIBRACAO, calibrar_estimador, salvar_calibracao
+
+# Ajusta o estimador offline (haversine x sinuosidade, velocidade média) aos
+# pares já gravados no cache de matriz e mostra o erro contra esses pares.
+# Os parâmetros gravados passam a ser usados pelo SolucionadorVRP.
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibra o estimador offline de tempo/distância a partir do cache de pares.")
+    parser.add_argument("--cache", help="Arquivo SQLite do cache de pares (padrão: data/cache_matriz.sqlite).")
+    parser.add_argument("--amostra", type=int, default=200_000, help="Máximo de pares usados.")
+    parser.add_argument("--saida", default=CAMINHO_CALIBRACAO)
+    parser.add_argument("--sem-salvar", action="store_true", help="Só mostra o relatório.")
+    args = parser.parse_args()
+
+    estimador, relatorio = calibrar_estimador(CacheParesMatriz(args.cache), amostra=args.amostra)
+    print(f"📐 Calibrado com {relatorio['pares_treino']} pares; erro medido em {relatorio['pares_teste']}:")
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+    coords = np.random.default_rng(0).uniform(-0.1, 0.1, (5000, 2)) + [-9.65, -35.73]
+    inicio = time.perf_counter()
+    estimador.obter_matrizes(coords, coords)
+    print(f"⚡ Matriz 5000x5000 estimada em {time.perf_counter() - inicio:.2f} s")
+
+    if not args.sem_salvar:
+        salvar_calibracao(relatorio, args.saida)
+        print(f"💾 Calibração salva em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+import numpy as np
+
+from src.core.roteador_local import CAMINHO_GRAFO, GrafoViario, RoteadorLocal, construir_hierarquia, ler_osm
+
+# Gera o grafo viário (.npz) usado pelo RoteadorLocal, a partir de um extrato
+# OSM em XML ou, sem extrato, de uma malha sintética em grade (testes e
+# benchmarks). Os marcos do ALT e a hierarquia de contração são calculados
+# aqui, uma vez.
+# Extratos .pbf: converter antes com `osmium cat alagoas.osm.pbf -o alagoas.osm`.
+
+def gerar_grade(linhas: int, colunas: int, centro=(-9.65, -35.73), espacamento_m: float = 150, semente: int = 0) -> GrafoViario:
+    """
+    Malha em grade com ruas de mão dupla e velocidades sorteadas entre 20 e
+    60 km/h (cada rua inteira com a mesma), com algumas quadras fechadas.
+    """
+    rng = np.random.default_rng(semente)
+    graus_lat = espacamento_m / 111_320
+    graus_lon = graus_lat / np.cos(np.radians(centro[0]))
+    ii, jj = np.meshgrid(np.arange(linhas), np.arange(colunas), indexing='ij')
+    lat = (centro[0] + (ii - linhas / 2) * graus_lat).ravel()
+    lon = (centro[1] + (jj - colunas / 2) * graus_lon).ravel()
+    no = lambda i, j: i * colunas + j
+    vel_linha, vel_coluna = rng.uniform(20, 60, linhas), rng.uniform(20, 60, colunas)
+    origens, destinos, velocidades = [], [], []
+    for i in range(linhas):
+        for j in range(colunas):
+            for di, dj, velocidade in ((0, 1, vel_linha[i]), (1, 0, vel_coluna[j])):
+                if i + di >= linhas or j + dj >= colunas or rng.random() < 0.05: continue
+                origens += [no(i, j), no(i + di, j + dj)]
+                destinos += [no(i + di, j + dj), no(i, j)]
+                velocidades += [velocidade, velocidade]
+    distancia = np.full(len(origens), espacamento_m)
+    return GrafoViario.de_arestas(lat, lon, origens, destinos, distancia / (np.array(velocidades) / 3.6), distancia)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o grafo viário local (.npz) para o RoteadorLocal.")
+    parser.add_argument("entrada", nargs="?", help="Extrato OSM em XML (.osm).")
+    parser.add_argument("--saida", default=CAMINHO_GRAFO)
+    parser.add_argument("--grade", type=int, metavar="N", help="Sem extrato: gera uma malha sintética N x N.")
+    parser.add_argument("--marcos", type=int, default=8, help="Número de marcos do ALT.")
+    parser.add_argument("--sem-hierarquia", action="store_true", help="Não calcula a hierarquia de contração (matrizes por Dijkstra).")
+    args = parser.parse_args()
+    if not args.entrada and not args.grade:
+        parser.error("informe um extrato .osm ou --grade N")
+
+    inicio = time.perf_counter()
+    grafo = gerar_grade(args.grade, args.grade) if args.grade else ler_osm(args.entrada)
+    print(f"🗺️  {grafo.num_nos} nós e {len(grafo.destinos)} arestas em {time.perf_counter() - inicio:.1f} s")
+
+    inicio = time.perf_counter()
+    RoteadorLocal(grafo, num_marcos=args.marcos)._preparar_marcos()
+    print(f"📍 {len(grafo.marcos)} marcos do ALT calculados em {time.perf_counter() - inicio:.1f} s")
+
+    if not args.sem_hierarquia:
+        inicio = time.perf_counter()
+        grafo.hierarquia = construir_hierarquia(grafo)
+        arestas = len(grafo.hierarquia['ch_subida_destinos']) + len(grafo.hierarquia['ch_descida_destinos'])
+        print(f"🔺 Hierarquia de contração com {arestas} arestas calculada em {time.perf_counter() - inicio:.1f} s")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+    grafo.salvar(args.saida)
+    print(f"💾 Grafo salvo em {args.saida} ({os.path.getsize(args.saida) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
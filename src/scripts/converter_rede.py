@@ -0,0 +1,33 @@
+import argparse
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+from src.core.modelo_rede import RedeLogistica
+
+# Converte o JSON da rede (vertices/rotas) para o snapshot binário que a
+# RedeLogistica abre com carregar_snapshot, sem reprocessar o JSON.
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o snapshot binário de uma rede em JSON.")
+    parser.add_argument("entrada", nargs="?", default=os.path.join(ROOT_DIR, 'data', 'rede_base.json'))
+    parser.add_argument("saida", nargs="?", help="Padrão: mesmo nome da entrada com extensão .snapshot.")
+    args = parser.parse_args()
+    saida = args.saida or os.path.splitext(args.entrada)[0] + ".snapshot"
+
+    inicio = time.perf_counter()
+    rede = RedeLogistica.carregar_de_json(args.entrada)
+    rede.salvar_snapshot(saida)
+    print(f"💾 Snapshot salvo em {saida} ({os.path.getsize(saida) / 1e6:.1f} MB, {time.perf_counter() - inicio:.2f} s)")
+
+    inicio = time.perf_counter()
+    copia = RedeLogistica.carregar_snapshot(saida)
+    assert len(copia.rotas) == len(rede.rotas) and copia.num_componentes == rede.num_componentes
+    print(f"⚡ Snapshot aberto em {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import math
+import os
+import random
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+from src.core.modelo_rede import Deposito, Hub, RedeLogistica, ZonaEntrega
+
+# Instâncias sintéticas com semente, para benchmarks e testes: problemas de
+# VRP no formato da API (/roteirizar) e redes logísticas para o fluxo máximo.
+# A mesma semente gera sempre a mesma instância.
+
+CENTRO_PADRAO = (-9.65, -35.73)
+
+def gerar_problema_vrp(num_paradas: int, semente: int = 0, janelas_de_tempo: bool = False, prioridades: bool = False,
+                       balancear_carga_por: str = None, raio_km: float = 8.0, centro=CENTRO_PADRAO, capacidade_veiculo: int = 100) -> dict:
+    """
+    Paradas espalhadas uniformemente num círculo de `raio_km` em volta do
+    depósito, demandas de 1 a 10 e frota com 20% de folga sobre a demanda
+    total. Com `janelas_de_tempo`, cada parada recebe uma janela de 3 a 5 h
+    começando nas primeiras 6 h do turno; com `prioridades`, 10% das
+    paradas ficam obrigatórias.
+    """
+    rng = random.Random(semente)
+    graus_lat = raio_km * 1000 / 111_320
+    graus_lon = graus_lat / math.cos(math.radians(centro[0]))
+    coordenadas = {"Deposito": tuple(centro)}
+    for i in range(1, num_paradas + 1):
+        r, angulo = math.sqrt(rng.random()), rng.uniform(0, 2 * math.pi)
+        coordenadas[f"P{i}"] = (round(centro[0] + r * math.sin(angulo) * graus_lat, 6), round(centro[1] + r * math.cos(angulo) * graus_lon, 6))
+    demandas = {nome: 0 if nome == "Deposito" else rng.randint(1, 10) for nome in coordenadas}
+    paradas = list(coordenadas)[1:]
+
+    janelas = None
+    if janelas_de_tempo:
+        janelas = {"Deposito": (0, 14 * 3600)}
+        for nome in paradas:
+            inicio = rng.randrange(0, 6 * 3600, 900)
+            janelas[nome] = (inicio, inicio + rng.randrange(3 * 3600, 5 * 3600 + 1, 900))
+    return {
+        "coordenadas": coordenadas, "demandas": demandas,
+        "num_veiculos": max(2, math.ceil(sum(demandas.values()) * 1.2 / capacidade_veiculo)),
+        "capacidade_veiculo": capacidade_veiculo, "nome_deposito": "Deposito",
+        "janelas_de_tempo": janelas, "tempo_servico": 300, "custo_km": 0.6, "custo_hora": 20.0,
+        "prioridades": {nome: 1 for nome in rng.sample(paradas, len(paradas) // 10)} if prioridades else None,
+        "balancear_carga_por": balancear_carga_por,
+    }
+
+
+def gerar_rede_logistica(num_rotas: int, semente: int = 0, num_depositos: int = 4, fracao_zonas: float = 0.5) -> RedeLogistica:
+    """
+    Rede conexa em três níveis (depósitos -> hubs -> zonas de entrega) com
+    cerca de `num_rotas` rotas e grau médio 8: cada hub e cada zona recebe
+    uma rota de um nível acima (garante a conexão) e o resto são rotas
+    depósito->hub, hub->hub e hub->zona sorteadas.
+    """
+    rng = random.Random(semente)
+    num_nos = max(num_depositos + 4, num_rotas // 8)
+    num_zonas = max(2, int((num_nos - num_depositos) * fracao_zonas))
+    num_hubs = max(2, num_nos - num_depositos - num_zonas)
+    depositos = [f"CD {i}" for i in range(num_depositos)]
+    hubs = [f"Hub {i}" for i in range(num_hubs)]
+    zonas = [f"Zona {i}" for i in range(num_zonas)]
+
+    rede = RedeLogistica()
+    for classe, nomes in ((Deposito, depositos), (Hub, hubs), (ZonaEntrega, zonas)):
+        for nome in nomes:
+            rede.adicionar_no(classe(nome.lower().replace(" ", "_"), nome,
+                                     CENTRO_PADRAO[0] + rng.uniform(-0.5, 0.5), CENTRO_PADRAO[1] + rng.uniform(-0.5, 0.5)))
+
+    rotas = [(depositos[i % num_depositos] if i < num_depositos else hubs[rng.randrange(i)], hub, rng.randint(100, 1000))
+             for i, hub in enumerate(hubs)]
+    rotas += [(rng.choice(hubs), zona, rng.randint(10, 200)) for zona in zonas]
+    while len(rotas) < num_rotas:
+        sorteio = rng.random()
+        if sorteio < 0.15: rotas.append((rng.choice(depositos), rng.choice(hubs), rng.randint(100, 1000)))
+        elif sorteio < 0.45: rotas.append((rng.choice(hubs), rng.choice(hubs), rng.randint(50, 500)))
+        else: rotas.append((rng.choice(hubs), rng.choice(zonas), rng.randint(10, 200)))
+    rede.adicionar_rotas(rotas)
+    return rede
@@ -0,0 +1,103 @@
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.polyline import codificar
+
+# Servidor local que imita as respostas do OSRM (/table e /route) para testes
+# e benchmarks. Distância = haversine x fator de sinuosidade; tempo a 30 km/h.
+
+FATOR_SINUOSIDADE = 1.3
+VELOCIDADE_MS = 30 / 3.6
+
+def _haversine_m(c1, c2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (c1[0], c1[1], c2[0], c2[1]))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+def distancia_stub(c1, c2):
+    return _haversine_m(c1, c2) * FATOR_SINUOSIDADE
+
+def tempo_stub(c1, c2):
+    return distancia_stub(c1, c2) / VELOCIDADE_MS
+
+def geometria_stub(c1, c2):
+    """Trecho em "L": anda primeiro na latitude e depois na longitude."""
+    return [tuple(c1), (c2[0], c1[1]), tuple(c2)]
+
+
+class _HandlerOSRM(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        partes = url.path.strip('/').split('/')
+        if len(partes) != 4:
+            return self._responder(400, {"code": "InvalidUrl"})
+        servico, coords_str = partes[0], partes[3]
+        coordenadas = [(float(lat), float(lon)) for lon, lat in (c.split(',') for c in coords_str.split(';'))]
+        params = parse_qs(url.query)
+        with self.server.trava:
+            self.server.contador_requisicoes += 1
+
+        if len(coordenadas) > self.server.max_locais:
+            return self._responder(400, {"code": "TooBig", "message": "Too many table coordinates"})
+
+        if servico == "table":
+            origens = [int(i) for i in params["sources"][0].split(';')] if "sources" in params else list(range(len(coordenadas)))
+            destinos = [int(j) for j in params["destinations"][0].split(';')] if "destinations" in params else list(range(len(coordenadas)))
+            return self._responder(200, {
+                "code": "Ok",
+                "durations": [[tempo_stub(coordenadas[i], coordenadas[j]) for j in destinos] for i in origens],
+                "distances": [[distancia_stub(coordenadas[i], coordenadas[j]) for j in destinos] for i in origens],
+            })
+        if servico == "route":
+            trechos = list(zip(coordenadas, coordenadas[1:]))
+            legs = [{"distance": distancia_stub(a, b), "duration": tempo_stub(a, b)} for a, b in trechos]
+            if params.get("steps", ["false"])[0] == "true":
+                for leg, (a, b) in zip(legs, trechos):
+                    leg["steps"] = [{"geometry": codificar(geometria_stub(a, b))}, {"geometry": codificar([b, b])}]
+            rota = {"distance": sum(leg["distance"] for leg in legs), "duration": sum(leg["duration"] for leg in legs), "legs": legs}
+            if params.get("overview", ["simplified"])[0] != "false":
+                rota["geometry"] = codificar([p for a, b in trechos for p in geometria_stub(a, b)])
+            return self._responder(200, {"code": "Ok", "routes": [rota]})
+        return self._responder(400, {"code": "InvalidService"})
+
+
+def iniciar_servidor_stub(porta: int = 0, max_locais: int = 100):
+    """Sobe o stub numa thread daemon. Devolve (servidor, url_base)."""
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), _HandlerOSRM)
+    servidor.max_locais = max_locais
+    servidor.contador_requisicoes = 0
+    servidor.trava = threading.Lock()
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor stub compatível com o OSRM (/table e /route).")
+    parser.add_argument("--porta", type=int, default=5000)
+    parser.add_argument("--max-locais", type=int, default=100)
+    args = parser.parse_args()
+    servidor, url = iniciar_servidor_stub(args.porta, args.max_locais)
+    print(f"🛰️  Stub OSRM em {url} (use OSRM_URL={url}). Ctrl+C para sair.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
@@ -1,7 +1,6 @@
-import json
-import requests
+import argparse
 import os
-import copy
+import sys
 from fpdf import FPDF
 from fpdf.enums import XPos, YPos
 from datetime import datetime
@@ -9,7 +8,10 @@ import random
 
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-API_BASE_URL = "http://127.0.0.1:8000"
+sys.path.insert(0, ROOT_DIR)
+
+from src.core.cenarios import executar_cenarios, gerar_cenarios, resumir
+from src.core.modelo_rede import Deposito, RedeLogistica, ZonaEntrega
 
 NOME_ARQUIVO_PDF = os.path.join(ROOT_DIR, "outputs", "Relatorio_Simulacao_de_Roteirizacao.pdf")
 
@@ -59,39 +61,62 @@ class PDF(FPDF):
             self.cell(0, 7, linha_veiculo, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             
             self.set_font('helvetica', '', 9)
-            paradas = ' -> '.join(rota_info['rota'])
+            paradas = ' -> '.join(p['local'] for p in rota_info['rota'])
             self.multi_cell(0, 5, f"    Paradas: {paradas}", align='L')
             self.ln(2)
         
         self.ln(10)
 
-def executar_calculo_roteirizacao(problema_vrp: dict) -> dict:
-    """ Envia um problema VRP para a API e retorna a solução. """
-    try:
-        response = requests.post(f"{API_BASE_URL}/roteirizar", json=problema_vrp, timeout=30.0)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"  [AVISO] Falha ao executar cenário: {e}")
-        return None
-
-def simular_e_gerar_pdf_vrp():
-    """ Função principal que executa os cenários de VRP e gera o PDF. """
+    def tabela_resumo(self, resumos):
+        """ Tabela final com uma linha por cenário (custo, distância, veículos e paradas). """
+        self.add_page()
+        self.set_font('helvetica', 'B', 14)
+        self.cell(0, 10, 'Resumo dos Cenários', new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='L')
+        larguras = (90, 25, 25, 20, 20)
+        self.set_font('helvetica', 'B', 9)
+        for largura, titulo in zip(larguras, ('Cenário', 'Custo (R$)', 'Distância (km)', 'Veículos', 'Paradas')):
+            self.cell(largura, 7, titulo, border=1)
+        self.ln()
+        self.set_font('helvetica', '', 8)
+        for resumo in resumos:
+            valores = (resumo['nome'][:60], f"{resumo['custo_total']:.2f}", f"{resumo['distancia_total_metros'] / 1000:.2f}",
+                       str(resumo['veiculos_usados']), str(resumo['paradas_atendidas'])) if resumo['viavel'] else (resumo['nome'][:60], '-', '-', '-', '-')
+            for largura, valor in zip(larguras, valores):
+                self.cell(largura, 6, valor, border=1)
+            self.ln()
+
+# Cenários do relatório padrão (variações sobre o problema base)
+CENARIOS_PADRAO = [
+    {"nome": "Operação Normal", "variacoes": {}},
+    {"nome": "Frota Reduzida (3 veículos)", "variacoes": {"num_veiculos": 3}},
+    {"nome": "Demanda de Pico (+50%)", "variacoes": {"multiplicador_demanda": 1.5}},
+    {"nome": "Capacidade de Veículos Reduzida (40 pacotes)", "variacoes": {"capacidade_veiculo": 40}},
+]
+
+# Estudo de sensibilidade: 5 frotas x 2 capacidades x 5 níveis de demanda = 50 cenários
+GRADE_SENSIBILIDADE = {"num_veiculos": [3, 4, 5, 6, 7], "capacidade_veiculo": [40, 60], "multiplicador_demanda": [1.0, 1.25, 1.5, 1.75, 2.0]}
+
+def simular_e_gerar_pdf_vrp(sensibilidade: bool = False, max_workers: int = None):
+    """
+    Executa os cenários de VRP e gera o PDF. Os cenários rodam em paralelo
+    sobre as mesmas matrizes, e cada capítulo é escrito assim que o seu
+    cenário (e os anteriores) termina.
+    """
     
     caminho_rede_base = os.path.join(ROOT_DIR, 'data', 'rede_base.json')
     
     try:
-        with open(caminho_rede_base, encoding='utf-8') as f:
-            rede_base = json.load(f)
+        # Usa data/rede_base.snapshot (converter_rede.py) quando estiver atualizado
+        rede_base = RedeLogistica.abrir(caminho_rede_base)
     except FileNotFoundError:
         print(f"ERRO: Arquivo de rede base não encontrado em '{caminho_rede_base}'")
         return
 
     print("--- Iniciando Simulação de Cenários de Roteirização (VRP) ---")
 
-    coordenadas = {v['nome']: (v['lat'], v['lon']) for v in rede_base['vertices']}
-    deposito_nome = rede_base['fontes'][0]
-    demandas_base = {v['nome']: random.randint(10, 30) for v in rede_base['vertices'] if v['tipo'] == 'zona'}
+    coordenadas = {nome: no.coordenadas for nome, no in rede_base.nos.items()}
+    deposito_nome = next(nome for nome, no in rede_base.nos.items() if isinstance(no, Deposito))
+    demandas_base = {nome: random.randint(10, 30) for nome, no in rede_base.nos.items() if isinstance(no, ZonaEntrega)}
     demandas_base[deposito_nome] = 0
 
     problema_base_vrp = {
@@ -99,8 +124,10 @@ def simular_e_gerar_pdf_vrp():
         "demandas": demandas_base,
         "num_veiculos": 4,
         "capacidade_veiculo": 60,
-        "nome_deposito": deposito_nome
+        "nome_deposito": deposito_nome,
+        "perfil_solver": "rapido" if sensibilidade else None,
     }
+    cenarios = CENARIOS_PADRAO + (gerar_cenarios(GRADE_SENSIBILIDADE) if sensibilidade else [])
     
     pdf = PDF()
     pdf.add_page()
@@ -108,37 +135,16 @@ def simular_e_gerar_pdf_vrp():
     pdf.cell(0, 10, 'Relatório de Simulação de Roteirização', new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
     pdf.ln(10)
 
-    # CENÁRIO 1: OPERAÇÃO NORMAL
-    print("1. Simulando Cenário: Operação Normal...")
-    solucao_normal = executar_calculo_roteirizacao(problema_base_vrp)
-    pdf.chapter_title("Operação Normal")
-    pdf.chapter_body_vrp(solucao_normal)
-
-    # CENÁRIO 2: FROTA REDUZIDA (1 VEÍCULO QUEBRADO)
-    print("2. Simulando Cenário: Frota Reduzida...")
-    problema_frota_reduzida = copy.deepcopy(problema_base_vrp)
-    problema_frota_reduzida['num_veiculos'] -= 1
-    solucao_frota_reduzida = executar_calculo_roteirizacao(problema_frota_reduzida)
-    pdf.chapter_title(f"Frota Reduzida ({problema_frota_reduzida['num_veiculos']} veículos)")
-    pdf.chapter_body_vrp(solucao_frota_reduzida)
-
-    # CENÁRIO 3: DEMANDA DE PICO (+50% NAS ENTREGAS)
-    print("3. Simulando Cenário: Demanda de Pico...")
-    problema_pico = copy.deepcopy(problema_base_vrp)
-    for zona in problema_pico['demandas']:
-        if problema_pico['demandas'][zona] > 0:
-            problema_pico['demandas'][zona] = int(problema_pico['demandas'][zona] * 1.5)
-    solucao_pico = executar_calculo_roteirizacao(problema_pico)
-    pdf.chapter_title("Demanda de Pico (+50%)")
-    pdf.chapter_body_vrp(solucao_pico)
-
-    # CENÁRIO 4: CAPACIDADE REDUZIDA (VEÍCULOS MENORES)
-    print("4. Simulando Cenário: Capacidade de Veículos Reduzida...")
-    problema_capacidade = copy.deepcopy(problema_base_vrp)
-    problema_capacidade['capacidade_veiculo'] = 40 # Capacidade original era 60
-    solucao_capacidade = executar_calculo_roteirizacao(problema_capacidade)
-    pdf.chapter_title(f"Capacidade de Veículos Reduzida ({problema_capacidade['capacidade_veiculo']} pacotes)")
-    pdf.chapter_body_vrp(solucao_capacidade)
+    concluidos, resumos, proximo = {}, [None] * len(cenarios), 0
+    for i, cenario, solucao, erro in executar_cenarios(problema_base_vrp, cenarios, max_workers):
+        print(f"{i + 1}. Cenário concluído: {cenario['nome']}" + (f" [AVISO] {erro}" if erro else ""))
+        concluidos[i] = solucao
+        resumos[i] = resumir(cenario, solucao)
+        while proximo in concluidos:
+            pdf.chapter_title(cenarios[proximo]['nome'])
+            pdf.chapter_body_vrp(concluidos.pop(proximo))
+            proximo += 1
+    pdf.tabela_resumo(resumos)
     
     try:
         pdf.output(NOME_ARQUIVO_PDF)
@@ -150,4 +156,8 @@ def simular_e_gerar_pdf_vrp():
 
 
 if __name__ == "__main__":
-    simular_e_gerar_pdf_vrp()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Simulação de cenários de roteirização com relatório em PDF.")
+    parser.add_argument("--sensibilidade", action="store_true", help="Inclui a grade de 50 cenários de sensibilidade.")
+    parser.add_argument("--workers", type=int, default=None, help="Processos paralelos (padrão: VRP_CENARIOS_WORKERS ou nº de CPUs).")
+    args = parser.parse_args()
+    simular_e_gerar_pdf_vrp(args.sensibilidade, args.workers)
\ No newline at end of file
@@ -0,0 +1,20 @@
+from ortools.constraint_solver import pywrapcp, routing_enums_pb2
+
+from src.scripts.benchmark_callbacks import gerar_instancia, montar_modelo
+
+
+def test_matrizes_registradas_custam_o_mesmo_que_os_callbacks(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.core.cache_matriz.CAMINHO_PADRAO", str(tmp_path / "pares.sqlite"))
+    dados, tempo, distancia = gerar_instancia(25, 7)
+    (manager, callbacks), (manager_matrizes, matrizes) = [montar_modelo(dados, tempo, distancia, modo) for modo in ("python", "matriz")]
+
+    # Só a solução inicial, sem busca local: com os mesmos custos, as duas saem iguais
+    parametros = pywrapcp.DefaultRoutingSearchParameters()
+    parametros.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+    parametros.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GREEDY_DESCENT
+    for modelo in (callbacks, matrizes): modelo.CloseModelWithParameters(parametros)
+
+    indices = range(manager.GetNumberOfIndices())
+    assert all(callbacks.GetArcCostForVehicle(a, b, 0) == matrizes.GetArcCostForVehicle(a, b, 0) for a in indices for b in indices if a != b)
+    solucoes = [modelo.SolveWithParameters(parametros) for modelo in (callbacks, matrizes)]
+    assert solucoes[0].ObjectiveValue() == solucoes[1].ObjectiveValue() > 0
@@ -0,0 +1,27 @@
+from src.core.fluxo_maximo import RedeFluxo
+from src.scripts.benchmark_suite import comparar
+from src.scripts.gerador_instancias import gerar_problema_vrp, gerar_rede_logistica
+
+
+def test_geradores_com_semente():
+    problema = gerar_problema_vrp(40, semente=5, janelas_de_tempo=True, prioridades=True, balancear_carga_por="tempo")
+    assert problema == gerar_problema_vrp(40, semente=5, janelas_de_tempo=True, prioridades=True, balancear_carga_por="tempo")
+    assert problema != gerar_problema_vrp(40, semente=6, janelas_de_tempo=True, prioridades=True, balancear_carga_por="tempo")
+    assert len(problema['coordenadas']) == 41 and len(problema['prioridades']) == 4
+    assert all(fim - inicio >= 3 * 3600 for inicio, fim in problema['janelas_de_tempo'].values())
+    assert problema['num_veiculos'] * problema['capacidade_veiculo'] >= sum(problema['demandas'].values())
+
+    rede = gerar_rede_logistica(2000, semente=1)
+    assert rede.num_componentes == 1 and len(rede.rotas) == 2000
+    assert RedeFluxo.de_rede_logistica(rede).resolver() == RedeFluxo.de_rede_logistica(gerar_rede_logistica(2000, semente=1)).resolver() > 0
+
+
+def test_comparacao_com_baseline():
+    baseline = {"vrp_50@1s": {"modelo_s": 0.01, "matrizes_frio_s": 1.0, "objetivo": 1000, "status": "ROUTING_SUCCESS"},
+                "fluxo_1000_dinic": {"rotas_por_segundo": 1000, "fluxo_maximo": 50}}
+    iguais = {"vrp_50@1s": {"modelo_s": 0.04, "matrizes_frio_s": 1.1, "objetivo": 1020, "status": "ROUTING_SUCCESS"},
+              "fluxo_1000_dinic": {"rotas_por_segundo": 900, "fluxo_maximo": 50}, "caso_novo": {"objetivo": 1}}
+    assert comparar(iguais, baseline) == []
+    piores = {"vrp_50@1s": {"modelo_s": 0.01, "matrizes_frio_s": 1.5, "objetivo": 1100, "status": "sem_solucao"},
+              "fluxo_1000_dinic": {"rotas_por_segundo": 500, "fluxo_maximo": 49}}
+    assert len(comparar(piores, baseline)) == 5
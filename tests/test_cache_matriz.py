@@ -0,0 +1,94 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.core.cache_matriz import CacheParesMatriz
+from src.core.provedores_matriz import ProvedorOSRMTable
+from src.core.solucionador_vrp import SolucionadorVRP
+from src.scripts.servidor_stub_osrm import iniciar_servidor_stub, distancia_stub
+
+
+class ProvedorContador(ProvedorOSRMTable):
+    """Registra quantos pares foram pedidos ao servidor."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pares_pedidos = 0
+
+    def obter_matrizes(self, origens, destinos):
+        self.pares_pedidos += len(origens) * len(destinos)
+        return super().obter_matrizes(origens, destinos)
+
+
+@pytest.fixture
+def stub_osrm():
+    servidor, url = iniciar_servidor_stub(max_locais=20)
+    yield url
+    servidor.shutdown()
+
+
+def _dados(n, semente=0):
+    rng = random.Random(semente)
+    coords = {f"L{i}": (-9.65 + rng.uniform(-0.05, 0.05), -35.73 + rng.uniform(-0.05, 0.05)) for i in range(n)}
+    return {"coordenadas": coords, "nome_deposito": "L0"}
+
+
+def test_novo_local_busca_so_linha_e_coluna(stub_osrm, tmp_path):
+    cache = CacheParesMatriz(str(tmp_path / "pares.sqlite"))
+    provedor = ProvedorContador(stub_osrm, max_locais=20)
+
+    dados = _dados(8)
+    SolucionadorVRP(dados, provedor=provedor, cache=cache, dir_snapshots=str(tmp_path))._criar_matrizes()
+    assert provedor.pares_pedidos == 64
+
+    # Um endereço a mais: só a linha (1x9) e a coluna (8x1) dele
+    provedor.pares_pedidos = 0
+    dados_maior = _dados(9)
+    solver = SolucionadorVRP(dados_maior, provedor=provedor, cache=cache, dir_snapshots=str(tmp_path))
+    tempo, distancia = solver._criar_matrizes()
+    assert provedor.pares_pedidos == 9 + 8
+    assert solver.metricas['pares_cache'] == 8 * 7
+    assert solver.metricas['taxa_acerto_cache'] == round(56 / 72, 4)
+    coords = list(dados_maior['coordenadas'].values())
+    assert distancia[8][3] == round(distancia_stub(coords[8], coords[3]))
+
+    # Mesmo problema em outra ordem: tudo vem do cache
+    provedor.pares_pedidos = 0
+    invertido = {"coordenadas": dict(reversed(list(dados_maior['coordenadas'].items()))), "nome_deposito": "L0"}
+    solver = SolucionadorVRP(invertido, provedor=provedor, cache=cache, dir_snapshots=str(tmp_path))
+    solver._criar_matrizes()
+    assert provedor.pares_pedidos == 0
+    assert solver.metricas['taxa_acerto_cache'] == 1.0
+
+
+def test_snapshot_npy_mapeado_em_memoria(stub_osrm, tmp_path):
+    cache = CacheParesMatriz(str(tmp_path / "pares.sqlite"))
+    provedor = ProvedorContador(stub_osrm, max_locais=20)
+    tempo, _ = SolucionadorVRP(_dados(5), provedor=provedor, cache=cache, dir_snapshots=str(tmp_path))._criar_matrizes()
+    assert tempo.dtype == np.int32
+
+    provedor.pares_pedidos = 0
+    tempo_mmap, distancia_mmap = SolucionadorVRP(_dados(5), provedor=provedor, cache=cache, dir_snapshots=str(tmp_path))._criar_matrizes()
+    assert provedor.pares_pedidos == 0
+    assert isinstance(tempo_mmap, np.memmap)
+    assert np.array_equal(tempo_mmap, tempo)
+
+
+
+def test_solucionador_so_abre_o_cache_quando_monta_as_matrizes(stub_osrm, tmp_path, monkeypatch):
+    monkeypatch.setattr("src.core.cache_matriz.CAMINHO_PADRAO", str(tmp_path / "pares.sqlite"))
+    monkeypatch.setattr("src.core.provedores_matriz.OSRM_URL", stub_osrm)
+    matrizes = SolucionadorVRP(_dados(6), dir_snapshots=str(tmp_path))._criar_matrizes()
+
+    # Com as matrizes recebidas, nem provedor, nem cache, nem estimador são criados
+    solver = SolucionadorVRP({**_dados(6), "demandas": {}, "num_veiculos": 1, "capacidade_veiculo": 10, "tempo_limite_s": 1}, matrizes=matrizes)
+    assert solver.resolver() and (solver._provedor, solver._cache, solver._estimador) == (None, None, None)
+
+    # O cache aberto pelo próprio solucionador é fechado ao fim da montagem; um cache recebido continua aberto
+    with CacheParesMatriz(str(tmp_path / "outro.sqlite")) as cache:
+        solver = SolucionadorVRP(_dados(7), provedor=ProvedorOSRMTable(stub_osrm), cache=cache, dir_snapshots=str(tmp_path))
+        solver._criar_matrizes()
+        assert solver._cache is cache and cache.buscar([(-9.6, -35.7)])[0].shape == (1, 1)
+    solver = SolucionadorVRP(_dados(8), provedor=ProvedorOSRMTable(stub_osrm), dir_snapshots=str(tmp_path))
+    solver._criar_matrizes()
+    assert solver._cache is None
@@ -0,0 +1,45 @@
+import time
+
+from src.core.cache_solucoes import CacheSolucoes, chave_canonica
+
+
+PROBLEMA = {
+    "coordenadas": {"CD": (-9.51, -35.79), "A": (-9.66, -35.70), "B": (-9.65, -35.74)},
+    "demandas": {"CD": 0, "A": 10, "B": 5},
+    "num_veiculos": 2, "capacidade_veiculo": 50, "nome_deposito": "CD",
+    "janelas_de_tempo": None, "tempo_servico": 300, "custo_km": 0.6, "custo_hora": 20.0,
+    "prioridades": None, "balancear_carga_por": "nenhum",
+}
+
+
+def test_chave_ignora_forma_de_envio():
+    variante = dict(PROBLEMA)
+    variante["coordenadas"] = {"B": [-9.65, -35.74], "A": [-9.66, -35.70], "CD": [-9.51, -35.79]}
+    variante["janelas_de_tempo"] = {}
+    variante["custo_km"] = 0.6000000001
+    variante["balancear_carga_por"] = None
+    assert chave_canonica(variante) == chave_canonica(PROBLEMA)
+
+    assert chave_canonica({**PROBLEMA, "demandas": {"CD": 0, "A": 11, "B": 5}}) != chave_canonica(PROBLEMA)
+    assert chave_canonica(PROBLEMA, {"perfil": "rapido"}) != chave_canonica(PROBLEMA)
+
+
+def test_lru_ttl_e_contadores(monkeypatch):
+    cache = CacheSolucoes(max_itens=2, ttl_segundos=60)
+    cache.guardar("a", {"custo_total": 1})
+    cache.guardar("b", {"custo_total": 2})
+    assert cache.obter("a") == {"custo_total": 1}
+    cache.guardar("c", {"custo_total": 3})  # "b" é o menos usado
+    assert cache.obter("b") is None
+    assert cache.estatisticas()["acertos"] == 1 and cache.estatisticas()["falhas"] == 1
+
+    agora = time.time()
+    monkeypatch.setattr(time, "time", lambda: agora + 61)
+    assert cache.obter("a") is None
+    assert cache.estatisticas()["itens"] == 1
+
+
+def test_persistencia_em_disco(tmp_path):
+    cache = CacheSolucoes(diretorio=str(tmp_path))
+    cache.guardar("abc", {"custo_total": 42.0})
+    assert CacheSolucoes(diretorio=str(tmp_path)).obter("abc") == {"custo_total": 42.0}
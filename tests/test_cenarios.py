@@ -0,0 +1,34 @@
+import pytest
+
+from src.core.cache_matriz import CacheParesMatriz
+from src.core.cenarios import aplicar_cenario, gerar_cenarios, simular_cenarios
+from src.core.provedores_matriz import ProvedorOSRMTable
+from src.core.solucionador_vrp import SolucionadorVRP
+from src.scripts.servidor_stub_osrm import iniciar_servidor_stub
+from tests.test_solucionador_vrp import _problema
+
+
+def test_grade_e_variacoes():
+    cenarios = gerar_cenarios({"num_veiculos": [2, 3], "multiplicador_demanda": [1.0, 1.5], "custo_km": [0.6]})
+    assert len(cenarios) == 4 and cenarios[0]['variacoes'] == {"num_veiculos": 2, "multiplicador_demanda": 1.0, "custo_km": 0.6}
+    dados = aplicar_cenario({"nome_deposito": "D", "demandas": {"D": 0, "A": 3}, "num_veiculos": 1}, {"multiplicador_demanda": 1.5, "num_veiculos": 4})
+    assert dados['demandas'] == {"D": 0, "A": 4} and dados['num_veiculos'] == 4
+    with pytest.raises(ValueError):
+        gerar_cenarios({"cor_do_caminhao": ["azul"]})
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_matrizes_consultadas_uma_vez(tmp_path, max_workers):
+    servidor, url = iniciar_servidor_stub()
+    try:
+        base = _problema(10, tempo_limite_s=1, janela_plato_s=0.3)
+        solver = SolucionadorVRP(base, provedor=ProvedorOSRMTable(url), cache=CacheParesMatriz(str(tmp_path / "pares.sqlite")), dir_snapshots=str(tmp_path))
+        resultado = simular_cenarios(base, {"num_veiculos": [2, 3], "multiplicador_demanda": [1.0, 2.0]}, max_workers=max_workers, solver=solver)
+        assert servidor.contador_requisicoes == 1
+    finally:
+        servidor.shutdown()
+    resumos = resultado['cenarios']
+    assert [r['variacoes']['num_veiculos'] for r in resumos] == [2, 2, 3, 3]
+    assert all(r["viavel"] for r in resumos)
+    # Com o dobro da demanda, 2 veículos não dão conta de todas as paradas
+    assert resumos[0]["paradas_atendidas"] == 9 and resumos[1]["paradas_atendidas"] < resumos[3]["paradas_atendidas"] == 9
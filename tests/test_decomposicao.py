@@ -0,0 +1,100 @@
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.core.decomposicao import _ReparoFronteira, alocar_veiculos, particionar_paradas, resolver_decomposto, usar_decomposicao
+from src.scripts.servidor_stub_osrm import iniciar_servidor_stub
+
+
+@pytest.fixture(scope="module")
+def url_stub():
+    servidor, url = iniciar_servidor_stub()
+    yield url
+    servidor.shutdown()
+
+
+def _problema(n, num_veiculos, semente=0, **extras):
+    rng = random.Random(semente)
+    coords = {f"L{i}": (-9.65 + rng.uniform(-0.1, 0.1), -35.73 + rng.uniform(-0.1, 0.1)) for i in range(n)}
+    demandas = {nome: rng.randint(1, 8) for nome in coords}
+    demandas["L0"] = 0
+    dados = {
+        "coordenadas": coords, "demandas": demandas, "num_veiculos": num_veiculos, "capacidade_veiculo": 40,
+        "nome_deposito": "L0", "tempo_servico": 300, "custo_km": 0.6, "custo_hora": 20.0, "perfil_solver": "rapido",
+    }
+    dados.update(extras)
+    return dados
+
+
+def test_particao_e_alocacao_de_veiculos():
+    dados = _problema(301, 50)
+    clusters = particionar_paradas(dados, 50)
+    assert sorted(p for c in clusters for p in c) == sorted(set(dados['coordenadas']) - {"L0"})
+    assert all(len(c) <= 50 for c in clusters) and len(clusters) == 8
+
+    demandas = [sum(dados['demandas'][p] for p in c) for c in clusters]
+    veiculos = alocar_veiculos(demandas, 50, 40)
+    assert sum(veiculos) == 50 and all(v * 40 >= d for v, d in zip(veiculos, demandas))
+    assert alocar_veiculos([100, 10], 3, 40) == [2, 1]
+    assert usar_decomposicao(dados) is False and usar_decomposicao({**dados, "decomposicao": True})
+
+
+def test_frota_pequena_nao_passa_do_numero_de_veiculos():
+    dados = _problema(401, 2)
+    clusters = particionar_paradas(dados, 150)
+    assert len(clusters) == 2 and sorted(p for c in clusters for p in c) == sorted(set(dados['coordenadas']) - {"L0"})
+    veiculos = alocar_veiculos([sum(dados['demandas'][p] for p in c) for c in clusters], 2, 40)
+    assert veiculos == [1, 1]
+    veiculos = alocar_veiculos([1, 1, 1, 100], 2, 10)
+    assert sum(veiculos) == 2 and veiculos[3] == 1 and veiculos.count(0) == 2
+    assert alocar_veiculos([30, 50, 20], 2, 10) == [1, 1, 0]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_resolve_por_clusters(url_stub, tmp_path, monkeypatch, max_workers):
+    monkeypatch.setattr("src.core.provedores_matriz.OSRM_URL", url_stub)
+    monkeypatch.setattr("src.core.cache_matriz.CAMINHO_PADRAO", str(tmp_path / "pares.sqlite"))
+    monkeypatch.setattr("src.core.solucionador_vrp.DIR_SNAPSHOTS", str(tmp_path))
+    dados = _problema(61, 12, tempo_limite_s=1, janela_plato_s=0.3)
+    solucao = resolver_decomposto(dados, max_paradas_cluster=15, max_workers=max_workers)
+
+    decomposicao = solucao['metricas']['decomposicao']
+    assert all(c['status'] == "ok" for c in decomposicao['clusters']) and len(decomposicao['clusters']) == 5
+    assert decomposicao['reparo_fronteira']['pares_de_clusters'] == 4
+    paradas = [p['local'] for rota in solucao['rotas_otimizadas'] for p in rota['rota'] if p['local'] != "L0"]
+    assert sorted(paradas) == sorted(set(dados['coordenadas']) - {"L0"}) and solucao['metricas']['paradas_nao_atendidas'] == 0
+    ids = [rota['veiculo_id'] for rota in solucao['rotas_otimizadas']]
+    assert len(ids) == len(set(ids)) and max(ids) <= 12
+    assert all(rota['carga_total'] <= 40 for rota in solucao['rotas_otimizadas'])
+    assert solucao['metricas']['objetivo'] == round(solucao['custo_total'] * 100)
+
+
+def test_reparo_mede_o_custo_como_as_rotas_formatadas(url_stub, tmp_path, monkeypatch):
+    monkeypatch.setattr("src.core.provedores_matriz.OSRM_URL", url_stub)
+    monkeypatch.setattr("src.core.cache_matriz.CAMINHO_PADRAO", str(tmp_path / "pares.sqlite"))
+    monkeypatch.setattr("src.core.solucionador_vrp.DIR_SNAPSHOTS", str(tmp_path))
+    dados = _problema(41, 8, tempo_limite_s=0.5, janela_plato_s=0.2)
+    rotas = resolver_decomposto(dados, max_paradas_cluster=10, max_workers=1, reparar=False)['rotas_otimizadas']
+    reparador = _ReparoFronteira(dados, rotas)
+    resultado = reparador.otimizar()
+    assert resultado['movimentos'] > 0 and resultado['criterio'] == "custo"
+    # A redução (em centavos truncados por arco) é a queda na soma de custo_rota, a menos do arredondamento
+    antes, depois = (sum(rota['custo_rota'] for rota in r) for r in (rotas, reparador.rotas_atualizadas()))
+    assert abs((antes - depois) * 100 - resultado['reducao']) <= sum(len(rota['rota']) for rota in rotas)
+
+
+def test_portfolio_nao_combina_com_decomposicao():
+    resposta = TestClient(app).post("/jobs/roteirizar", json=_problema(5, 2, decomposicao=True, portfolio=2))
+    assert resposta.status_code == 400 and "portfólio" in resposta.json()['detail']
+
+
+def test_perfil_por_cluster(url_stub, tmp_path, monkeypatch):
+    monkeypatch.setattr("src.core.provedores_matriz.OSRM_URL", url_stub)
+    monkeypatch.setattr("src.core.cache_matriz.CAMINHO_PADRAO", str(tmp_path / "pares.sqlite"))
+    monkeypatch.setattr("src.core.solucionador_vrp.DIR_SNAPSHOTS", str(tmp_path))
+    monkeypatch.setattr("src.core.perfilador.DIR_PERFIS", str(tmp_path / "perfis"))
+    solucao = resolver_decomposto(_problema(21, 4, tempo_limite_s=0.5, janela_plato_s=0.2, profile=True), max_paradas_cluster=10, max_workers=1)
+    clusters = solucao['metricas']['decomposicao']['clusters']
+    assert solucao['perfil']['clusters'] == [c['perfil'] for c in clusters] and len(set(solucao['perfil']['clusters'])) == len(clusters) > 1
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import main
+from src.api.fila_jobs import FilaDeJobs, FilaCheiaError
+from src.scripts.gerador_instancias import gerar_problema_vrp
+
+
+def _dormir_e_somar(segundos, a, b):
+    time.sleep(segundos)
+    return a + b
+
+
+def _falhar():
+    raise RuntimeError("falhou no processo")
+
+
+def _esperar(fila, job_id, status_final, timeout=10):
+    limite = time.time() + timeout
+    while fila.status(job_id)['status'] != status_final:
+        assert time.time() < limite, fila.status(job_id)
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def fila():
+    fila = FilaDeJobs(max_workers=1, max_fila=3)
+    yield fila
+    fila.encerrar()
+
+
+def test_resultado_e_erro(fila):
+    ok = fila.submeter(_dormir_e_somar, 0, 2, 3)
+    ruim = fila.submeter(_falhar)
+    _esperar(fila, ok, "concluido")
+    _esperar(fila, ruim, "erro")
+    assert fila.resultado(ok) == 5
+    assert "falhou no processo" in fila.erro(ruim)
+
+
+def test_fila_cheia_e_cancelamento(fila):
+    ids = [fila.submeter(_dormir_e_somar, 0.5, i, 0) for i in range(3)]
+    with pytest.raises(FilaCheiaError):
+        fila.submeter(_dormir_e_somar, 0, 0, 0)
+
+    # O último ainda está na fila do pool: cancelar libera a vaga
+    cancelamento = fila.cancelar(ids[-1])
+    assert cancelamento == {"job_id": ids[-1], "cancelado": True, "interrompido": True}
+    assert fila.status(ids[-1])['status'] == "cancelado"
+    fila.submeter(_dormir_e_somar, 0, 0, 0)
+
+    with pytest.raises(KeyError):
+        fila.status("inexistente")
+
+
+def test_roteirizar_com_job_cancelado_responde_409(fila, monkeypatch):
+    monkeypatch.setattr(main, "fila_jobs", fila)
+    executando = fila.submeter(_dormir_e_somar, 1, 0, 0)
+    ids = [fila.submeter(_dormir_e_somar, 0, i, 0) for i in range(2)]
+    _esperar(fila, executando, "executando")
+    fila.cancelar(executando)
+    assert fila.cancelar(ids[-1])['interrompido']
+    cliente = TestClient(main.app)
+    # Na fila: o future é cancelado; já executando: só a marca de cancelado, e o resultado é descartado
+    for job_id in (ids[-1], executando):
+        monkeypatch.setattr(main, "_submeter_job", lambda problema: job_id)
+        resposta = cliente.post("/roteirizar", json=gerar_problema_vrp(3))
+        assert resposta.status_code == 409, resposta.text
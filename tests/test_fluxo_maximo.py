@@ -0,0 +1,141 @@
+import random
+
+import networkx as nx
+import pytest
+
+from src.core.fluxo_maximo import RedeFluxo, calcular_fluxo_maximo
+
+
+def _fluxo_networkx(fontes, sumidouros, arestas):
+    G = nx.DiGraph()
+    for o, d, c in arestas:
+        # networkx não aceita arestas paralelas: soma as capacidades
+        if G.has_edge(o, d): G[o][d]['capacity'] += c
+        else: G.add_edge(o, d, capacity=c)
+    for f in fontes: G.add_edge("_S", f)
+    for s in sumidouros: G.add_edge(s, "_T")
+    return nx.maximum_flow_value(G, "_S", "_T")
+
+
+@pytest.mark.parametrize("algoritmo", ["edmonds_karp", "dinic"])
+@pytest.mark.parametrize("semente", range(5))
+def test_fluxo_igual_ao_networkx(algoritmo, semente):
+    rng = random.Random(semente)
+    nos = [f"n{i}" for i in range(30)]
+    arestas = [(rng.choice(nos), rng.choice(nos), rng.randint(1, 50)) for _ in range(120)]
+    arestas = [a for a in arestas if a[0] != a[1]]
+    fontes, sumidouros = nos[:3], nos[-4:]
+
+    rede = RedeFluxo(fontes, sumidouros, arestas)
+    assert rede.resolver(algoritmo) == _fluxo_networkx(fontes, sumidouros, arestas)
+
+    resultado = rede.resultado()
+    for rota in resultado['rotas_com_fluxo']:
+        assert 0 <= rota['fluxo'] <= rota['capacidade']
+
+
+def test_formato_do_resultado_da_api():
+    rede = {
+        "fontes": ["CD"],
+        "sumidouros": ["Zona A", "Zona B"],
+        "rotas": [
+            {"origem": "CD", "destino": "Hub", "capacidade": 10},
+            {"origem": "Hub", "destino": "Zona A", "capacidade": 4},
+            {"origem": "Hub", "destino": "Zona B", "capacidade": 3},
+            {"origem": "CD", "destino": "Zona B", "capacidade": 2},
+        ]
+    }
+    resultado = calcular_fluxo_maximo(rede)
+    assert resultado['fluxo_maximo'] == 9
+    assert [(r['origem'], r['destino'], r['fluxo']) for r in resultado['rotas_com_fluxo']] == [
+        ("CD", "Hub", 7), ("Hub", "Zona A", 4), ("Hub", "Zona B", 3), ("CD", "Zona B", 2)
+    ]
+
+
+def test_algoritmo_desconhecido():
+    with pytest.raises(ValueError):
+        calcular_fluxo_maximo({"fontes": [], "sumidouros": [], "rotas": []}, "ford")
+
+
+@pytest.mark.parametrize("algoritmo", ["edmonds_karp", "dinic"])
+def test_simulacao_incremental_igual_ao_recalculo(algoritmo):
+    rng = random.Random(11)
+    nos = [f"n{i}" for i in range(20)]
+    arestas = [(rng.choice(nos), rng.choice(nos), rng.randint(1, 30)) for _ in range(80)]
+    arestas = [a for a in arestas if a[0] != a[1]]
+    fontes, sumidouros = nos[:3], nos[-4:]
+    rede = RedeFluxo(fontes, sumidouros, arestas)
+    fluxo_base = rede.resolver(algoritmo)
+
+    for _ in range(15):
+        o, d, _ = rng.choice(arestas)
+        fechado = rng.choice(nos[3:-4])
+        lote = [{"tipo": "capacidade", "origem": o, "destino": d, "fator": 0.7, "delta": rng.randint(-5, 5)}, {"tipo": "fechar_no", "no": fechado}]
+        capacidades = {}
+        for i, (a, b, c) in enumerate(arestas):
+            if (a, b) == (o, d): c = max(0, round(c * 0.7) + lote[0]['delta'])
+            capacidades[i] = 0 if fechado in (a, b) else c
+        esperado = _fluxo_networkx(fontes, sumidouros, [(a, b, capacidades[i]) for i, (a, b, _) in enumerate(arestas)])
+
+        resultado = rede.simular(lote, algoritmo)
+        assert resultado['fluxo_maximo'] == esperado and resultado['variacao_fluxo'] == esperado - fluxo_base
+        assert rede.fluxo_maximo == fluxo_base
+
+    rede.simular([{"tipo": "remover_rota", "origem": o, "destino": d}], algoritmo, persistir=True)
+    assert all(r['capacidade'] == 0 for r in rede.resultado()['rotas_com_fluxo'] if (r['origem'], r['destino']) == (o, d))
+    with pytest.raises(ValueError):
+        rede.simular([{"tipo": "fechar_no", "no": "inexistente"}])
+
+
+def test_falha_no_cancelamento_aplica_o_lote_inteiro(monkeypatch):
+    rng = random.Random(5)
+    nos = [f"n{i}" for i in range(20)]
+    arestas = [(rng.choice(nos), rng.choice(nos), rng.randint(1, 30)) for _ in range(80)]
+    arestas = [a for a in arestas if a[0] != a[1]]
+    fontes, sumidouros = nos[:3], nos[-4:]
+    rede = RedeFluxo(fontes, sumidouros, arestas)
+    rede.resolver()
+    pares = list(dict.fromkeys((o, d) for o, d, _ in arestas))[:4]
+    lote = [{"tipo": "capacidade", "origem": o, "destino": d, "fator": 0.5} for o, d in pares]
+
+    # O cancelamento falha no segundo arco do lote: os demais ainda precisam ser aplicados
+    definir_capacidade, chamadas = RedeFluxo._definir_capacidade, []
+    def falhar_no_segundo(self, arco, nova, algoritmo):
+        chamadas.append(arco)
+        if len(chamadas) == 2: raise RuntimeError("Não foi possível cancelar o excesso de fluxo.")
+        return definir_capacidade(self, arco, nova, algoritmo)
+    monkeypatch.setattr(RedeFluxo, "_definir_capacidade", falhar_no_segundo)
+
+    novas = [(o, d, round(c * 0.5) if (o, d) in pares else c) for o, d, c in arestas]
+    resultado = rede.simular(lote, persistir=True)
+    assert len(chamadas) == 2 < len(resultado['rotas_alteradas'])
+    assert resultado['fluxo_maximo'] == rede.fluxo_maximo == _fluxo_networkx(fontes, sumidouros, novas)
+    assert [r['capacidade'] for r in rede.resultado()['rotas_com_fluxo']] == [c for _, _, c in novas]
+    assert all(r['capacidade'] == round(r['capacidade_anterior'] * 0.5) for r in resultado['rotas_alteradas'])
+
+
+def test_corte_minimo_e_sensibilidade():
+    rng = random.Random(3)
+    nos = [f"n{i}" for i in range(15)]
+    arestas = [(rng.choice(nos), rng.choice(nos), rng.randint(1, 20)) for _ in range(50)]
+    arestas = [a for a in arestas if a[0] != a[1]]
+    fontes, sumidouros = nos[:2], nos[-3:]
+    rede = RedeFluxo(fontes, sumidouros, arestas)
+    fluxo = rede.resolver()
+    analise = rede.analisar_gargalos()
+    assert analise['capacidade_corte_minimo'] == fluxo and analise['rotas_limitantes']
+    assert rede.analisar_gargalos() is analise
+
+    # Confere a sensibilidade de cada rota resolvendo de novo com +1 de capacidade
+    for i, rota in enumerate(analise['rotas']):
+        o, d, c = arestas[i]
+        ganho = RedeFluxo(fontes, sumidouros, arestas[:i] + [(o, d, c + 1)] + arestas[i + 1:]).resolver() - fluxo
+        assert ganho == (1 if rota['limitante'] else 0)
+
+    limitante = analise['rotas_limitantes'][0]
+    # Consulta sem persistir: a rede volta igual e a análise guardada continua valendo
+    residual = list(rede.grafo.residual)
+    rede.simular([{"tipo": "remover_rota", "origem": limitante['origem'], "destino": limitante['destino']}])
+    assert rede.grafo.residual == residual and rede.analisar_gargalos() is analise
+    rede.simular([{"tipo": "capacidade", "origem": limitante['origem'], "destino": limitante['destino'], "delta": 1}], persistir=True)
+    assert rede.analisar_gargalos()['versao'] != analise['versao']
@@ -0,0 +1,43 @@
+import time
+
+from src.core.geocodificacao import (
+    CacheGeocodificacao, ProvedorGeocodificacao, ProvedorStub, geocodificar_enderecos, normalizar_endereco,
+)
+
+
+def test_normalizar_endereco():
+    assert normalizar_endereco("Av. Dr. Antônio Gouveia, 925, Pajuçara") == normalizar_endereco("avenida  doutor antonio gouveia,925,PAJUCARA")
+    assert normalizar_endereco("R. do Sol, 10") != normalizar_endereco("R. do Sol, 11")
+
+
+def test_so_enderecos_novos_vao_ao_provedor(tmp_path):
+    cache = CacheGeocodificacao(str(tmp_path / "geo.sqlite"))
+    provedor = ProvedorStub()
+    enderecos = ["Rua do Sol, 10", "R. do Sol, 10", "Av. da Paz, 919", "Rua Inexistente, 1"]
+
+    coordenadas, estatisticas = geocodificar_enderecos(enderecos, provedor=provedor, cache=cache)
+    assert provedor.requisicoes == 3 and estatisticas['unicos'] == 3
+    assert coordenadas["Rua do Sol, 10"] == coordenadas["R. do Sol, 10"] is not None
+    assert coordenadas["Rua Inexistente, 1"] is None
+
+    # Segunda rodada: tudo do cache, inclusive o endereço não encontrado (cache negativo)
+    coordenadas_2, estatisticas_2 = geocodificar_enderecos(enderecos + ["Rua Nova, 5"], provedor=provedor, cache=cache)
+    assert provedor.requisicoes == 4
+    assert estatisticas_2['acertos_cache'] == 2 and estatisticas_2['negativos_cache'] == 1 and estatisticas_2['consultados'] == 1
+    assert {k: coordenadas_2[k] for k in coordenadas} == coordenadas
+
+
+def test_limite_de_taxa_e_erros_transitorios(tmp_path):
+    class ProvedorInstavel(ProvedorGeocodificacao):
+        nome, requisicoes_por_segundo, max_concorrencia = "instavel", 20, 4
+        def geocodificar(self, endereco, contexto=None):
+            if "falha" in endereco: raise TimeoutError("serviço indisponível")
+            return (-9.6, -35.7)
+
+    cache = CacheGeocodificacao(str(tmp_path / "geo.sqlite"))
+    inicio = time.perf_counter()
+    coordenadas, estatisticas = geocodificar_enderecos([f"Rua {i}" for i in range(10)] + ["falha"], provedor=ProvedorInstavel(), cache=cache)
+    assert time.perf_counter() - inicio >= 10 / 20
+    assert "falha" in estatisticas['erros'] and coordenadas["falha"] is None
+    # Erros transitórios não entram no cache negativo
+    assert normalizar_endereco("falha, Maceió, AL, Brasil") not in cache.buscar([normalizar_endereco("falha, Maceió, AL, Brasil")])
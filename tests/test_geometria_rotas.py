@@ -0,0 +1,40 @@
+import pytest
+
+from src.core.geometria_rotas import CacheGeometria, ServicoGeometria
+from src.scripts.servidor_stub_osrm import geometria_stub, iniciar_servidor_stub
+
+
+@pytest.fixture
+def stub():
+    servidor, url = iniciar_servidor_stub()
+    yield servidor, url
+    servidor.shutdown()
+
+
+def _perto(a, b):
+    return all(abs(x - y) < 1e-5 for p, q in zip(a, b) for x, y in zip(p, q)) and len(a) == len(b)
+
+
+def test_uma_requisicao_por_rota_e_cache_por_trecho(stub, tmp_path):
+    servidor, url = stub
+    paradas = [(-9.66, -35.73), (-9.65, -35.71), (-9.63, -35.70), (-9.61, -35.72)]
+    servico = ServicoGeometria(url, cache=CacheGeometria(str(tmp_path / "geo.sqlite")))
+
+    trechos = servico.geometria_trechos(paradas)
+    assert servidor.contador_requisicoes == 1
+    assert all(_perto(t, geometria_stub(a, b)) for t, (a, b) in zip(trechos, zip(paradas, paradas[1:])))
+    caminho = servico.geometria_rota(paradas)
+    assert len(caminho) == 3 * len(trechos) - (len(trechos) - 1)
+
+    # Redesenho sem mudanças: nenhuma requisição; só o trecho novo vai ao OSRM
+    servico_2 = ServicoGeometria(url, cache=CacheGeometria(str(tmp_path / "geo.sqlite")))
+    assert servico_2.geometria_rota(paradas) == caminho and servidor.contador_requisicoes == 1
+    servico_2.geometria_trechos(paradas + [(-9.60, -35.74)])
+    assert servidor.contador_requisicoes == 2
+
+
+def test_falha_do_osrm_vira_linha_reta(tmp_path):
+    servico = ServicoGeometria("http://127.0.0.1:9", cache=CacheGeometria(str(tmp_path / "geo.sqlite")), timeout=1)
+    a, b = (-9.66, -35.73), (-9.65, -35.71)
+    assert servico.geometria_trechos([a, b]) == [[a, b]] and servico.falhas == 1
+    assert servico.cache.buscar([(a, b)]) == {}
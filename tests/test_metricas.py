@@ -0,0 +1,54 @@
+from fastapi.testclient import TestClient
+
+from src.api import main
+from src.api.fila_jobs import FilaDeJobs
+from src.api.main import app
+from src.core.cache_solucoes import CacheSolucoes
+from src.core.metricas import REGISTRO, RegistroMetricas
+from src.scripts.gerador_instancias import gerar_problema_vrp
+
+
+def test_exportacao_prometheus():
+    registro = RegistroMetricas()
+    latencia = registro.histograma("latencia_segundos", "Latência.", ("rota",), baldes=(0.1, 1))
+    for valor in (0.05, 0.5, 3):
+        latencia.observar(valor, rota="/a")
+    registro.contador("erros_total", "Erros.", ("tipo",)).incrementar(2, tipo='http "5xx"')
+    assert registro.histograma("latencia_segundos", "Latência.", ("rota",)) is latencia
+    texto = registro.exportar()
+    assert "# TYPE latencia_segundos histogram" in texto
+    assert 'latencia_segundos_bucket{rota="/a",le="0.1"} 1' in texto
+    assert 'latencia_segundos_bucket{rota="/a",le="1"} 2' in texto
+    assert 'latencia_segundos_bucket{rota="/a",le="+Inf"} 3' in texto
+    assert 'latencia_segundos_sum{rota="/a"} 3.55' in texto and 'latencia_segundos_count{rota="/a"} 3' in texto
+    assert 'erros_total{tipo="http \\"5xx\\""} 2' in texto
+
+
+def test_endpoint_metrics_e_timings_do_fluxo():
+    cliente = TestClient(app)
+    cliente.post("/rede", json={"fontes": ["A"], "sumidouros": ["C"], "rotas": [
+        {"origem": "A", "destino": "B", "capacidade": 5}, {"origem": "B", "destino": "C", "capacidade": 3}]})
+    resultado = cliente.post("/fluxo/calcular").json()
+    assert resultado['fluxo_maximo'] == 3 and resultado['timings']['total_s'] >= 0
+    resposta = cliente.get("/metrics")
+    assert resposta.status_code == 200 and resposta.headers['content-type'].startswith("text/plain; version=0.0.4")
+    assert 'fluxo_operacao_segundos_count{operacao="calcular"}' in resposta.text
+    assert 'api_requisicao_segundos_count{rota="/fluxo/calcular",metodo="POST",status="200"}' in resposta.text
+
+
+def test_http_saida_por_provedor_e_timings_do_cache(monkeypatch):
+    main._registrar_solucao({"timings": {"http_s": [0.2], "provedor_matriz": "local"}})
+    assert 'vrp_http_saida_segundos_count{servico="local"} 1' in REGISTRO.exportar()
+
+    fila = FilaDeJobs(max_workers=1)
+    monkeypatch.setattr(main, "fila_jobs", fila)
+    monkeypatch.setattr(main, "cache_solucoes", CacheSolucoes())
+    problema = {**gerar_problema_vrp(6, semente=4), "tempo_limite_s": 0.5, "janela_plato_s": 0.2, "modo_matriz": "estimado"}
+    cliente = TestClient(app)
+    try:
+        primeira, segunda = (cliente.post("/roteirizar", json=problema).json() for _ in range(2))
+    finally:
+        fila.encerrar()
+    # Matrizes estimadas: nenhum provedor foi consultado
+    assert primeira['timings']['provedor_matriz'] is None and 'busca_s' in primeira['timings']
+    assert segunda['metricas']['cache_solucao'] and set(segunda['timings']) == {"cache_s", "total_s"}
@@ -0,0 +1,117 @@
+import json
+import os
+
+import networkx as nx
+import pytest
+
+from src.core.formato_rede import iterar_json_rede
+from src.core.modelo_rede import Deposito, ErroCarregamentoRede, Hub, RedeLogistica, ZonaEntrega
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _rede(arestas, num_nos):
+    rede = RedeLogistica()
+    rede.adicionar_no(Deposito("d0", "N0", 0, 0))
+    for i in range(1, num_nos):
+        rede.adicionar_no((Hub if i % 2 else ZonaEntrega)(f"n{i}", f"N{i}", 0, i))
+    for o, d, c in arestas:
+        rede.adicionar_rota(f"N{o}", f"N{d}", c)
+    return rede
+
+
+def test_conectividade_igual_a_do_networkx():
+    import random
+    rng = random.Random(4)
+    for _ in range(20):
+        n = rng.randint(2, 30)
+        arestas = [(rng.randrange(n), rng.randrange(n), rng.randint(0, 9)) for _ in range(rng.randint(1, 25))]
+        rede = _rede(arestas, n)
+        G = nx.DiGraph()
+        G.add_nodes_from(range(n))
+        G.add_edges_from((o, d) for o, d, _ in arestas)
+        assert rede.num_componentes == nx.number_weakly_connected_components(G)
+        if nx.is_weakly_connected(G):
+            assert rede.validar_integridade()
+        else:
+            with pytest.raises(ConnectionError):
+                rede.validar_integridade()
+
+
+def test_indices_rotas_e_csr():
+    rede = _rede([(0, 1, 5), (1, 2, 3), (0, 2, 7)], 3)
+    assert rede.no_por_id("n2") is rede.nos["N2"] and rede.no_por_indice(1).nome == "N1"
+    assert [(r.origem.nome, r.destino.nome, r.capacidade) for r in rede.rotas] == [("N0", "N1", 5), ("N1", "N2", 3), ("N0", "N2", 7)]
+    assert len(rede.rotas) == 3 and rede.rotas[-1].capacidade == 7
+    assert sorted(rede.rotas_saindo("N0")) == [("N1", 5), ("N2", 7)]
+
+    indptr, destinos, capacidades = rede.adjacencia_csr()
+    assert indptr.tolist() == [0, 2, 3, 3] and destinos.tolist() == [1, 2, 2] and capacidades.tolist() == [5, 7, 3]
+    rede.adicionar_rota("N2", "N0", 1)
+    assert rede.adjacencia_csr()[0].tolist() == [0, 2, 3, 4]
+    with pytest.raises(ValueError):
+        rede.adicionar_rota("N2", "N1", -1)
+
+
+def test_carrega_rede_base():
+    rede = RedeLogistica.carregar_de_json(os.path.join(ROOT_DIR, 'data', 'rede_base.json'))
+    assert rede.validar_integridade()
+    api = rede.para_dicionario_api()
+    assert len(api['rotas']) == len(rede.rotas) and api['fontes'] == ["CD Aeroporto/Tabuleiro"]
+
+
+def test_carregamento_incremental_indica_linha(tmp_path):
+    caminho = tmp_path / "rede.json"
+    caminho.write_text('{\n "vertices": [\n  {"id": "d", "tipo": "deposito", "nome": "D", "lat": 0, "lon": 0},\n'
+                       '  {"id": "z", "tipo": "zona", "nome": "Z", "lat": 0, "lon": 1}\n ],\n'
+                       ' "rotas": [\n  {"origem": "D", "destino": "Z", "capacidade": 5},\n'
+                       '  {"origem": "D", "destino": "X", "capacidade": 1}\n ]\n}\n', encoding='utf-8')
+    with pytest.raises(ErroCarregamentoRede) as erro:
+        RedeLogistica.carregar_de_json(str(caminho), tamanho_lote=1)
+    assert erro.value.linha == 8 and "'X'" in str(erro.value)
+
+    caminho.write_text(caminho.read_text(encoding='utf-8').replace('"lon": 1}', '"lon": "a"}'), encoding='utf-8')
+    with pytest.raises(ErroCarregamentoRede) as erro:
+        RedeLogistica.carregar_de_json(str(caminho))
+    assert erro.value.linha == 4
+
+
+def test_leitura_em_lotes_entre_blocos(tmp_path):
+    # Uma rota por linha; a de nome com '{' obriga a leitura elemento a elemento naquele trecho
+    rotas = [{"origem": "A{" if i == 50 else f"A{i}", "destino": "B", "capacidade": i} for i in range(200)]
+    caminho = tmp_path / "rede.json"
+    caminho.write_text('{\n "rotas": [\n' + ',\n'.join(f"  {json.dumps(r)}" for r in rotas) + '\n ]\n}\n', encoding='utf-8')
+    lidos = [(r, linha) for _, registros, linhas in iterar_json_rede(str(caminho), tamanho_bloco=300) for r, linha in zip(registros, linhas)]
+    assert lidos == [(r, 3 + i) for i, r in enumerate(rotas)]
+
+
+def test_snapshot_ida_e_volta(tmp_path):
+    rede = _rede([(0, 1, 5), (1, 2, 3), (0, 2, 7)], 4)
+    rede.salvar_snapshot(str(tmp_path / "rede.snapshot"))
+    copia = RedeLogistica.carregar_snapshot(str(tmp_path / "rede.snapshot"))
+    assert copia.num_componentes == 2 and list(copia.iterar_arestas()) == list(rede.iterar_arestas())
+    assert sorted(copia.rotas_saindo("N0")) == [("N1", 5), ("N2", 7)]
+    assert copia.no_por_id("n3").nome == "N3" and isinstance(copia.nos["N2"], ZonaEntrega)
+    assert copia.adjacencia_csr()[0].tolist() == rede.adjacencia_csr()[0].tolist()
+
+    copia.adicionar_rota("N3", "N0", 2)
+    assert copia.num_componentes == 1 and copia.rotas[-1].capacidade == 2 and len(rede.rotas) == 3
+
+    (tmp_path / "velho.snapshot").write_bytes((tmp_path / "rede.snapshot").read_bytes().replace(b"REDELOG\0\x01", b"REDELOG\0\x09", 1))
+    with pytest.raises(ValueError, match="Versão"):
+        RedeLogistica.carregar_snapshot(str(tmp_path / "velho.snapshot"))
+
+
+def test_abrir_prefere_snapshot_atualizado(tmp_path):
+    caminho = tmp_path / "rede.json"
+    caminho.write_text(json.dumps({"vertices": [{"id": "d", "tipo": "deposito", "nome": "D", "lat": 0, "lon": 0},
+                                                {"id": "z", "tipo": "zona", "nome": "Z", "lat": 0, "lon": 1}],
+                                   "rotas": [{"origem": "D", "destino": "Z", "capacidade": 5}]}), encoding='utf-8')
+    assert RedeLogistica.abrir(str(caminho))._colunas_nos is None
+    RedeLogistica.carregar_de_json(str(caminho)).salvar_snapshot(str(tmp_path / "rede.snapshot"))
+    rede = RedeLogistica.abrir(str(caminho))
+    assert rede._colunas_nos is not None and list(rede.iterar_arestas()) == [("D", "Z", 5)]
+
+    # JSON alterado depois do snapshot: volta a ler o JSON
+    os.utime(caminho, (os.path.getmtime(tmp_path / "rede.snapshot") + 10,) * 2)
+    assert RedeLogistica.abrir(str(caminho))._colunas_nos is None
@@ -0,0 +1,50 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.fila_jobs import FilaDeJobs
+from src.api.main import app
+from src.core.cache_matriz import CacheParesMatriz
+from src.core.provedores_matriz import ProvedorOSRMTable
+from src.core.solucionador_vrp import SolucionadorVRP
+from src.scripts.gerador_instancias import gerar_problema_vrp
+from src.scripts.servidor_stub_osrm import iniciar_servidor_stub
+
+
+@pytest.fixture
+def url_stub():
+    servidor, url = iniciar_servidor_stub()
+    yield url
+    servidor.shutdown()
+
+
+def test_perfil_opcional(url_stub, tmp_path, monkeypatch):
+    monkeypatch.setattr("src.core.perfilador.DIR_PERFIS", str(tmp_path / "perfis"))
+    dados = {**gerar_problema_vrp(15, semente=2, balancear_carga_por="distancia"), "tempo_limite_s": 1, "janela_plato_s": 0.2}
+    resolver = lambda extras: SolucionadorVRP({**dados, **extras}, provedor=ProvedorOSRMTable(url_stub), cache=CacheParesMatriz(str(tmp_path / "pares.sqlite")),
+                                              dir_snapshots=str(tmp_path)).resolver()
+    assert 'perfil' not in resolver({})
+
+    perfil = resolver({"profile": True})['perfil']
+    assert set(perfil['chamadas_callbacks']) == {"custo", "tempo", "demanda", "distancia"}
+    assert all(chamadas > 0 for chamadas in perfil['chamadas_callbacks'].values())
+    assert perfil['log_busca']['linhas'] > 0 and any("_resolver" in f['funcao'] for f in perfil['funcoes'])
+
+    cliente = TestClient(app)
+    assert cliente.get(f"/perfis/{perfil['id']}").json()['chamadas_callbacks'] == perfil['chamadas_callbacks']
+    resposta = cliente.get(f"/perfis/{perfil['id']}/perfil.txt")
+    assert resposta.status_code == 200 and "cumulative" in resposta.text
+    assert cliente.get(f"/perfis/{perfil['id']}/../../segredo").status_code == 404
+    assert cliente.get(f"/perfis/{perfil['id']}/outro.txt").status_code == 404
+
+
+def test_perfil_ignora_cache_de_solucoes(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.core.perfilador.DIR_PERFIS", str(tmp_path / "perfis"))
+    fila = FilaDeJobs(max_workers=1)
+    monkeypatch.setattr("src.api.main.fila_jobs", fila)
+    problema = {**gerar_problema_vrp(8, semente=3), "tempo_limite_s": 0.5, "janela_plato_s": 0.2, "modo_matriz": "estimado", "profile": True}
+    cliente = TestClient(app)
+    try:
+        primeira, segunda = (cliente.post("/roteirizar", json=problema).json() for _ in range(2))
+    finally:
+        fila.encerrar()
+    assert primeira['perfil']['id'] != segunda['perfil']['id'] and 'cache_solucao' not in segunda['metricas']
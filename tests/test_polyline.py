@@ -0,0 +1,46 @@
+import random
+
+import numpy as np
+
+from src.core.polyline import codificar, codificar_lote, decodificar, decodificar_lote, simplificar, tolerancia_para_zoom
+
+
+def _geometrias(quantidade, semente=3):
+    rng = random.Random(semente)
+    geometrias = []
+    for _ in range(quantidade):
+        lat, lon, pontos = rng.uniform(-80, 80), rng.uniform(-179, 179), []
+        for _ in range(rng.randint(0, 200)):
+            lat, lon = lat + rng.uniform(-0.02, 0.02), lon + rng.choice([rng.uniform(-1e-4, 1e-4), rng.uniform(-2, 2)])
+            pontos.append((round(lat, 5), round(lon, 5)))
+        geometrias.append(pontos)
+    return geometrias
+
+
+def test_lote_equivale_a_implementacao_de_referencia():
+    geometrias = _geometrias(40) + [[], [(0.0, 0.0)], [(-9.6, -35.7), (-9.6, -35.7)]]
+    polylines = [codificar(g) for g in geometrias]
+    assert codificar_lote(geometrias) == polylines
+    for polyline, decodificada in zip(polylines, decodificar_lote(polylines)):
+        assert np.allclose(np.array(decodificar(polyline)).reshape(-1, 2), decodificada)
+    # Exemplo da documentação do Google
+    assert codificar([(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_simplificar_respeita_a_tolerancia():
+    # Traçado denso como o do OSRM: um arco amostrado a cada ~1 m, com ruído de centímetros
+    rng = np.random.default_rng(5)
+    angulos = np.linspace(0, np.pi, 2000)
+    pontos = np.column_stack([-9.6 + 0.01 * np.sin(angulos), -35.7 + 0.01 * np.cos(angulos)]) + rng.normal(0, 2e-7, (2000, 2))
+    tolerancia = tolerancia_para_zoom(16, -9.6)
+    simplificados = simplificar(pontos, tolerancia)
+    assert len(simplificados) < len(pontos) / 4
+    assert (simplificados[0] == pontos[0]).all() and (simplificados[-1] == pontos[-1]).all()
+
+    # Cada ponto descartado fica a no máximo `tolerancia` da linha simplificada
+    escala = np.array([1.0, np.cos(np.radians(-9.6))])
+    for ponto in pontos[::37]:
+        a, b = simplificados[:-1] * escala, simplificados[1:] * escala
+        p = ponto * escala
+        t = np.clip(np.einsum('ij,ij->i', p - a, b - a) / np.maximum(np.einsum('ij,ij->i', b - a, b - a), 1e-30), 0, 1)
+        assert np.hypot(*(p - (a + t[:, None] * (b - a))).T).min() <= tolerancia * 1.0001
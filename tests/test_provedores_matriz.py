@@ -0,0 +1,87 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.core.cache_matriz import CacheParesMatriz
+from src.core.provedores_matriz import ProvedorHaversine, ProvedorOSRMTable, VALOR_INALCANCAVEL, _haversine_m, calibrar_estimador
+from src.core.solucionador_vrp import SolucionadorVRP
+from src.scripts.servidor_stub_osrm import iniciar_servidor_stub, tempo_stub, distancia_stub
+
+
+@pytest.fixture
+def stub_osrm():
+    servidor, url = iniciar_servidor_stub(max_locais=10)
+    yield servidor, url
+    servidor.shutdown()
+
+
+def _coordenadas(n, semente=0):
+    rng = random.Random(semente)
+    return [(-9.65 + rng.uniform(-0.05, 0.05), -35.73 + rng.uniform(-0.05, 0.05)) for _ in range(n)]
+
+
+def test_matriz_dividida_em_blocos(stub_osrm):
+    servidor, url = stub_osrm
+    coords = _coordenadas(12)
+    tempo, distancia = ProvedorOSRMTable(url, max_locais=10).obter_matrizes(coords, coords)
+
+    # Blocos de 5 origens x 5 destinos: ceil(12/5)^2 requisições
+    assert servidor.contador_requisicoes == 9
+    for i in range(12):
+        for j in range(12):
+            assert tempo[i][j] == round(tempo_stub(coords[i], coords[j]))
+            assert distancia[i][j] == round(distancia_stub(coords[i], coords[j]))
+
+
+def test_solucionador_constroi_as_duas_matrizes_numa_passada(stub_osrm, tmp_path):
+    servidor, url = stub_osrm
+    coords = _coordenadas(6)
+    dados = {"coordenadas": {f"L{i}": c for i, c in enumerate(coords)}, "nome_deposito": "L0"}
+    cache = CacheParesMatriz(str(tmp_path / "pares.sqlite"))
+    solver = SolucionadorVRP(dados, provedor=ProvedorOSRMTable(url, max_locais=10), cache=cache, dir_snapshots=str(tmp_path / "a"))
+
+    tempo, distancia = solver._criar_matrizes()
+    assert servidor.contador_requisicoes == 4
+    assert tempo[2][2] == 0 and tempo[4][1] == round(tempo_stub(coords[4], coords[1]))
+    assert distancia[1][3] == round(distancia_stub(coords[1], coords[3]))
+    assert solver.metricas['taxa_acerto_cache'] == 0
+
+    solver = SolucionadorVRP(dados, provedor=ProvedorOSRMTable(url, max_locais=10), cache=cache, dir_snapshots=str(tmp_path / "b"))
+    solver._criar_matrizes()
+    assert servidor.contador_requisicoes == 4
+    assert solver.metricas['taxa_acerto_cache'] == 1.0
+
+
+def test_estimador_calibrado_pelo_cache(stub_osrm, tmp_path):
+    _, url = stub_osrm
+    coords = _coordenadas(30, semente=1)
+    tempo, distancia = ProvedorOSRMTable(url, max_locais=10).obter_matrizes(coords, coords)
+    cache = CacheParesMatriz(str(tmp_path / "pares.sqlite"))
+    cache.salvar([(coords[i], coords[j], tempo[i][j], distancia[i][j]) for i in range(30) for j in range(30) if i != j])
+
+    # O stub é haversine x 1.3 a 30 km/h: a regressão deve recuperar isso
+    estimador, relatorio = calibrar_estimador(cache)
+    assert abs(estimador.fator_sinuosidade - 1.3) < 0.01 and abs(estimador.velocidade_kmh - 30) < 0.5
+    assert relatorio['pares_teste'] == 174 and relatorio['distancia']['erro_p90_pct'] < 1
+    t_est, d_est = estimador.obter_matrizes(coords, coords)
+    assert (t_est.diagonal() == 0).all() and abs(int(d_est[0][1]) - int(distancia[0][1])) <= 2
+
+
+def test_estimador_arredonda_como_o_osrm():
+    coords = _coordenadas(20, semente=4)
+    radianos = np.radians(coords)
+    haversine = _haversine_m(radianos[:, None, 0], radianos[:, None, 1], radianos[None, :, 0], radianos[None, :, 1])
+    estimador = ProvedorHaversine(desvio_m=12.5, tempo_fixo_s=7.5)
+    tempo, distancia = estimador.obter_matrizes(coords, coords)
+    t_ref, d_ref = estimador.estimar(haversine)
+    # Mesmo ponto: 0, sem o desvio nem o tempo fixo; os demais pares arredondados, não truncados
+    assert not distancia.diagonal().any() and not tempo.diagonal().any()
+    assert np.abs(distancia - np.rint(d_ref)).max() <= 1 and np.abs(tempo - np.rint(t_ref)).max() <= 1
+    assert np.mean(distancia == np.rint(d_ref)) > 0.95 and np.mean(tempo == np.rint(t_ref)) > 0.95
+
+
+def test_osrm_fora_do_ar_para_de_consultar():
+    provedor = ProvedorOSRMTable("http://127.0.0.1:9", max_locais=10, timeout=1, max_falhas_seguidas=2)
+    tempo, _ = provedor.obter_matrizes(_coordenadas(12), _coordenadas(12))
+    assert provedor.requisicoes == 2 and (tempo == VALOR_INALCANCAVEL).all()
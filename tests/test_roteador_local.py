@@ -0,0 +1,78 @@
+import copy
+
+import numpy as np
+import pytest
+
+from src.core.cache_matriz import CacheParesMatriz
+from src.core.geometria_rotas import CacheGeometria, ServicoGeometria
+from src.core.provedores_matriz import ProvedorRoteadorLocal
+from src.core.roteador_local import GrafoViario, RoteadorLocal, construir_hierarquia, ler_osm
+from src.core.solucionador_vrp import SolucionadorVRP
+from src.scripts.converter_osm import gerar_grade
+
+
+@pytest.fixture(scope="module")
+def grafo(tmp_path_factory):
+    grafo = gerar_grade(15, 15, semente=3)
+    RoteadorLocal(grafo)._preparar_marcos()
+    grafo.hierarquia = construir_hierarquia(grafo)
+    caminho = str(tmp_path_factory.mktemp("grafo") / "grafo.npz")
+    grafo.salvar(caminho)
+    return GrafoViario.carregar(caminho)
+
+
+def _pontos(grafo, n, semente=0):
+    rng = np.random.default_rng(semente)
+    return np.column_stack([rng.uniform(grafo.lat.min(), grafo.lat.max(), n), rng.uniform(grafo.lon.min(), grafo.lon.max(), n)])
+
+
+def test_hierarquia_e_alt_dao_os_caminhos_do_dijkstra(grafo):
+    roteador = RoteadorLocal(grafo)
+    sem_hierarquia = copy.copy(grafo)
+    sem_hierarquia.hierarquia = None
+    pontos = _pontos(grafo, 25)
+    tempo, distancia = roteador.matrizes(pontos, pontos)
+    tempo_ref, distancia_ref = RoteadorLocal(sem_hierarquia).matrizes(pontos, pontos)
+    assert np.allclose(tempo, tempo_ref) and np.allclose(distancia, distancia_ref)
+    assert (np.diag(tempo) == 0).all() and np.isfinite(tempo).all()
+
+    nos, _ = roteador.ancorar(pontos)
+    for a, b in zip(nos[:10].tolist(), nos[10:20].tolist()):
+        caminho = roteador.caminho_nos(a, b)
+        arestas = {(u, v): t for u, v, t in zip(grafo.origens.tolist(), grafo.destinos.tolist(), grafo.tempo.tolist())}
+        assert caminho[0] == a and caminho[-1] == b
+        assert sum(arestas[u, v] for u, v in zip(caminho, caminho[1:])) == pytest.approx(roteador._dijkstra(a, {b})[b][0])
+
+
+def test_backend_local_sem_rede(grafo, tmp_path):
+    provedor = ProvedorRoteadorLocal(roteador=RoteadorLocal(grafo))
+    pontos = [tuple(p) for p in _pontos(grafo, 12, semente=1)]
+    dados = {
+        "coordenadas": {f"L{i}": p for i, p in enumerate(pontos)}, "demandas": {f"L{i}": 0 if i == 0 else 5 for i in range(12)},
+        "num_veiculos": 3, "capacidade_veiculo": 25, "nome_deposito": "L0", "tempo_servico": 60,
+        "custo_km": 0.6, "custo_hora": 20.0, "perfil_solver": "rapido", "tempo_limite_s": 1, "modo_matriz": "exato",
+    }
+    solver = SolucionadorVRP(dados, provedor=provedor, cache=CacheParesMatriz(str(tmp_path / "pares.sqlite")), dir_snapshots=str(tmp_path))
+    solucao = solver.resolver()
+    assert {p['local'] for rota in solucao['rotas_otimizadas'] for p in rota['rota']} == set(dados['coordenadas'])
+
+    servico = ServicoGeometria("http://127.0.0.1:9", cache=CacheGeometria(str(tmp_path / "geo.sqlite")), roteador=provedor.roteador)
+    trecho, = servico.geometria_trechos(pontos[:2])
+    assert trecho[0] == pontos[0] and trecho[-1] == pontos[1] and len(trecho) > 3 and servico.falhas == 0
+
+
+def test_ler_osm(tmp_path):
+    caminho = tmp_path / "mapa.osm"
+    caminho.write_text("""<?xml version="1.0"?>
+<osm>
+  <node id="1" lat="-9.650" lon="-35.730"/><node id="2" lat="-9.650" lon="-35.729"/>
+  <node id="3" lat="-9.649" lon="-35.729"/><node id="4" lat="-9.600" lon="-35.700"/><node id="5" lat="-9.601" lon="-35.700"/>
+  <way id="10"><nd ref="1"/><nd ref="2"/><nd ref="3"/><tag k="highway" v="residential"/></way>
+  <way id="11"><nd ref="3"/><nd ref="1"/><tag k="highway" v="primary"/><tag k="oneway" v="yes"/><tag k="maxspeed" v="60"/></way>
+  <way id="12"><nd ref="4"/><nd ref="5"/><tag k="highway" v="residential"/></way>
+  <way id="13"><nd ref="2"/><nd ref="4"/><tag k="highway" v="footway"/></way>
+</osm>""")
+    grafo = ler_osm(str(caminho))
+    # A ilha 4-5 (ligada só por calçada) fica fora; 3->1 é mão única
+    assert grafo.num_nos == 3 and len(grafo.destinos) == 5
+    assert sorted(zip(grafo.lat.tolist(), grafo.lon.tolist())) == sorted([(-9.65, -35.73), (-9.65, -35.729), (-9.649, -35.729)])
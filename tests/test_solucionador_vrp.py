@@ -0,0 +1,174 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.core.cache_matriz import CacheParesMatriz
+from src.core.indice_espacial import GradeEspacial, _componentes, conectar_componentes, projetar_metros, vizinhos_candidatos
+from src.core.provedores_matriz import ProvedorOSRMTable, VALOR_INALCANCAVEL
+from src.core.solucionador_vrp import SolucionadorVRP, processos_por_job, resolver_portfolio
+from src.scripts.servidor_stub_osrm import iniciar_servidor_stub
+
+
+@pytest.fixture(scope="module")
+def url_stub():
+    servidor, url = iniciar_servidor_stub()
+    yield url
+    servidor.shutdown()
+
+
+def _problema(n, semente=0, **extras):
+    rng = random.Random(semente)
+    coords = {f"L{i}": (-9.65 + rng.uniform(-0.05, 0.05), -35.73 + rng.uniform(-0.05, 0.05)) for i in range(n)}
+    demandas = {nome: rng.randint(1, 8) for nome in coords}
+    demandas["L0"] = 0
+    dados = {
+        "coordenadas": coords, "demandas": demandas, "num_veiculos": 3, "capacidade_veiculo": 40,
+        "nome_deposito": "L0", "tempo_servico": 300, "custo_km": 0.6, "custo_hora": 20.0,
+        "janelas_de_tempo": None, "prioridades": None, "perfil_solver": "rapido",
+    }
+    dados.update(extras)
+    return dados
+
+
+def _resolver(dados, url, tmp_path):
+    solver = SolucionadorVRP(dados, provedor=ProvedorOSRMTable(url), cache=CacheParesMatriz(str(tmp_path / "pares.sqlite")), dir_snapshots=str(tmp_path))
+    return solver.resolver()
+
+
+def _paradas(solucao):
+    return {p['local'] for rota in solucao['rotas_otimizadas'] for p in rota['rota']} - {"L0"}
+
+
+def test_perfil_rapido_para_no_plato(url_stub, tmp_path):
+    solucao = _resolver(_problema(12, tempo_limite_s=20, janela_plato_s=0.5), url_stub, tmp_path)
+    metricas = solucao['metricas']
+    assert _paradas(solucao) == {f"L{i}" for i in range(1, 12)}
+    assert metricas['perfil_solver'] == "rapido" and metricas['tempo_limite_s'] == 20
+    assert metricas['parada_antecipada'] and metricas['tempo_busca_s'] < 10
+    objetivos = [objetivo for _, objetivo in metricas['trajetoria_objetivo']]
+    assert objetivos == sorted(objetivos, reverse=True)
+    assert metricas['status_solver'].startswith("ROUTING_") and metricas['paradas_nao_atendidas'] == 0
+    timings = solucao['timings']
+    assert {'matrizes_s', 'modelo_s', 'busca_s', 'formatacao_s', 'total_s'} <= set(timings) and len(timings['http_s']) >= 1
+    assert timings['total_s'] >= timings['busca_s'] > 0
+
+
+def test_partida_a_quente_reconcilia_paradas(url_stub, tmp_path):
+    anterior = _resolver(_problema(12), url_stub, tmp_path)
+
+    dados = _problema(13)
+    del dados['coordenadas']["L5"]
+    dados['plano_anterior'] = anterior['rotas_otimizadas']
+    solucao = _resolver(dados, url_stub, tmp_path)
+    metricas = solucao['metricas']
+    assert metricas['partida'] == "quente"
+    assert metricas['paradas_removidas'] == 1 and metricas['paradas_novas'] == 1
+    assert _paradas(solucao) == {f"L{i}" for i in range(1, 13)} - {"L5"}
+
+
+def test_partida_a_quente_respeita_capacidade_e_cai_para_fria(url_stub, tmp_path):
+    anterior = _resolver(_problema(12), url_stub, tmp_path)
+
+    # Capacidade menor: as rotas do plano anterior são aparadas e as paradas tiradas voltam por inserção
+    solucao = _resolver(_problema(12, capacidade_veiculo=25, plano_anterior=anterior['rotas_otimizadas']), url_stub, tmp_path)
+    assert solucao['metricas']['partida'] == "quente" and solucao['metricas']['tempo_primeira_solucao_s'] >= 0
+    assert all(rota['carga_total'] <= 25 for rota in solucao['rotas_otimizadas'])
+    assert _paradas(solucao) == {f"L{i}" for i in range(1, 12)}
+
+    # Janela impossível para uma parada do plano: ele não carrega e a busca parte do zero
+    parada = anterior['rotas_otimizadas'][0]['rota'][1]['local']
+    solucao = _resolver(_problema(12, janelas_de_tempo={parada: (0, 1)}, plano_anterior=anterior['rotas_otimizadas']), url_stub, tmp_path)
+    assert solucao['metricas']['partida'] == "fria" and solucao['metricas']['tempo_primeira_solucao_s'] >= 0
+
+
+def test_perfil_desconhecido(url_stub, tmp_path):
+    with pytest.raises(ValueError):
+        _resolver(_problema(4, perfil_solver="turbo"), url_stub, tmp_path)
+
+
+def test_portfolio_devolve_a_melhor_configuracao(url_stub, tmp_path, monkeypatch):
+    monkeypatch.setattr("src.core.provedores_matriz.OSRM_URL", url_stub)
+    monkeypatch.setattr("src.core.cache_matriz.CAMINHO_PADRAO", str(tmp_path / "pares.sqlite"))
+    monkeypatch.setattr("src.core.solucionador_vrp.DIR_SNAPSHOTS", str(tmp_path))
+    solucao = resolver_portfolio(_problema(15, tempo_limite_s=2, janela_plato_s=0.5), num_configuracoes=3, max_workers=2)
+    portfolio = solucao['metricas']['portfolio']
+    assert len(portfolio['participantes']) == 3 and solucao['metricas']['pares_total'] == 15 * 14
+    objetivos = [p['objetivo'] for p in portfolio['participantes'] if p['status'] == "ok"]
+    assert solucao['metricas']['objetivo'] == min(objetivos)
+    assert portfolio['vencedora']['estrategia_inicial'] == solucao['metricas']['estrategia_inicial']
+    assert _paradas(solucao) == {f"L{i}" for i in range(1, 15)}
+
+
+def test_processos_por_job_usa_a_fatia_do_pool(monkeypatch):
+    monkeypatch.setattr("os.cpu_count", lambda: 8)
+    monkeypatch.delenv("VRP_PORTFOLIO_WORKERS", raising=False)
+    monkeypatch.setenv("VRP_MAX_WORKERS", "4")
+    assert processos_por_job("VRP_PORTFOLIO_WORKERS") == 2
+    monkeypatch.setenv("VRP_MAX_WORKERS", "16")
+    assert processos_por_job("VRP_PORTFOLIO_WORKERS") == 1
+    monkeypatch.setenv("VRP_PORTFOLIO_WORKERS", "3")
+    assert processos_por_job("VRP_PORTFOLIO_WORKERS") == 3
+
+
+def test_matriz_esparsa_por_vizinhos(url_stub, tmp_path):
+    dados = _problema(60, vizinhos_k=6, num_veiculos=8, tempo_limite_s=2, janela_plato_s=0.5)
+    coords = list(dados['coordenadas'].values())
+    pontos = projetar_metros(coords)
+    distancias = np.linalg.norm(pontos[:, None] - pontos[None], axis=2)
+    np.fill_diagonal(distancias, np.inf)
+    vizinhos = GradeEspacial(coords, pontos_por_celula=3).vizinhos(6)
+    assert np.allclose(np.take_along_axis(distancias, vizinhos, 1), np.sort(distancias, axis=1)[:, :6])
+
+    solver = SolucionadorVRP(dados, provedor=ProvedorOSRMTable(url_stub), cache=CacheParesMatriz(str(tmp_path / "pares.sqlite")), dir_snapshots=str(tmp_path))
+    solucao = solver.resolver()
+    metricas = solucao['metricas']
+    assert metricas['pares_exatos'] < metricas['pares_total'] / 3 and metricas['pares_estimados'] > 0
+    assert _paradas(solucao) == {f"L{i}" for i in range(1, 60)}
+    candidatos = solver._vizinhancas()
+    for rota in solucao['rotas_otimizadas']:
+        nos = [int(p['local'][1:]) for p in rota['rota'][1:]]
+        assert all(b in candidatos[a] for a, b in zip(nos, nos[1:]))
+
+
+def test_matriz_esparsa_com_grupos_separados(tmp_path):
+    rng = random.Random(3)
+    coords = {"L0": (-9.65, -35.73)}
+    for i in range(1, 31):
+        centro = (-9.60, -35.68) if i <= 15 else (-9.70, -35.78)
+        coords[f"L{i}"] = (centro[0] + rng.uniform(-0.005, 0.005), centro[1] + rng.uniform(-0.005, 0.005))
+    dados = {"coordenadas": coords, "demandas": {nome: 0 if nome == "L0" else 1 for nome in coords}, "num_veiculos": 1,
+             "capacidade_veiculo": 100, "nome_deposito": "L0", "tempo_servico": 60, "perfil_solver": "rapido",
+             "tempo_limite_s": 2, "modo_matriz": "estimado", "vizinhos_k": 5}
+    solver = SolucionadorVRP(dados, cache=CacheParesMatriz(str(tmp_path / "pares.sqlite")), dir_snapshots=str(tmp_path))
+    solucao = solver.resolver()
+    assert solucao['metricas']['ligacoes_componentes'] >= 1
+    assert solucao['metricas']['paradas_nao_atendidas'] == 0 and _paradas(solucao) == set(coords) - {"L0"}
+
+
+def test_conectar_componentes_pela_grade():
+    rng = random.Random(2)
+    centros = [(-9.6 + rng.uniform(-0.2, 0.2), -35.7 + rng.uniform(-0.2, 0.2)) for _ in range(12)]
+    coords = [(lat + rng.gauss(0, 0.002), lon + rng.gauss(0, 0.002)) for lat, lon in centros for _ in range(40)]
+    grade = GradeEspacial(coords)
+    candidatos = vizinhos_candidatos(grade.vizinhos(4))
+    rotulos, num_componentes = _componentes(candidatos, set())
+    assert num_componentes > 1
+    antes = [set(c) for c in candidatos]
+    ligacoes = conectar_componentes(candidatos, grade, ignorar={0})
+    assert _componentes(candidatos, {0})[1] == 1 and ligacoes == sum(len(c - a) for c, a in zip(candidatos, antes)) // 2
+    # As ligações novas só cruzam componentes, e o local ignorado (o depósito) não ganha nenhuma
+    assert all(rotulos[i] != rotulos[j] for i, c in enumerate(candidatos) for j in c - antes[i])
+    assert candidatos[0] == antes[0]
+
+
+def test_modo_fallback_estima_pares_sem_resposta(tmp_path):
+    dados = _problema(10, modo_matriz="fallback")
+    solver = SolucionadorVRP(dados, provedor=ProvedorOSRMTable("http://127.0.0.1:9", timeout=1), cache=CacheParesMatriz(str(tmp_path / "pares.sqlite")), dir_snapshots=str(tmp_path))
+    solucao = solver.resolver()
+    assert solucao['metricas']['pares_estimados'] == 90 and _paradas(solucao) == {f"L{i}" for i in range(1, 10)}
+    assert not list(tmp_path.glob("tempo_*.npy"))
+
+    dados['modo_matriz'] = "exato"
+    tempo, _ = SolucionadorVRP(dados, provedor=ProvedorOSRMTable("http://127.0.0.1:9", timeout=1), cache=CacheParesMatriz(str(tmp_path / "pares.sqlite")), dir_snapshots=str(tmp_path))._criar_matrizes()
+    assert (tempo[0, 1:] == VALOR_INALCANCAVEL).all()
@@ -2,11 +2,13 @@ from src.core.modelo_rede import RedeLogistica
 import os
 import json 
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 def main():
     print("--- Testando o Módulo de Modelagem (Dev 1) ---")
 
     
-    caminho_json = os.path.join('dev3', 'dados_ficticios', 'rede_base.json')
+    caminho_json = os.path.join(ROOT_DIR, 'data', 'rede_base.json')
     
     
     try: